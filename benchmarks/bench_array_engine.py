@@ -0,0 +1,60 @@
+"""Compare the Token-based and array-backed rule engines on pre-parsed docs
+
+Run from the repository root: python -m benchmarks.bench_array_engine
+"""
+import argparse
+import time
+
+import spacy
+
+from benchmarks.corpus import synthetic_reviews
+from modules.DepenParseArray import DepenParseArray
+from modules.DepenParseProduct import DepenParseProduct
+
+
+def run(parser, method:str, docs:list) -> tuple:
+    """Time one extraction method over parsed docs
+
+    Args:
+        parser (DepenParseProduct): rule engine
+        method (str): find_svos, find_svaos or product_triplets
+        docs (list): parsed spacy docs
+
+    Returns:
+        tuple: elapsed seconds, list of outputs
+    """
+    start = time.perf_counter()
+    if method == "product_triplets":
+        out = [parser.product_triplets(i, doc) for i, doc in enumerate(docs)]
+    else:
+        extract = getattr(parser, method)
+        out = [extract(doc) for doc in docs]
+    return time.perf_counter() - start, out
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--model", default="en_core_web_sm")
+    arg_parser.add_argument("--docs", type=int, default=5000)
+    arg_parser.add_argument("--repeat", type=int, default=3, help="sentences joined per doc")
+    args = arg_parser.parse_args()
+
+    nlp = spacy.load(args.model, exclude=["ner", "lemmatizer"])
+    reviews = synthetic_reviews(args.docs * args.repeat)
+    texts = [" ".join(reviews[i:i + args.repeat]) for i in range(0, len(reviews), args.repeat)]
+    docs = list(nlp.pipe(texts, batch_size=256))
+
+    token_engine = DepenParseProduct()
+    array_engine = DepenParseArray()
+
+    for method in ["find_svos", "find_svaos", "product_triplets"]:
+        token_time, expected = run(token_engine, method, docs)
+        array_time, actual = run(array_engine, method, docs)
+        print(
+            f"{method:<18} token {token_time:8.3f}s  array {array_time:8.3f}s  "
+            f"speedup {token_time / array_time:5.2f}x  identical {expected == actual}"
+        )
+
+
+if __name__ == "__main__":
+    main()
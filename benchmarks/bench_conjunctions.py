@@ -0,0 +1,108 @@
+"""Stress the conjunction closure with coordination chains of increasing length
+
+Docs are built directly from heads/deps/pos, so no trained model is needed.
+Run from the repository root: python -m benchmarks.bench_conjunctions
+"""
+import argparse
+import time
+
+import spacy
+from spacy.tokens import Doc
+
+from modules.DepenParseBase import DepenParseBase
+
+FEATURES = ["screen", "battery", "camera", "speakers", "keyboard", "case", "lens", "strap"]
+
+
+def coordination_doc(vocab, length:int, shape:str) -> Doc:
+    """Build "I like the screen and battery ..." with length coordinated objects
+
+    Args:
+        vocab (Vocab): spacy vocab
+        length (int): number of coordinated objects
+        shape (str): "flat" attaches every conjunct to the first, "nested" to the previous one
+            and "tree" makes every conjunct head an "and" and up to two further conjuncts
+
+    Returns:
+        Doc: parsed doc whose dobj (index 3) heads the coordination
+    """
+    words = ["I", "like", "the"]
+    heads = [1, 1, 3]
+    deps = ["nsubj", "ROOT", "det"]
+    pos = ["PRON", "VERB", "DET"]
+
+    def add(word, head, dep, tag):
+        words.append(word)
+        heads.append(head)
+        deps.append(dep)
+        pos.append(tag)
+        return len(words) - 1
+
+    def add_tree(head, k, dep):
+        #conjunct k heads conjuncts 2k+1 and 2k+2, laid out in preorder
+        node = add(FEATURES[k % len(FEATURES)], head, dep, "NOUN")
+        children = [c for c in (2 * k + 1, 2 * k + 2) if c < length]
+        if children:
+            add("and", node, "cc", "CCONJ")
+        for c in children:
+            add_tree(node, c, "conj")
+
+    if shape == "tree":
+        add_tree(1, 0, "dobj")
+    else:
+        first = prev = add(FEATURES[0], 1, "dobj", "NOUN")
+        for k in range(1, length):
+            head = prev if shape == "nested" else first
+            add("and", head, "cc", "CCONJ")
+            prev = add(FEATURES[k % len(FEATURES)], head, "conj", "NOUN")
+
+    return Doc(vocab, words=words, heads=heads, deps=deps, pos=pos)
+
+
+def recursive_closure(parser:DepenParseBase, objs:list) -> list:
+    """Reference implementation that re-expands the whole accumulated list
+    """
+    moreObjs = []
+    for obj in objs:
+        rights = list(obj.rights)
+        if "and" in {tok.lower_ for tok in rights}:
+            moreObjs.extend([tok for tok in rights if tok.dep_ in parser.OBJECTS or tok.pos_ == "NOUN"])
+            if len(moreObjs) > 0:
+                moreObjs.extend(recursive_closure(parser, moreObjs))
+    return moreObjs
+
+
+def timed(func, *args, repeat=5) -> tuple:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        out = func(*args)
+    return (time.perf_counter() - start) / repeat, out
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--lengths", type=int, nargs="+", default=[4, 8, 16, 32, 64, 128, 256])
+    arg_parser.add_argument("--reference-limit", type=int, default=32,
+        help="skip the recursive reference above this length")
+    args = arg_parser.parse_args()
+
+    vocab = spacy.blank("en").vocab
+    parser = DepenParseBase()
+
+    for shape in ("flat", "nested", "tree"):
+        for length in args.lengths:
+            doc = coordination_doc(vocab, length, shape)
+            objs = [doc[3]]
+            seconds, closure = timed(parser.get_objs_from_conjunctions, objs)
+            line = (
+                f"{shape:<6} n={length:<5} closure {seconds * 1e6:10.1f}us "
+                f"({seconds * 1e6 / length:6.2f}us/conjunct, {len(closure)} tokens)"
+            )
+            if length <= args.reference_limit:
+                ref_seconds, ref_closure = timed(recursive_closure, parser, objs)
+                line += f"  recursive {ref_seconds * 1e6:10.1f}us ({len(ref_closure)} tokens)"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Time the triples dict <-> dataframe conversions of modules.util against the row loops they replace
+
+Triples are synthetic, so no trained model is needed.
+Run from the repository root: python -m benchmarks.bench_conversions --rows 1000000 10000000
+"""
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from modules.util import df_from_triples_dict, triples_dict_from_df, triples_dict_from_df_chunks
+
+SUBJECTS = ["screen", "battery", "camera", "speakers", "keyboard", "case", "lens", "strap", "i", "it"]
+PREDICATES = ["like", "love", "!like", "hate", "need", "return", "!recommend", "use"]
+OBJECTS = ["phone", "laptop", "charger", "price", "quality", "delivery", "seller", "colour"]
+
+
+def synthetic_triples_dict(n_rows:int, triples_per_id=4, seed=0) -> dict:
+    """Triples dictionary with about n_rows triples spread over n_rows / triples_per_id identifiers
+
+    Args:
+        n_rows (int): total number of triples
+        triples_per_id (int, optional): mean triples per identifier. Defaults to 4.
+        seed (int, optional): random seed. Defaults to 0.
+
+    Returns:
+        dict: identifier to list of (subject, predicate, object)
+    """
+    rng = random.Random(seed)
+    triples_dict = {}
+    identifier = 0
+
+    while n_rows > 0:
+        n = min(n_rows, rng.randint(0, 2 * triples_per_id))
+        triples_dict[f"review-{identifier}"] = [
+            (rng.choice(SUBJECTS), rng.choice(PREDICATES), rng.choice(OBJECTS)) for _ in range(n)
+        ]
+        identifier += 1
+        n_rows -= n
+
+    return triples_dict
+
+
+def loop_df_from_triples_dict(triples_dict:dict) -> pd.DataFrame:
+    """Reference implementation appending one row at a time
+    """
+    key_lst, subject_lst, predicate_lst, object_lst = [], [], [], []
+    for key, triples_lst in triples_dict.items():
+        for triples in triples_lst:
+            key_lst.append(key)
+            subject_lst.append(triples[0])
+            predicate_lst.append(triples[1])
+            object_lst.append(triples[2])
+    return pd.DataFrame.from_dict({
+        "id" : key_lst, "subject" : subject_lst, "predicate" : predicate_lst, "object" : object_lst
+    })
+
+
+def loop_triples_dict_from_df(triples_df:pd.DataFrame) -> dict:
+    """Reference implementation with a membership check per row
+    """
+    triples_dict = {}
+    for id_value, sub, pred, obj in zip(
+        triples_df["id"].values, triples_df["subject"].values,
+        triples_df["predicate"].values, triples_df["object"].values
+    ):
+        triples = (sub, pred, obj)
+        if id_value in triples_dict:
+            triples_dict[id_value].append(triples)
+        else:
+            triples_dict[id_value] = [triples]
+    return triples_dict
+
+
+def timed(func, *args) -> tuple:
+    start = time.perf_counter()
+    out = func(*args)
+    return time.perf_counter() - start, out
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--rows", type=int, nargs="+", default=[1000000, 10000000])
+    arg_parser.add_argument("--chunk-rows", type=int, default=1000000)
+    arg_parser.add_argument("--no-reference", action="store_true",
+        help="skip the row loop implementations, and keep less in memory")
+    args = arg_parser.parse_args()
+
+    for n_rows in args.rows:
+        triples_dict = synthetic_triples_dict(n_rows)
+        seconds, triples_df = timed(df_from_triples_dict, triples_dict)
+        #shuffled rows so identifiers are not contiguous, as after a sort or a join
+        shuffled = triples_df.sample(frac=1.0, random_state=0)
+        print(f"rows={n_rows:<10} ids={len(triples_dict):<10}")
+        print(f"  df_from_triples_dict          {seconds:8.2f}s")
+        if args.no_reference:
+            #the inputs are only needed by the reference checks, free them for 10M row runs
+            del triples_dict, triples_df
+
+        seconds, result = timed(triples_dict_from_df, shuffled)
+        print(f"  triples_dict_from_df          {seconds:8.2f}s")
+        if args.no_reference:
+            #one triples dict at a time, the chunked result is checked by its identifiers only
+            n_ids = len(result)
+            del result
+
+        chunks = (shuffled.iloc[i:i + args.chunk_rows] for i in range(0, len(shuffled), args.chunk_rows))
+        seconds, chunked = timed(triples_dict_from_df_chunks, chunks)
+        print(f"  triples_dict_from_df_chunks   {seconds:8.2f}s")
+        if args.no_reference:
+            assert len(chunked) == n_ids
+            continue
+        assert chunked == result
+
+        seconds, ref_df = timed(loop_df_from_triples_dict, triples_dict)
+        print(f"  reference df loop             {seconds:8.2f}s")
+        pd.testing.assert_frame_equal(ref_df, triples_df)
+
+        seconds, ref_dict = timed(loop_triples_dict_from_df, shuffled)
+        print(f"  reference dict loop           {seconds:8.2f}s")
+        assert ref_dict == result and list(ref_dict) == list(result)
+
+
+if __name__ == "__main__":
+    main()
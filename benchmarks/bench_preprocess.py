@@ -0,0 +1,57 @@
+"""Compare the fused iter_preprocess pipeline with the chained modules.util preprocessing functions
+
+Needs the nltk stopwords corpus (nltk.download("stopwords")) unless run with --no-stopwords.
+Run from the repository root: python -m benchmarks.bench_preprocess --n-docs 100000
+"""
+import argparse
+import time
+
+from modules import util
+from benchmarks.corpus import synthetic_reviews
+
+
+def chained(texts:list, drop_stopwords:bool, stemming:bool) -> list:
+    """The preprocessing stages applied one full pass at a time
+    """
+    tokens = util.remove_numbers(util.simple_preprocess(texts))
+    tokens = util.remove_single_character(tokens)
+    if drop_stopwords:
+        tokens = util.remove_stopwords(tokens)
+    if stemming:
+        tokens = util.stem_words(tokens)
+    return tokens
+
+
+def timed(func, *args, **kwargs) -> tuple:
+    #every run starts from a cold stem cache
+    util.stem.cache_clear()
+    start = time.perf_counter()
+    out = func(*args, **kwargs)
+    return time.perf_counter() - start, out
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--n-docs", type=int, default=100000)
+    arg_parser.add_argument("--no-stopwords", action="store_true")
+    args = arg_parser.parse_args()
+
+    texts = synthetic_reviews(args.n_docs)
+    drop_stopwords = not args.no_stopwords
+
+    for stemming in (False, True):
+        configs = [("fused", True)] if not stemming else [("fused, stem cache", True), ("fused, no stem cache", False)]
+        ref_seconds, ref = timed(chained, texts, drop_stopwords, stemming)
+        print(f"stemming={stemming} docs={len(texts)}")
+        print(f"  chained                  {ref_seconds:8.3f}s")
+
+        for name, stem_cache in configs:
+            seconds, out = timed(lambda: list(util.iter_preprocess(
+                texts, drop_stopwords=drop_stopwords, stemming=stemming, stem_cache=stem_cache
+            )))
+            assert out == ref
+            print(f"  {name:<24} {seconds:8.3f}s ({ref_seconds / seconds:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Measure parse + extraction throughput for each pipeline profile
+
+Run from the repository root: python -m benchmarks.bench_profiles
+"""
+import argparse
+
+from benchmarks.corpus import synthetic_reviews
+from modules.TriplesExtractor import PIPELINE_PROFILES, TriplesExtractor, verify_profile
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--model", default="en_core_web_sm")
+    arg_parser.add_argument("--method", default="svos")
+    arg_parser.add_argument("--docs", type=int, default=5000)
+    arg_parser.add_argument("--batch-size", type=int, default=256)
+    args = arg_parser.parse_args()
+
+    text_lst = synthetic_reviews(args.docs)
+    identifier_lst = list(range(len(text_lst)))
+    baseline = None
+
+    for profile in PIPELINE_PROFILES:
+        extractor = TriplesExtractor(args.model, args.method, profile)
+        extractor.semantic_triples(identifier_lst, text_lst, batch_size=args.batch_size)
+        docs_per_sec = extractor.last_run_stats["docs_per_sec"]
+        if baseline is None:
+            baseline = docs_per_sec
+        mismatches = verify_profile(text_lst[:500], profile, args.model, args.method)
+        print(
+            f"{profile:<12} {docs_per_sec:10.1f} docs/sec  "
+            f"speedup {docs_per_sec / baseline:5.2f}x  mismatches {len(mismatches)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
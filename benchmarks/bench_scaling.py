@@ -0,0 +1,45 @@
+"""Throughput of CorpusRunner for 1 through N worker processes
+
+Run from the repository root: python -m benchmarks.bench_scaling --max-workers 8
+"""
+import argparse
+
+from benchmarks.corpus import synthetic_reviews
+from modules.CorpusRunner import CorpusRunner
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--model", default="en_core_web_sm")
+    arg_parser.add_argument("--method", default="product")
+    arg_parser.add_argument("--profile", default="auto")
+    arg_parser.add_argument("--docs", type=int, default=20000)
+    arg_parser.add_argument("--max-workers", type=int, default=4)
+    arg_parser.add_argument("--shard-size", type=int, default=500)
+    arg_parser.add_argument("--batch-size", type=int, default=256)
+    args = arg_parser.parse_args()
+
+    text_lst = synthetic_reviews(args.docs)
+    identifier_lst = list(range(len(text_lst)))
+    single = None
+
+    workers = 1
+    while workers <= args.max_workers:
+        runner = CorpusRunner(
+            args.model, n_workers=workers, shard_size=args.shard_size,
+            batch_size=args.batch_size, method=args.method, profile=args.profile,
+        )
+        runner.semantic_triples(identifier_lst, text_lst)
+        docs_per_sec = runner.last_run_stats["docs_per_sec"]
+        if single is None:
+            single = docs_per_sec
+        speedup = docs_per_sec / single
+        print(
+            f"workers {workers:<3} {docs_per_sec:10.1f} docs/sec  "
+            f"speedup {speedup:5.2f}x  efficiency {speedup / workers:5.1%}"
+        )
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import random
+
+PRODUCTS = ["phone", "laptop", "camera", "headset", "charger", "tablet", "speaker", "watch"]
+FEATURES = ["screen", "battery", "camera", "speakers", "keyboard", "case", "lens", "strap", "cable"]
+ADJECTIVES = ["great", "poor", "bright", "cheap", "solid", "slow", "fast", "loud", "sturdy"]
+VERBS = ["love", "hate", "like", "return", "recommend", "use", "charge", "drop"]
+NEGATIONS = ["", "", "", "do not ", "never "]
+
+
+def short_review(rng:random.Random) -> str:
+    """Generate a one or two sentence product review
+
+    Args:
+        rng (random.Random): random generator
+
+    Returns:
+        str: review text
+    """
+    feature = rng.choice(FEATURES)
+    sentences = [
+        f"I {rng.choice(NEGATIONS)}{rng.choice(VERBS)} the {rng.choice(ADJECTIVES)} {feature}.",
+        f"The {feature} is {rng.choice(ADJECTIVES)} and the {rng.choice(FEATURES)} works well.",
+        f"My wife {rng.choice(VERBS)}s this {rng.choice(PRODUCTS)}.",
+    ]
+    return " ".join(rng.sample(sentences, rng.randint(1, 2)))
+
+
+def synthetic_reviews(n:int, seed=0) -> list:
+    """Generate a reproducible corpus of short product reviews
+
+    Args:
+        n (int): number of reviews
+        seed (int, optional): random seed. Defaults to 0.
+
+    Returns:
+        list: list of review texts
+    """
+    rng = random.Random(seed)
+    return [short_review(rng) for _ in range(n)]
+
+
+def long_document(rng:random.Random, sentences=40) -> str:
+    """Generate a long multi-paragraph review
+
+    Args:
+        rng (random.Random): random generator
+        sentences (int, optional): approximate number of sentences. Defaults to 40.
+
+    Returns:
+        str: review text
+    """
+    return " ".join(short_review(rng) for _ in range(max(1, sentences // 2)))
+
+
+def deep_coordination(rng:random.Random, length=12) -> str:
+    """Generate a review with long chains of coordinated subjects, verbs and objects
+
+    Args:
+        rng (random.Random): random generator
+        length (int, optional): number of coordinated objects. Defaults to 12.
+
+    Returns:
+        str: review text
+    """
+    objects = [f"the {rng.choice(ADJECTIVES)} {rng.choice(FEATURES)}" for _ in range(length)]
+    subjects = [f"the {rng.choice(FEATURES)}" for _ in range(max(2, length // 3))]
+    verbs = rng.sample(VERBS, 3)
+    return (
+        f"I {verbs[0]} and {verbs[1]} {', '.join(objects[:-1])} and {objects[-1]}. "
+        f"{' and '.join(subjects).capitalize()} {verbs[2]} this {rng.choice(PRODUCTS)}."
+    )
+
+
+def verbless_fragment(rng:random.Random) -> str:
+    """Generate a review made of verbless fragments
+
+    Args:
+        rng (random.Random): random generator
+
+    Returns:
+        str: review text
+    """
+    fragments = [
+        f"{rng.choice(ADJECTIVES).capitalize()} {rng.choice(FEATURES)}.",
+        f"{rng.choice(ADJECTIVES).capitalize()} {rng.choice(FEATURES)}, {rng.choice(ADJECTIVES)} {rng.choice(FEATURES)}!",
+        "Five stars.",
+        f"Not the {rng.choice(FEATURES)} though.",
+        f"Best {rng.choice(PRODUCTS)} ever!!",
+    ]
+    return " ".join(rng.sample(fragments, rng.randint(1, 3)))
+
+
+#corpus name -> generator of one text
+CORPORA = {
+    "short" : short_review,
+    "long" : long_document,
+    "coordination" : deep_coordination,
+    "verbless" : verbless_fragment,
+}
+
+
+def synthetic_corpus(kind:str, n:int, seed=0) -> list:
+    """Generate a reproducible corpus of one of the CORPORA kinds
+
+    Args:
+        kind (str): one of CORPORA
+        n (int): number of texts
+        seed (int, optional): random seed. Defaults to 0.
+
+    Returns:
+        list: list of texts
+    """
+    rng = random.Random(seed)
+    return [CORPORA[kind](rng) for _ in range(n)]
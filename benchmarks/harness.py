@@ -0,0 +1,213 @@
+"""Reproducible offline benchmark harness with regression comparison
+
+Parse time and rule time are measured separately per synthetic corpus, followed
+by the util conversions and the validators on the extracted triples.
+The model must be installed (or be a local path); nothing is downloaded.
+
+Run from the repository root:
+    python -m benchmarks.harness run --output baseline.json
+    python -m benchmarks.harness run --output current.json
+    python -m benchmarks.harness compare baseline.json current.json --tolerance 0.1
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+
+import spacy
+
+from benchmarks.corpus import CORPORA, synthetic_corpus
+from modules import util
+from modules.TriplesExtractor import ENGINES, TriplesExtractor
+from modules.Validator import TriplesValidator
+
+RULE_METHODS = ["find_sv", "find_svos", "find_svaos", "product_triplets"]
+
+
+def best_of(func, repeat:int) -> tuple:
+    """Run func repeat times
+
+    Args:
+        func (callable): function without arguments
+        repeat (int): number of runs
+
+    Returns:
+        tuple: list of run seconds, output of the last run
+    """
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = func()
+        runs.append(time.perf_counter() - start)
+    return runs, out
+
+
+def record(results:dict, name:str, runs:list, items:int) -> None:
+    seconds = min(runs)
+    results[name] = {
+        "seconds" : seconds,
+        "runs" : runs,
+        "items" : items,
+        "items_per_sec" : items / seconds if seconds > 0 else 0.0,
+    }
+    print(f"  {name:<40} {seconds:10.4f}s  {results[name]['items_per_sec']:12.1f}/s", file=sys.stderr)
+
+
+def rule_runner(parser, method:str, docs:list):
+    if method == "product_triplets":
+        return lambda: [parser.product_triplets(i, doc) for i, doc in enumerate(docs)]
+    extract = getattr(parser, method)
+    return lambda: [extract(doc) for doc in docs]
+
+
+def git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args:argparse.Namespace) -> dict:
+    """Run every benchmark of the harness
+
+    Returns:
+        dict: "meta" describing the environment and "results" keyed by "<corpus>/<stage>"
+    """
+    extractor = TriplesExtractor(args.model, method="svos", profile=args.profile, engine=args.engine)
+    nlp = extractor.nlp_model
+    meta = {
+        "timestamp" : time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit" : git_commit(),
+        "python" : platform.python_version(),
+        "platform" : platform.platform(),
+        "spacy" : spacy.__version__,
+        "model" : f"{nlp.meta.get('lang')}_{nlp.meta.get('name')}",
+        "model_version" : nlp.meta.get("version"),
+        "pipeline" : nlp.pipe_names,
+        "engine" : args.engine,
+        "profile" : extractor.profile,
+        "docs" : args.docs,
+        "seed" : args.seed,
+        "repeat" : args.repeat,
+        "batch_size" : args.batch_size,
+    }
+    results = {}
+    validator = TriplesValidator()
+
+    for kind in args.corpora:
+        texts = synthetic_corpus(kind, args.docs, args.seed)
+        n_tokens = sum(len(text.split()) for text in texts)
+        print(f"{kind} ({len(texts)} docs, {n_tokens} words)", file=sys.stderr)
+
+        runs, docs = best_of(lambda: list(extractor.pipe(texts, batch_size=args.batch_size)), args.repeat)
+        record(results, f"{kind}/parse", runs, len(texts))
+
+        outputs = {}
+        for method in RULE_METHODS:
+            runs, outputs[method] = best_of(rule_runner(extractor.parser, method, docs), args.repeat)
+            record(results, f"{kind}/rules/{method}", runs, len(docs))
+
+        triples_dict = {i : svos for i, svos in enumerate(outputs["find_svos"])}
+        n_triples = sum(len(svos) for svos in triples_dict.values())
+
+        runs, triples_df = best_of(lambda: util.df_from_triples_dict(triples_dict), args.repeat)
+        record(results, f"{kind}/util/df_from_triples_dict", runs, n_triples)
+        runs, _ = best_of(lambda: util.triples_dict_from_df(triples_df), args.repeat)
+        record(results, f"{kind}/util/triples_dict_from_df", runs, n_triples)
+        #cold stem cache on every run, so results do not depend on earlier corpora
+        runs, _ = best_of(lambda: (util.stem.cache_clear(), util.stem_triples(triples_df)), args.repeat)
+        record(results, f"{kind}/util/stem_triples", runs, n_triples)
+
+        source_dict = dict(enumerate(util.simple_preprocess(texts)))
+        runs, _ = best_of(lambda: validator.naive_validation(triples_dict, source_dict), args.repeat)
+        record(results, f"{kind}/validator/naive_validation", runs, len(source_dict))
+        runs, _ = best_of(lambda: validator.bulk_validation(triples_dict, source_dict), args.repeat)
+        record(results, f"{kind}/validator/bulk_validation", runs, len(source_dict))
+
+    return {"meta" : meta, "results" : results}
+
+
+def compare(baseline:dict, current:dict, tolerance=0.1, min_seconds=0.001) -> list:
+    """Compare two harness outputs
+
+    Args:
+        baseline (dict): harness output to compare against
+        current (dict): new harness output
+        tolerance (float, optional): relative slowdown accepted as noise. Defaults to 0.1.
+        min_seconds (float, optional): absolute slowdown accepted as noise. Defaults to 0.001.
+
+    Returns:
+        list: (name, baseline seconds, current seconds, ratio, regressed) for benchmarks in both
+    """
+    rows = []
+    for name, base in baseline["results"].items():
+        if name not in current["results"]:
+            continue
+        base_seconds = base["seconds"]
+        cur_seconds = current["results"][name]["seconds"]
+        ratio = cur_seconds / base_seconds if base_seconds > 0 else float("inf")
+        regressed = ratio > 1.0 + tolerance and cur_seconds - base_seconds > min_seconds
+        rows.append((name, base_seconds, cur_seconds, ratio, regressed))
+    return rows
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks and write JSON results")
+    run_parser.add_argument("--model", default="en_core_web_sm")
+    run_parser.add_argument("--profile", default="auto")
+    run_parser.add_argument("--engine", default="token", choices=list(ENGINES))
+    run_parser.add_argument("--corpora", nargs="+", default=list(CORPORA), choices=list(CORPORA))
+    run_parser.add_argument("--docs", type=int, default=1000)
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument("--batch-size", type=int, default=256)
+    run_parser.add_argument("--output", default="-", help="JSON output path, - for stdout")
+
+    compare_parser = commands.add_parser("compare", help="flag regressions between two JSON results")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--tolerance", type=float, default=0.1, help="relative slowdown accepted")
+    compare_parser.add_argument("--min-seconds", type=float, default=0.001, help="absolute slowdown accepted")
+
+    args = arg_parser.parse_args()
+
+    if args.command == "run":
+        output = json.dumps(run(args), indent=2)
+        if args.output == "-":
+            print(output)
+        else:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(output + "\n")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+
+    for key in ("spacy", "model", "model_version", "engine", "profile", "docs", "seed"):
+        if baseline["meta"].get(key) != current["meta"].get(key):
+            print(f"warning: {key} differs: {baseline['meta'].get(key)} -> {current['meta'].get(key)}")
+
+    rows = compare(baseline, current, args.tolerance, args.min_seconds)
+    for name, base_seconds, cur_seconds, ratio, regressed in rows:
+        flag = "REGRESSION" if regressed else ""
+        print(f"{name:<42} {base_seconds:10.4f}s {cur_seconds:10.4f}s {ratio:7.2f}x  {flag}")
+
+    missing = set(baseline["results"]) ^ set(current["results"])
+    if missing:
+        print(f"not compared (only in one file): {', '.join(sorted(missing))}")
+
+    n_regressed = sum(row[-1] for row in rows)
+    print(f"{n_regressed} regression(s) out of {len(rows)} benchmarks")
+    return 1 if n_regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
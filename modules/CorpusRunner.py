@@ -0,0 +1,217 @@
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import time
+import traceback
+from modules.TriplesExtractor import TriplesExtractor
+from modules.streams import iter_chunks
+
+#extractor of the current worker process, loaded once by _init_worker
+_worker_extractor = None
+#traceback of a failed _init_worker, reported by every shard of the worker
+_worker_init_error = None
+
+
+class WorkerInitError(RuntimeError):
+    """A worker process could not build its TriplesExtractor (e.g. missing model)
+    """
+
+
+def _init_worker(extractor_kwargs:dict) -> None:
+    """Load the spacy model once per worker process
+
+    A failure is kept and raised by _extract_shard as WorkerInitError, instead
+    of killing the worker, which would only surface as a BrokenProcessPool.
+
+    Args:
+        extractor_kwargs (dict): keyword arguments of TriplesExtractor
+    """
+    global _worker_extractor, _worker_init_error
+    try:
+        _worker_extractor = TriplesExtractor(**extractor_kwargs)
+    except Exception:
+        _worker_init_error = traceback.format_exc()
+
+
+def _extract_shard(shard:list, batch_size:int) -> list:
+    """Extract semantic triples of one shard in a worker process
+
+    Args:
+        shard (list): (identifier, text) pairs
+        batch_size (int): number of texts per nlp.pipe batch
+
+    Returns:
+        tuple: (identifier, triples) pairs, number of unique texts parsed (None without dedup)
+    """
+    if _worker_init_error is not None:
+        raise WorkerInitError(f"worker initialization failed:\n{_worker_init_error}")
+    results = list(_worker_extractor.iter_semantic_triples(shard, batch_size))
+    return results, _worker_extractor.last_run_stats.get("unique_texts")
+
+
+class CorpusRunner:
+    """Shard a corpus across a process pool of TriplesExtractor workers
+    """
+
+    def __init__(self, trained_model="en_core_web_sm", n_workers=None, shard_size=1000,
+        batch_size=256, max_in_flight=None, start_method=None, **extractor_kwargs) -> None:
+        """Constructor
+
+        Args:
+            trained_model (str, optional): trained model to load from spacy. Defaults to "en_core_web_sm".
+            n_workers (int, optional): number of worker processes. Defaults to the number of cores.
+            shard_size (int, optional): texts per task sent to a worker. Defaults to 1000.
+            batch_size (int, optional): number of texts per nlp.pipe batch in a worker. Defaults to 256.
+            max_in_flight (int, optional): shards submitted but not yet yielded. Defaults to 2 * n_workers.
+            start_method (str, optional): multiprocessing start method. Defaults to the platform default.
+            **extractor_kwargs: further TriplesExtractor arguments (method, profile, engine, ...)
+        """
+        self.n_workers = n_workers or multiprocessing.cpu_count()
+        self.shard_size = shard_size
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight or 2 * self.n_workers
+        self.mp_context = multiprocessing.get_context(start_method)
+        self.extractor_kwargs = dict(extractor_kwargs, trained_model=trained_model)
+        self.failed_shards = []
+        self.last_run_stats = {}
+
+    def _executor(self, n_workers:int) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=n_workers,
+            mp_context=self.mp_context,
+            initializer=_init_worker,
+            initargs=(self.extractor_kwargs,),
+        )
+
+    def semantic_triples(self, identifier_lst:list, text_lst:list) -> dict:
+        """Generate semantic triples from unstructured texts in parallel
+
+        Args:
+            identifier_lst (list): identifier to individual texts
+            text_lst (list): texts to extract semantic triples
+
+        Returns:
+            dict: dictionary of identifiers(key) and semantic triples(values)
+        """
+
+        output_dict = {}
+
+        for identifier, svo_lst in self.iter_semantic_triples(zip(identifier_lst, text_lst)):
+            output_dict[identifier] = svo_lst
+
+        return output_dict
+
+    def iter_semantic_triples(self, pairs):
+        """Lazily generate semantic triples, in input order, from a stream of texts
+
+        At most max_in_flight shards are held in memory. A shard raising an
+        exception, or crashing its worker, is recorded in failed_shards and
+        skipped; the other shards still complete. A worker failing to load
+        the extractor raises WorkerInitError at once, as every shard would fail.
+        With dedup, texts are deduplicated within each shard and last_run_stats
+        gets the total unique_texts and dedup_ratio.
+
+        Args:
+            pairs (iterable): (identifier, text) pairs
+
+        Yields:
+            tuple: identifier, list of semantic triples
+        """
+
+        self.failed_shards = []
+        start = time.perf_counter()
+        n_docs = 0
+        self.n_unique_texts = 0
+        executor = self._executor(self.n_workers)
+        in_flight = deque()
+
+        try:
+            for index, shard in enumerate(iter_chunks(pairs, self.shard_size)):
+                in_flight.append((index, shard, self._submit(executor, shard)))
+
+                while len(in_flight) >= self.max_in_flight:
+                    executor, results = self._next_result(executor, in_flight)
+                    n_docs += len(results)
+                    yield from results
+
+            while in_flight:
+                executor, results = self._next_result(executor, in_flight)
+                n_docs += len(results)
+                yield from results
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            self.last_run_stats = TriplesExtractor.throughput_stats(n_docs, time.perf_counter() - start)
+            self.last_run_stats["workers"] = self.n_workers
+            self.last_run_stats["failed_shards"] = len(self.failed_shards)
+            if self.extractor_kwargs.get("dedup") is not None:
+                self.last_run_stats["unique_texts"] = self.n_unique_texts
+                self.last_run_stats["dedup_ratio"] = 1.0 - self.n_unique_texts / n_docs if n_docs else 0.0
+
+    def _next_result(self, executor:ProcessPoolExecutor, in_flight:deque):
+        """Wait for the oldest shard, recovering from a crashed pool
+
+        A worker crash breaks every pending future of the pool, so the oldest
+        shard is rerun alone to find out whether it caused the crash. In-flight
+        shards that had already finished keep their results; the unfinished
+        ones are resubmitted to a new pool.
+
+        Returns:
+            tuple: executor to use from now on, (identifier, triples) pairs of the shard
+        """
+        index, shard, future = in_flight.popleft()
+
+        try:
+            return executor, self._shard_results(future.result())
+        except WorkerInitError:
+            raise
+        except BrokenProcessPool:
+            executor.shutdown(wait=True, cancel_futures=True)
+            executor = self._executor(self.n_workers)
+            for i, (other_index, other_shard, other_future) in enumerate(in_flight):
+                #finished shards keep their result (or their own exception)
+                if other_future.done() and not isinstance(other_future.exception(), BrokenProcessPool):
+                    continue
+                in_flight[i] = (other_index, other_shard, self._submit(executor, other_shard))
+            return executor, self._run_isolated(index, shard)
+        except Exception as e:
+            self._record_failure(index, shard, e)
+            return executor, []
+
+    def _submit(self, executor:ProcessPoolExecutor, shard:list) -> Future:
+        """Submit a shard, a pool broken by an earlier crash gives a failed future
+
+        The failed future is handled by _next_result like any other shard of the
+        crashed pool, so shards submitted after the crash are rerun too.
+
+        Returns:
+            Future: future of the _extract_shard output
+        """
+        try:
+            return executor.submit(_extract_shard, shard, self.batch_size)
+        except BrokenProcessPool as e:
+            future = Future()
+            future.set_exception(e)
+            return future
+
+    def _run_isolated(self, index:int, shard:list) -> list:
+        with self._executor(1) as solo:
+            try:
+                return self._shard_results(solo.submit(_extract_shard, shard, self.batch_size).result())
+            except WorkerInitError:
+                raise
+            except Exception as e:
+                self._record_failure(index, shard, e)
+                return []
+
+    def _shard_results(self, shard_output:tuple) -> list:
+        results, n_unique_texts = shard_output
+        self.n_unique_texts += n_unique_texts or 0
+        return results
+
+    def _record_failure(self, index:int, shard:list, error:Exception) -> None:
+        self.failed_shards.append({
+            "shard" : index,
+            "identifiers" : [identifier for identifier, _ in shard],
+            "error" : repr(error),
+        })
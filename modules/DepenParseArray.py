@@ -0,0 +1,511 @@
+from typing import Tuple
+import numpy
+from spacy.attrs import DEP, HEAD, LOWER, POS
+from spacy.symbols import ADJ, ADP, DET, NOUN, PRON, VERB
+from spacy.tokens import Doc
+from modules.DepenParseBase import doc_scoped
+from modules.DepenParseProduct import DepenParseProduct
+
+class DocArrays:
+    """Integer view of a parsed Doc with precomputed child indexes.
+
+    Mirrors the DepenParseBase/DepenParseProduct rules on token indexes
+    instead of spacy Token objects.
+    """
+
+    #Instrumentation of the parser, set by DepenParseArray.doc_arrays
+    instrumentation = None
+
+    def __init__(self, doc:Doc, labels:dict) -> None:
+        """Constructor
+
+        Args:
+            doc (Doc): parsed spacy doc
+            labels (dict): rule sets and words as string ids, see DepenParseArray.label_ids
+        """
+        self.doc = doc
+        self.strings = doc.vocab.strings
+        n = len(doc)
+        arr = doc.to_array([HEAD, DEP, POS, LOWER])
+
+        #HEAD is a relative offset stored as uint64
+        self.head = (numpy.arange(n, dtype=numpy.int64) + arr[:, 0].view(numpy.int64)).tolist()
+        self.dep = arr[:, 1].tolist()
+        self.pos = arr[:, 2].tolist()
+        self.lower = arr[:, 3].tolist()
+
+        self.lefts = [[] for _ in range(n)]
+        self.rights = [[] for _ in range(n)]
+        lefts = self.lefts
+        rights = self.rights
+        for i, h in enumerate(self.head):
+            if h < i:
+                rights[h].append(i)
+            elif h > i:
+                lefts[h].append(i)
+
+        self.labels = labels
+        self.__dict__.update(labels)
+        self.phrases = {}
+
+    def word(self, i:int) -> str:
+        return self.strings[self.lower[i]]
+
+    def expand_conjunctions(self, toks:list, conjunct_deps:set) -> list:
+        moreToks = []
+        seen = set(toks)
+        stack = [iter(toks)]
+
+        while stack:
+            tok = next(stack[-1], None)
+            if tok is None:
+                stack.pop()
+                continue
+
+            rights = self.rights[tok]
+            if any(self.lower[i] == self.AND for i in rights):
+                conjuncts = [
+                    i for i in rights if i not in seen and
+                    (self.dep[i] in conjunct_deps or self.pos[i] == NOUN)
+                ]
+                seen.update(conjuncts)
+                moreToks.extend(conjuncts)
+                stack.append(iter(conjuncts))
+
+        return moreToks
+
+    def get_subs_from_conjunctions(self, subs:list) -> list:
+        return self.expand_conjunctions(subs, self.SUBJECTS)
+
+    def get_objs_from_conjunctions(self, objs:list) -> list:
+        return self.expand_conjunctions(objs, self.OBJECTS)
+
+    def find_subs(self, tok:int) -> Tuple[list, bool]:
+        head = self.head[tok]
+
+        while self.pos[head] != VERB and self.pos[head] != NOUN and self.head[head] != head:
+            head = self.head[head]
+
+        if self.pos[head] == VERB:
+            subs = [i for i in self.lefts[head] if self.dep[i] == self.SUB]
+            if len(subs) > 0:
+                verbNegated = self.is_negated(head)
+                subs.extend(self.get_subs_from_conjunctions(subs))
+                return subs, verbNegated
+            elif self.head[head] != head:
+                return self.find_subs(head)
+        elif self.pos[head] == NOUN:
+            return [head], self.is_negated(tok)
+
+        return [], False
+
+    def is_negated(self, tok:int) -> bool:
+        for i in self.lefts[tok]:
+            if self.lower[i] in self.NEGATIONS:
+                return True
+        for i in self.rights[tok]:
+            if self.lower[i] in self.NEGATIONS:
+                return True
+
+        return False
+
+    def get_objs_from_prepositions(self, deps:list) -> list:
+        objs = []
+        for dep in deps:
+            if self.pos[dep] == ADP and self.dep[dep] == self.PREP:
+                objs.extend(
+                    [i for i in self.rights[dep] if self.dep[i] in self.OBJECTS or
+                    (self.pos[i] == PRON and self.lower[i] == self.ME)]
+                )
+        return objs
+
+    def get_obj_from_xcomp(self, deps:list) -> Tuple[int, list]:
+        for dep in deps:
+            if self.pos[dep] == VERB and self.dep[dep] == self.XCOMP:
+                rights = self.rights[dep]
+                objs = [i for i in rights if self.dep[i] in self.OBJECTS]
+                objs.extend(self.get_objs_from_prepositions(rights))
+                if len(objs) > 0:
+                    return dep, objs
+
+        return None, None
+
+    def get_all_subs(self, v:int) -> Tuple[list, bool]:
+        verbNegated = self.is_negated(v)
+        subs = [i for i in self.lefts[v] if self.dep[i] in self.SUBJECTS and self.pos[i] != DET]
+
+        if len(subs) > 0:
+            subs.extend(self.get_subs_from_conjunctions(subs))
+        else:
+            foundSubs, verbNegated = self.find_subs(v)
+            subs.extend(foundSubs)
+
+        return subs, verbNegated
+
+    def get_all_objs(self, v:int) -> Tuple[int, list]:
+        rights = self.rights[v]
+        objs = [i for i in rights if self.dep[i] in self.OBJECTS]
+        objs.extend(self.get_objs_from_prepositions(rights))
+
+        potential_new_verb, potential_new_objs = self.get_obj_from_xcomp(rights)
+
+        if potential_new_verb is not None and potential_new_objs is not None and len(potential_new_objs) > 0:
+            objs.extend(potential_new_objs)
+            v = potential_new_verb
+
+        if len(objs) > 0:
+            objs.extend(self.get_objs_from_conjunctions(objs))
+
+        return v, objs
+
+    def get_all_objs_with_adjectives(self, v:int) -> Tuple[int, list]:
+        rights = self.rights[v]
+        objs = [i for i in rights if self.dep[i] in self.OBJECTS]
+
+        if len(objs) == 0:
+            objs = [i for i in rights if self.dep[i] in self.ADJECTIVES]
+
+        objs.extend(self.get_objs_from_prepositions(rights))
+
+        potential_new_verb, potential_new_objs = self.get_obj_from_xcomp(rights)
+
+        if potential_new_verb is not None and potential_new_objs is not None and len(potential_new_objs) > 0:
+            objs.extend(potential_new_objs)
+            v = potential_new_verb
+
+        if len(objs) > 0:
+            objs.extend(self.get_objs_from_conjunctions(objs))
+
+        return v, objs
+
+    def generate_sub_compound(self, sub:int) -> list:
+        key = ("compound", sub)
+        if key in self.phrases:
+            return self.phrases[key]
+
+        sub_compounds = []
+
+        for i in self.lefts[sub]:
+            if self.dep[i] in self.COMPOUNDS:
+                sub_compounds.extend(self.generate_sub_compound(i))
+        sub_compounds.append(sub)
+
+        for i in self.rights[sub]:
+            if self.dep[i] in self.COMPOUNDS:
+                sub_compounds.extend(self.generate_sub_compound(i))
+
+        self.phrases[key] = sub_compounds
+        return sub_compounds
+
+    def generate_left_right_adjectives(self, obj:int) -> list:
+        key = ("adjectives", obj)
+        if key in self.phrases:
+            return self.phrases[key]
+
+        obj_desc_tokens = []
+
+        for i in self.lefts[obj]:
+            if self.dep[i] in self.ADJECTIVES:
+                obj_desc_tokens.extend(self.generate_left_right_adjectives(i))
+        obj_desc_tokens.append(obj)
+
+        for i in self.rights[obj]:
+            if self.dep[i] in self.ADJECTIVES:
+                obj_desc_tokens.extend(self.generate_left_right_adjectives(i))
+
+        self.phrases[key] = obj_desc_tokens
+        return obj_desc_tokens
+
+    def sub_compound_phrase(self, sub:int) -> str:
+        key = ("compound_phrase", sub)
+        if key not in self.phrases:
+            self.phrases[key] = self.join(self.generate_sub_compound(sub))
+        return self.phrases[key]
+
+    def adjective_phrase(self, obj:int) -> str:
+        key = ("adjective_phrase", obj)
+        if key not in self.phrases:
+            self.phrases[key] = self.join(self.generate_left_right_adjectives(obj))
+        return self.phrases[key]
+
+    def join(self, toks:list) -> str:
+        return " ".join([self.strings[self.lower[i]] for i in toks])
+
+    def verbs(self) -> list:
+        return [i for i, pos in enumerate(self.pos) if pos == VERB]
+
+    def find_svos(self) -> list:
+        svos = []
+        verbs = [i for i in self.verbs() if self.dep[i] != self.AUX]
+
+        for v in verbs:
+            subs, verbNegated = self.get_all_subs(v)
+            if len(subs) > 0:
+                svos.extend(self.svos_from_verb(v, subs, verbNegated))
+
+        return svos
+
+    def find_svaos(self) -> list:
+        svos = []
+
+        for v in self.verbs():
+            subs, verbNegated = self.get_all_subs(v)
+            if len(subs) > 0:
+                v, objs = self.get_all_objs_with_adjectives(v)
+                svos.extend(self.svaos_from_verb(v, subs, verbNegated, objs))
+
+        return svos
+
+    def svos_from_verb(self, v:int, subs:list, verbNegated:bool) -> list:
+        svos = []
+        v, objs = self.get_all_objs(v)
+        for sub in subs:
+            for obj in objs:
+                objNegated = self.is_negated(obj)
+                svos.append(
+                    (self.word(sub), "!" + self.word(v) if verbNegated or objNegated
+                    else self.word(v), self.word(obj))
+                )
+
+        return svos
+
+    def svaos_from_verb(self, v:int, subs:list, verbNegated:bool, objs:list) -> list:
+        svos = []
+        for sub in subs:
+            for obj in objs:
+                objNegated = self.is_negated(obj)
+                svos.append((
+                    self.sub_compound_phrase(sub),
+                    "!" + self.word(v) if verbNegated or objNegated else self.word(v),
+                    self.adjective_phrase(obj)
+                ))
+
+        return svos
+
+    def extract_all(self, product, flavors:tuple) -> dict:
+        results = {flavor : [] for flavor in flavors}
+        with_product = "product" in flavors
+        if with_product:
+            results["reasons"] = []
+        verbs = self.verbs()
+
+        for v in verbs:
+            subs, verbNegated = self.get_all_subs(v)
+            objs_with_adjectives = None
+
+            if len(subs) > 0:
+                if "svos" in flavors and self.dep[v] != self.AUX:
+                    results["svos"].extend(self.svos_from_verb(v, subs, verbNegated))
+                if "svaos" in flavors:
+                    objs_with_adjectives = self.get_all_objs_with_adjectives(v)
+                    adj_v, objs = objs_with_adjectives
+                    results["svaos"].extend(self.svaos_from_verb(adj_v, subs, verbNegated, objs))
+
+            if with_product:
+                if objs_with_adjectives is None:
+                    objs_with_adjectives = self.get_all_objs_with_adjectives(v)
+                svo, reasons = self.triplets_from_verb(
+                    product, v, subs, verbNegated, objs_with_adjectives
+                )
+                results["product"] += svo
+                results["reasons"] += reasons
+
+        if with_product and not verbs:
+            results["product"], results["reasons"] = self.triplets_without_verbs(product)
+
+        return results
+
+    def triplets_with_subs_and_objs(self, product, verb:int, verb_negated:bool, subs:list, objs:list) -> list:
+        res = []
+        for sub in subs:
+            for obj in objs:
+                objNegated = self.is_negated(obj)
+                negation = ""
+                if verb_negated or objNegated:
+                    negation = self.NEGATION
+                _subject = self.sub_compound_phrase(sub)
+
+                predicate = f"{negation}{self.word(verb)}"
+                if _subject and (not _subject.isspace()):
+                    predicate = f"{_subject} {negation}{self.word(verb)}"
+
+                _object = self.adjective_phrase(obj)
+                res.append((product, predicate, _object))
+        return res
+
+    def triplets_with_subs(self, product, verb:int, verb_negated:bool, subs:list) -> list:
+        res = []
+        for sub in subs:
+            subNegated = self.is_negated(sub)
+            _subject = self.sub_compound_phrase(sub)
+
+            negation = ""
+            if verb_negated or subNegated:
+                negation = self.NEGATION
+            predicate = f"{negation}{self.word(verb)}"
+            res.append((product, predicate, _subject))
+        return res
+
+    def triplets_with_objs(self, product, verb:int, verb_negated:bool, objs:list) -> list:
+        res = []
+        for obj in objs:
+            objNegated = self.is_negated(obj)
+
+            negation = ""
+            if verb_negated or objNegated:
+                negation = self.NEGATION
+            predicate = f"{negation}{self.word(verb)}"
+
+            _object = self.adjective_phrase(obj)
+            res.append((product, predicate, _object))
+        return res
+
+    def triplets_without_verbs(self, product) -> Tuple[list, list]:
+        res = []
+        reasons = []
+        adjs = [i for i, pos in enumerate(self.pos) if pos == ADJ]
+        final_adj_pos = adjs[-1] if adjs else 0
+        nouns = [i for i in range(final_adj_pos, len(self.pos)) if self.pos[i] == NOUN]
+        if adjs and nouns:
+            res.append((product, self.join(adjs), self.join(nouns)))
+        else:
+            reasons.append("missing verbs, adj and nouns")
+
+        return res, reasons
+
+    def triplets_with_verbs(self, product, verbs:list) -> Tuple[list, list]:
+        res = []
+        reasons = []
+        for v in verbs:
+            subs, verb_negated = self.get_all_subs(v)
+            objs_with_adjectives = self.get_all_objs_with_adjectives(v)
+            svo, reason = self.triplets_from_verb(product, v, subs, verb_negated, objs_with_adjectives)
+            res += svo
+            reasons += reason
+        return res, reasons
+
+    def triplets_from_verb(self, product, v:int, subs:list, verb_negated:bool,
+        objs_with_adjectives:tuple) -> Tuple[list, list]:
+        res = []
+        reasons = []
+        if subs:
+            v, objs = objs_with_adjectives
+            if objs:
+                res += self.triplets_with_subs_and_objs(product, v, verb_negated, subs, objs)
+            else:
+                res += self.triplets_with_subs(product, v, verb_negated, subs)
+        else:
+            _, objs = objs_with_adjectives
+            if objs:
+                res += self.triplets_with_objs(product, v, verb_negated, objs)
+            else:
+                reasons.append(f"missing object and subject for verb {self.doc[v]}")
+        return res, reasons
+
+    def product_triplets(self, product) -> Tuple[list, list]:
+        verbs = self.verbs()
+        if verbs:
+            return self.triplets_with_verbs(product, verbs)
+
+        return self.triplets_without_verbs(product)
+
+
+class DepenParseArray(DepenParseProduct):
+    """Array-backed dependency parsing giving the same triples as DepenParseProduct.
+
+    find_svos, find_svaos and product_triplets run on integer arrays from
+    Doc.to_array instead of walking Token objects. Inputs that are not a Doc,
+    and requests for Triple records, fall back to the Token-based implementation.
+
+    Args:
+        DepenParseProduct ([type]): Token-based rules this engine mirrors
+    """
+
+    def __init__(self):
+        super().__init__()
+
+    def label_ids(self, strings) -> dict:
+        """Convert the rule sets to string ids, reusing the last result while the rules are unchanged
+
+        Args:
+            strings (StringStore): string store of the docs
+
+        Returns:
+            dict: rule sets and words as ids, set as attributes of DocArrays
+        """
+        key = (
+            self.NEGATION, tuple(self.SUBJECTS), tuple(self.OBJECTS),
+            tuple(self.ADJECTIVES), tuple(self.COMPOUNDS)
+        )
+        if getattr(self, "_label_key", None) == key:
+            return self._label_ids
+
+        self._label_key = key
+        self._label_ids = {
+            "NEGATION" : self.NEGATION,
+            "SUBJECTS" : {strings[label] for label in self.SUBJECTS},
+            "OBJECTS" : {strings[label] for label in self.OBJECTS},
+            "ADJECTIVES" : {strings[label] for label in self.ADJECTIVES},
+            "COMPOUNDS" : {strings[label] for label in self.COMPOUNDS},
+            "NEGATIONS" : {strings[word] for word in ("no", "not", "n't", "never", "none")},
+            "AND" : strings["and"],
+            "ME" : strings["me"],
+            "SUB" : strings["SUB"],
+            "AUX" : strings["aux"],
+            "PREP" : strings["prep"],
+            "XCOMP" : strings["xcomp"],
+        }
+        return self._label_ids
+
+    def doc_arrays(self, doc:Doc) -> DocArrays:
+        """Build the integer view of a doc, reused by every rule run within one doc_scope
+
+        Args:
+            doc (Doc): parsed spacy doc
+
+        Returns:
+            DocArrays: arrays, child indexes and phrase memo of the doc
+        """
+        labels = self.label_ids(doc.vocab.strings)
+        cache = self.doc_cache(doc)
+        arrays = cache.get("arrays")
+
+        if arrays is None or arrays.labels is not labels:
+            arrays = DocArrays(doc, labels)
+            if self.instrumentation is not None:
+                #swaps in the instrumented subclass of DocArrays, no closures are built per doc
+                self.instrumentation.instrument_rules(arrays)
+            cache["arrays"] = arrays
+
+        return arrays
+
+    #Triple records need token offsets, they are built by the Token-based rules
+    @doc_scoped(0)
+    def find_svos(self, tokens:list, records=False) -> list:
+        if records or not isinstance(tokens, Doc):
+            return super().find_svos(tokens, records)
+        return self.doc_arrays(tokens).find_svos()
+
+    @doc_scoped(0)
+    def find_svaos(self, tokens:list, records=False) -> list:
+        if records or not isinstance(tokens, Doc):
+            return super().find_svaos(tokens, records)
+        return self.doc_arrays(tokens).find_svaos()
+
+    @doc_scoped(1)
+    def product_triplets(self, product, tokens, records=False):
+        if records or not isinstance(tokens, Doc):
+            return super().product_triplets(product, tokens, records)
+        return self.doc_arrays(tokens).product_triplets(product)
+
+    @doc_scoped(0)
+    def find_all(self, tokens:list, flavors=("svos", "svaos")) -> dict:
+        if not isinstance(tokens, Doc):
+            return super().find_all(tokens, flavors)
+        return self.doc_arrays(tokens).extract_all(None, flavors)
+
+    @doc_scoped(1)
+    def extract_all(self, product, tokens, flavors=("svos", "svaos", "product")) -> dict:
+        if not isinstance(tokens, Doc):
+            return super().extract_all(product, tokens, flavors)
+        return self.doc_arrays(tokens).extract_all(product, flavors)
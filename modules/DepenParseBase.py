@@ -1,5 +1,29 @@
+from contextlib import contextmanager
+from functools import wraps
 from typing import Tuple
+import threading
 from spacy.tokens import Token
+from modules.Triple import Triple
+
+
+def doc_scoped(tokens_index:int):
+    """Run a rule entry point inside DepenParseBase.doc_scope of its tokens
+
+    Args:
+        tokens_index (int): position of the tokens argument, after self
+
+    Returns:
+        callable: decorator
+    """
+    def decorator(method):
+        @wraps(method)
+        def scoped_method(self, *args, **kwargs):
+            tokens = args[tokens_index] if len(args) > tokens_index else kwargs.get("tokens")
+            with self.doc_scope(tokens):
+                return method(self, *args, **kwargs)
+        return scoped_method
+    return decorator
+
 
 class DepenParseBase:
     """Base Class for dependency parsing
@@ -9,6 +33,10 @@ class DepenParseBase:
         """Contructor
         """
         self.initialize_vars()
+        #doc and memo of the running doc_scope, per thread
+        self._scope = threading.local()
+        #Instrumentation attached by Instrumentation.instrument_parser, None when disabled
+        self.instrumentation = None
 
     def initialize_vars(self):
         """Inititialize object variables
@@ -24,6 +52,103 @@ class DepenParseBase:
         self.COMPOUNDS = ["compound"]
         self.PREPOSITIONS = ["prep"]
 
+    @contextmanager
+    def doc_scope(self, tokens):
+        """Share one memo between the rules run on the doc of tokens until the scope exits
+
+        Entry points (find_svos, find_svaos, find_all, product_triplets, extract_all)
+        open a scope, so phrases are memoized within one call and the memo, with its
+        reference to the doc, is dropped when the call returns. Rule lists cannot
+        change during a call, so memoized values never go stale. Scopes are per
+        thread; a nested scope on the same doc reuses the outer memo.
+
+        Args:
+            tokens (Doc, Span or list): spacy tokens of one doc
+        """
+        doc = getattr(tokens, "doc", None)
+        if doc is None and tokens is not None and len(tokens) > 0:
+            doc = getattr(tokens[0], "doc", None)
+
+        scope = self._scope
+        outer = (getattr(scope, "doc", None), getattr(scope, "memo", None))
+        if doc is None or outer[0] is doc:
+            yield
+            return
+
+        scope.doc, scope.memo = doc, {}
+        try:
+            yield
+        finally:
+            scope.doc, scope.memo = outer
+
+    def doc_cache(self, doc) -> dict:
+        """Memo of the doc_scope running on doc
+
+        Args:
+            doc (Doc): spacy doc the cached values belong to
+
+        Returns:
+            dict: memo of the doc, a throwaway dict outside a scope on doc
+        """
+        scope = self._scope
+        if getattr(scope, "doc", None) is doc:
+            return scope.memo
+        return {}
+
+    def sentence_starts(self, doc):
+        """Token index of every sentence start, used to locate Triple records
+
+        Args:
+            doc (Doc): spacy doc
+
+        Returns:
+            list: sorted sentence start indexes, None if the doc has no sentence boundaries
+        """
+        cache = self.doc_cache(doc)
+        if "sent_starts" not in cache:
+            if doc.has_annotation("SENT_START"):
+                cache["sent_starts"] = [sent.start for sent in doc.sents]
+            else:
+                cache["sent_starts"] = None
+        return cache["sent_starts"]
+
+    def expand_conjunctions(self, toks:list, is_conjunct) -> list:
+        """Collect tokens coordinated with the given tokens ("x, y and z")
+
+        Tokens whose right children include "and" contribute the right children
+        accepted by is_conjunct, which are then expanded in turn. Each token is
+        visited once, so the result has no duplicates and is linear in the size
+        of the coordination.
+
+        Args:
+            toks (list): list of tokens to expand
+            is_conjunct (callable): predicate selecting coordinated right children
+
+        Returns:
+            list: list of coordinated tokens, excluding the input tokens
+        """
+
+        moreToks = []
+        seen = {tok.i for tok in toks}
+        stack = [iter(toks)]
+
+        while stack:
+            tok = next(stack[-1], None)
+            if tok is None:
+                stack.pop()
+                continue
+
+            rights = list(tok.rights)
+            if any(right.lower_ == "and" for right in rights):
+                conjuncts = [
+                    right for right in rights if right.i not in seen and is_conjunct(right)
+                ]
+                seen.update(right.i for right in conjuncts)
+                moreToks.extend(conjuncts)
+                stack.append(iter(conjuncts))
+
+        return moreToks
+
     def get_subs_from_conjunctions(self, subs:list) -> list:
         """Search for more subjects given list of subjects
 
@@ -33,21 +158,10 @@ class DepenParseBase:
         Returns:
             list: list of expanded subjects
         """
-        
-        moreSubs = []
-
-        for sub in subs:
-
-            rights = list(sub.rights)
-            rightDeps = {tok.lower_ for tok in rights}
-            if "and" in rightDeps:
-                moreSubs.extend([
-                    tok for tok in rights if tok.dep_ in self.SUBJECTS or tok.pos_ == "NOUN"
-                ])
-                if len(moreSubs) > 0:
-                    moreSubs.extend(self.get_subs_from_conjunctions(moreSubs))
 
-        return moreSubs
+        return self.expand_conjunctions(
+            subs, lambda tok: tok.dep_ in self.SUBJECTS or tok.pos_ == "NOUN"
+        )
 
     def get_objs_from_conjunctions(self, objs:list) -> list:
         """Search for more objects given list of objects
@@ -59,20 +173,9 @@ class DepenParseBase:
             list: list of expanded objects
         """
 
-        moreObjs = []
-        
-        for obj in objs:
-
-            rights = list(obj.rights)
-            rightDeps = {tok.lower_ for tok in rights}
-            if "and" in rightDeps:
-                moreObjs.extend([
-                    tok for tok in rights if tok.dep_ in self.OBJECTS or tok.pos_ == "NOUN"
-                ])
-                if len(moreObjs) > 0:
-                    moreObjs.extend(self.get_objs_from_conjunctions(moreObjs))
-        
-        return moreObjs
+        return self.expand_conjunctions(
+            objs, lambda tok: tok.dep_ in self.OBJECTS or tok.pos_ == "NOUN"
+        )
 
     def get_verbs_from_conjunctions(self, verbs:list) -> list:
         """Search for more verbs given list of verbs
@@ -83,18 +186,8 @@ class DepenParseBase:
         Returns:
             list: list of expanded verbs
         """
-        
-        moreVerbs = []
-
-        for verb in verbs:
 
-            rightDeps = {tok.lower_ for tok in verb.rights}
-            if "and" in rightDeps:
-                moreVerbs.extend([tok for tok in verb.rights if tok.pos_ == "VERB"])
-                if len(moreVerbs) > 0:
-                    moreVerbs.extend(self.get_verbs_from_conjunctions(moreVerbs))
-
-        return moreVerbs
+        return self.expand_conjunctions(verbs, lambda tok: tok.pos_ == "VERB")
 
     def find_subs(self, tok:Token) -> Tuple[list, bool]:
         """Find subjects from given token
@@ -367,11 +460,13 @@ class DepenParseBase:
         
         return v, objs
 
-    def find_svos(self, tokens:list) -> list:
+    @doc_scoped(0)
+    def find_svos(self, tokens:list, records=False) -> list:
         """Find semantic triples (subject-verb-object)
 
         Args:
             tokens (list): list of spacy tokens
+            records (bool, optional): emit Triple records with offsets instead of tuples. Defaults to False.
 
         Returns:
             list: list of semantic triples
@@ -382,22 +477,17 @@ class DepenParseBase:
             subs, verbNegated = self.get_all_subs(v)
             # hopefully there are subs, if not, don't examine this verb any longer
             if len(subs) > 0:
-                v, objs = self.get_all_objs(v)
-                for sub in subs:
-                    for obj in objs:
-                        objNegated = self.is_negated(obj)
-                        svos.append(
-                            (sub.lower_, "!" + v.lower_ if verbNegated or objNegated 
-                            else v.lower_, obj.lower_)
-                        )
+                svos.extend(self.svos_from_verb(v, subs, verbNegated, records))
         
         return svos
 
-    def find_svaos(self, tokens:list) -> list:
+    @doc_scoped(0)
+    def find_svaos(self, tokens:list, records=False) -> list:
         """Find semantic triples (subject-adjective_verb-objects)
 
         Args:
             tokens (list): list of spacy tokens
+            records (bool, optional): emit Triple records with offsets instead of tuples. Defaults to False.
 
         Returns:
             list: list of semantic triples
@@ -410,17 +500,115 @@ class DepenParseBase:
             # hopefully there are subs, if not, don't examine this verb any longer
             if len(subs) > 0:
                 v, objs = self.get_all_objs_with_adjectives(v)
-                for sub in subs:
-                    for obj in objs:
-                        objNegated = self.is_negated(obj)
-                        obj_desc_tokens = self.generate_left_right_adjectives(obj)
-                        sub_compound = self.generate_sub_compound(sub)
-                        svos.append((" ".join(tok.lower_ for tok in sub_compound), 
-                        "!" + v.lower_ if verbNegated or objNegated else v.lower_, 
-                        " ".join(tok.lower_ for tok in obj_desc_tokens)))
+                svos.extend(self.svaos_from_verb(v, subs, verbNegated, objs, records))
         
         return svos
 
+    def svos_from_verb(self, v:Token, subs:list, verbNegated:bool, records=False) -> list:
+        """Subject-verb-object triples of one verb with known subjects
+
+        Args:
+            v (Token): verb token
+            subs (list): subjects of the verb
+            verbNegated (bool): if the verb is negated
+            records (bool, optional): emit Triple records instead of tuples. Defaults to False.
+
+        Returns:
+            list: list of semantic triples
+        """
+        svos = []
+        v, objs = self.get_all_objs(v)
+        for sub in subs:
+            for obj in objs:
+                objNegated = self.is_negated(obj)
+                svo = (sub.lower_, "!" + v.lower_ if verbNegated or objNegated 
+                    else v.lower_, obj.lower_)
+                if records:
+                    svo = Triple.from_tokens(
+                        *svo, verbNegated or objNegated, 
+                        [sub], [v], [obj], self.sentence_starts(v.doc)
+                    )
+                svos.append(svo)
+
+        return svos
+
+    def svaos_from_verb(self, v:Token, subs:list, verbNegated:bool, objs:list, records=False) -> list:
+        """Subject-adjective_verb-object triples of one verb with known subjects and objects
+
+        Args:
+            v (Token): verb token returned by get_all_objs_with_adjectives
+            subs (list): subjects of the verb
+            verbNegated (bool): if the verb is negated
+            objs (list): objects with adjectives returned by get_all_objs_with_adjectives
+            records (bool, optional): emit Triple records instead of tuples. Defaults to False.
+
+        Returns:
+            list: list of semantic triples
+        """
+        svos = []
+        for sub in subs:
+            for obj in objs:
+                objNegated = self.is_negated(obj)
+                svo = (self.sub_compound_phrase(sub), 
+                "!" + v.lower_ if verbNegated or objNegated else v.lower_, 
+                self.adjective_phrase(obj))
+                if records:
+                    svo = Triple.from_tokens(
+                        *svo, verbNegated or objNegated, 
+                        self.generate_sub_compound(sub), [v], 
+                        self.generate_left_right_adjectives(obj), self.sentence_starts(v.doc)
+                    )
+                svos.append(svo)
+
+        return svos
+
+    @doc_scoped(0)
+    def find_all(self, tokens:list, flavors=("svos", "svaos")) -> dict:
+        """Find several flavors of semantic triples in one pass over the verbs
+
+        Subjects are discovered once per verb and shared by every flavor. Each
+        flavor is identical to calling the matching find_* method.
+
+        Args:
+            tokens (list): list of spacy tokens
+            flavors (tuple, optional): any of "svos", "svaos". Defaults to ("svos", "svaos").
+
+        Returns:
+            dict: flavor(key) and list of semantic triples(values)
+        """
+        results = {flavor : [] for flavor in flavors}
+
+        for tok in tokens:
+            if tok.pos_ == "VERB":
+                self.verb_triples(tok, flavors, results)
+
+        return results
+
+    def verb_triples(self, v:Token, flavors:tuple, results:dict) -> Tuple[list, bool, tuple]:
+        """Add the triples of one verb to results for every requested flavor
+
+        Args:
+            v (Token): verb token
+            flavors (tuple): any of "svos", "svaos"
+            results (dict): flavor(key) and list of semantic triples(values), updated in place
+
+        Returns:
+            Tuple[list, bool, tuple]: subjects, verb is negated or not, 
+                result of get_all_objs_with_adjectives (None if it was not needed)
+        """
+        subs, verbNegated = self.get_all_subs(v)
+        objs_with_adjectives = None
+
+        if len(subs) > 0:
+            if "svos" in flavors and v.dep_ != "aux":
+                results["svos"].extend(self.svos_from_verb(v, subs, verbNegated))
+            if "svaos" in flavors:
+                objs_with_adjectives = self.get_all_objs_with_adjectives(v)
+                adj_v, objs = objs_with_adjectives
+                results["svaos"].extend(self.svaos_from_verb(adj_v, subs, verbNegated, objs))
+
+        return subs, verbNegated, objs_with_adjectives
+
     def generate_sub_compound(self, sub:Token) -> list:
         """Generate compounds to the left/right of given subject
 
@@ -431,18 +619,24 @@ class DepenParseBase:
             list: list of compounds of the input
         """
 
-        sub_compounds = []
-        
-        for tok in sub.lefts:
-            if tok.dep_ in self.COMPOUNDS:
-                sub_compounds.extend(self.generate_sub_compound(tok))
-        sub_compounds.append(sub)
-        
-        for tok in sub.rights:
-            if tok.dep_ in self.COMPOUNDS:
-                sub_compounds.extend(self.generate_sub_compound(tok))
-        
-        return sub_compounds
+        cache = self.doc_cache(sub.doc)
+        key = ("compound", sub.i)
+
+        if key not in cache:
+            sub_compounds = []
+
+            for tok in sub.lefts:
+                if tok.dep_ in self.COMPOUNDS:
+                    sub_compounds.extend(self.generate_sub_compound(tok))
+            sub_compounds.append(sub)
+
+            for tok in sub.rights:
+                if tok.dep_ in self.COMPOUNDS:
+                    sub_compounds.extend(self.generate_sub_compound(tok))
+
+            cache[key] = sub_compounds
+
+        return list(cache[key])
 
     def generate_left_right_adjectives(self, obj:Token) -> list:
         """Generate adjectives to the left/right of the given object
@@ -453,14 +647,57 @@ class DepenParseBase:
         Returns:
             list: list of adjectives of the input
         """
-        obj_desc_tokens = []
-        for tok in obj.lefts:
-            if tok.dep_ in self.ADJECTIVES:
-                obj_desc_tokens.extend(self.generate_left_right_adjectives(tok))
-        obj_desc_tokens.append(obj)
-
-        for tok in obj.rights:
-            if tok.dep_ in self.ADJECTIVES:
-                obj_desc_tokens.extend(self.generate_left_right_adjectives(tok))
-        
-        return obj_desc_tokens
\ No newline at end of file
+
+        cache = self.doc_cache(obj.doc)
+        key = ("adjectives", obj.i)
+
+        if key not in cache:
+            obj_desc_tokens = []
+            for tok in obj.lefts:
+                if tok.dep_ in self.ADJECTIVES:
+                    obj_desc_tokens.extend(self.generate_left_right_adjectives(tok))
+            obj_desc_tokens.append(obj)
+
+            for tok in obj.rights:
+                if tok.dep_ in self.ADJECTIVES:
+                    obj_desc_tokens.extend(self.generate_left_right_adjectives(tok))
+
+            cache[key] = obj_desc_tokens
+
+        return list(cache[key])
+
+    def sub_compound_phrase(self, sub:Token) -> str:
+        """Lowercased phrase of the subject and its compounds, built once per doc
+
+        Args:
+            sub (Token): spacy subject token
+
+        Returns:
+            str: subject phrase
+        """
+
+        cache = self.doc_cache(sub.doc)
+        key = ("compound_phrase", sub.i)
+
+        if key not in cache:
+            cache[key] = " ".join(tok.lower_ for tok in self.generate_sub_compound(sub))
+
+        return cache[key]
+
+    def adjective_phrase(self, obj:Token) -> str:
+        """Lowercased phrase of the object and its adjectives, built once per doc
+
+        Args:
+            obj (Token): spacy object token
+
+        Returns:
+            str: object phrase
+        """
+
+        cache = self.doc_cache(obj.doc)
+        key = ("adjective_phrase", obj.i)
+
+        if key not in cache:
+            cache[key] = " ".join(tok.lower_ for tok in self.generate_left_right_adjectives(obj))
+
+        return cache[key]
@@ -1,4 +1,5 @@
-from modules.DepenParseBase import DepenParseBase
+from modules.DepenParseBase import DepenParseBase, doc_scoped
+from modules.Triple import Triple
 
 class DepenParseProduct(DepenParseBase):
     """Dependancy parsing that is more suited for product based texts
@@ -10,56 +11,86 @@ class DepenParseProduct(DepenParseBase):
     def __init__(self):
         super().__init__()
 
-    def triplets_with_subs_and_objs(self, product, verb, verb_negated, subs, objs):
+    def product_record(self, svo:tuple, negated:bool, predicate_toks:list, object_toks:list) -> Triple:
+        """Triple record of a product triplet, the product subject has no span
+
+        Args:
+            svo (tuple): product, predicate, object
+            negated (bool): if the predicate is negated
+            predicate_toks (list): tokens of the predicate
+            object_toks (list): tokens of the object
+
+        Returns:
+            Triple: record with the offsets of the predicate and object
+        """
+        doc = (predicate_toks or object_toks)[0].doc
+        return Triple.from_tokens(
+            *svo, negated, [], predicate_toks, object_toks, self.sentence_starts(doc)
+        )
+
+    def triplets_with_subs_and_objs(self, product, verb, verb_negated, subs, objs, records=False):
         res = []
         for sub in subs:
             for obj in objs:
                 objNegated = self.is_negated(obj)
-                obj_desc_tokens = self.generate_left_right_adjectives(obj)
-                sub_compound = self.generate_sub_compound(sub)
                 negation = ""
                 if verb_negated or objNegated:
                     negation = self.NEGATION
-                _subject = " ".join(tok.lower_ for tok in sub_compound)
+                _subject = self.sub_compound_phrase(sub)
 
                 predicate = f"{negation}{verb.lower_}"
-                if _subject and (not _subject.isspace()): 
+                has_subject = _subject and (not _subject.isspace())
+                if has_subject: 
                     predicate = f"{_subject} {negation}{verb.lower_}"
                     
-                _object = " ".join(tok.lower_ for tok in obj_desc_tokens)
-                res.append((product, predicate, _object))
+                _object = self.adjective_phrase(obj)
+                svo = (product, predicate, _object)
+                if records:
+                    predicate_toks = self.generate_sub_compound(sub) + [verb] if has_subject else [verb]
+                    svo = self.product_record(
+                        svo, bool(negation), predicate_toks, self.generate_left_right_adjectives(obj)
+                    )
+                res.append(svo)
         return res
 
-    def triplets_with_subs(self, product, verb, verb_negated, subs):
+    def triplets_with_subs(self, product, verb, verb_negated, subs, records=False):
         res = []
         for sub in subs:
             subNegated = self.is_negated(sub)
-            sub_compound = self.generate_sub_compound(sub)
-            _subject = " ".join(tok.lower_ for tok in sub_compound)
+            _subject = self.sub_compound_phrase(sub)
 
             negation = ""
             if verb_negated or subNegated:
                 negation = self.NEGATION
             predicate = f"{negation}{verb.lower_}"
-            res.append((product, predicate, _subject))
+            svo = (product, predicate, _subject)
+            if records:
+                svo = self.product_record(
+                    svo, bool(negation), [verb], self.generate_sub_compound(sub)
+                )
+            res.append(svo)
         return res
 
-    def triplets_with_objs(self, product, verb, verb_negated, objs):
+    def triplets_with_objs(self, product, verb, verb_negated, objs, records=False):
         res = []
         for obj in objs:
             objNegated = self.is_negated(obj)
-            obj_desc_tokens = self.generate_left_right_adjectives(obj)
-            
+
             negation = ""
             if verb_negated or objNegated:
                 negation = self.NEGATION
             predicate = f"{negation}{verb.lower_}"
 
-            _object = " ".join(tok.lower_ for tok in obj_desc_tokens)
-            res.append((product, predicate, _object))
+            _object = self.adjective_phrase(obj)
+            svo = (product, predicate, _object)
+            if records:
+                svo = self.product_record(
+                    svo, bool(negation), [verb], self.generate_left_right_adjectives(obj)
+                )
+            res.append(svo)
         return res
 
-    def triplets_without_verbs(self, product, tokens):
+    def triplets_without_verbs(self, product, tokens, records=False):
         res = []
         reasons = []
         adjs, nouns = self.chain_adjectives_before_nouns(tokens)
@@ -67,44 +98,113 @@ class DepenParseProduct(DepenParseBase):
             predicate = " ".join(tok.lower_ for tok in adjs)
             _object = " ".join(tok.lower_ for tok in nouns)
             #print(f"case 4 : {(product, predicate, _object)}")
-            res.append((product, predicate, _object))
+            svo = (product, predicate, _object)
+            if records:
+                svo = self.product_record(svo, False, adjs, nouns)
+            res.append(svo)
         else:
             reasons.append("missing verbs, adj and nouns")
             
         return res, reasons
     
-    def triplets_with_verbs(self, product, verbs):
+    def triplets_with_verbs(self, product, verbs, records=False):
         res = []
         reasons = []
         for v in verbs:
-            subs, verb_negated = self.get_all_subs(v)    
-            if subs:
-                #subject exists
-                v, objs = self.get_all_objs_with_adjectives(v)
-                if objs:
-                    #subject and object exist
-                    res += self.triplets_with_subs_and_objs(product, v, verb_negated, subs, objs)
-                else:
-                    #only subject exist but not object
-                    res += self.triplets_with_subs(product, v, verb_negated, subs)
+            subs, verb_negated = self.get_all_subs(v)
+            objs_with_adjectives = self.get_all_objs_with_adjectives(v)
+            svo, reason = self.triplets_from_verb(
+                product, v, subs, verb_negated, objs_with_adjectives, records
+            )
+            res += svo
+            reasons += reason
+        return res, reasons
+
+    def triplets_from_verb(self, product, v, subs, verb_negated, objs_with_adjectives, records=False):
+        res = []
+        reasons = []
+        if subs:
+            #subject exists
+            v, objs = objs_with_adjectives
+            if objs:
+                #subject and object exist
+                res += self.triplets_with_subs_and_objs(product, v, verb_negated, subs, objs, records)
+            else:
+                #only subject exist but not object
+                res += self.triplets_with_subs(product, v, verb_negated, subs, records)
+        else:
+            #only object exist but not subject
+            _, objs = objs_with_adjectives
+            if objs:
+                res += self.triplets_with_objs(product, v, verb_negated, objs, records)
             else:
-                #only object exist but not subject
-                _, objs = self.get_all_objs_with_adjectives(v)
-                if objs:
-                    res += self.triplets_with_objs(product, v, verb_negated, objs)
-                else:
-                    reasons.append(f"missing object and subject for verb {v}")
+                reasons.append(f"missing object and subject for verb {v}")
         return res, reasons
 
-    def product_triplets(self, product, tokens):
+    @doc_scoped(1)
+    def product_triplets(self, product, tokens, records=False):
+        """Triplets about a product, with reasons for verbs that gave none
+
+        Args:
+            product: product the triplets are about, used as their subject
+            tokens (list): list of spacy tokens
+            records (bool, optional): emit Triple records with offsets instead of tuples,
+                the product subject has no span. Defaults to False.
+
+        Returns:
+            Tuple[list, list]: list of semantic triples, list of reasons
+        """
         svos = []
         reasons = []
         verbs = [tok for tok in tokens if tok.pos_ == "VERB"] 
         if verbs:
-            svo, reasons = self.triplets_with_verbs(product, verbs)
+            svo, reasons = self.triplets_with_verbs(product, verbs, records)
             svos += svo
         else:
-            svo, reasons = self.triplets_without_verbs(product, tokens)
+            svo, reasons = self.triplets_without_verbs(product, tokens, records)
             svos += svo
 
-        return svos, reasons
\ No newline at end of file
+        return svos, reasons
+
+    @doc_scoped(1)
+    def extract_all(self, product, tokens, flavors=("svos", "svaos", "product")) -> dict:
+        """Find svos, svaos and product triplets in one pass over the verbs
+
+        Subjects and objects are discovered once per verb and shared by every
+        flavor. Each flavor is identical to calling find_svos, find_svaos or
+        product_triplets; "reasons" holds the product_triplets reasons.
+
+        Args:
+            product: product the product triplets are about
+            tokens (list): list of spacy tokens
+            flavors (tuple, optional): any of "svos", "svaos", "product". 
+                Defaults to ("svos", "svaos", "product").
+
+        Returns:
+            dict: flavor(key) and list of semantic triples(values), plus "reasons" 
+                if product triplets are requested
+        """
+        results = {flavor : [] for flavor in flavors}
+        with_product = "product" in flavors
+        if with_product:
+            results["reasons"] = []
+        has_verbs = False
+
+        for tok in tokens:
+            if tok.pos_ != "VERB":
+                continue
+            has_verbs = True
+            subs, verb_negated, objs_with_adjectives = self.verb_triples(tok, flavors, results)
+            if with_product:
+                if objs_with_adjectives is None:
+                    objs_with_adjectives = self.get_all_objs_with_adjectives(tok)
+                svo, reasons = self.triplets_from_verb(
+                    product, tok, subs, verb_negated, objs_with_adjectives
+                )
+                results["product"] += svo
+                results["reasons"] += reasons
+
+        if with_product and not has_verbs:
+            results["product"], results["reasons"] = self.triplets_without_verbs(product, tokens)
+
+        return results
@@ -0,0 +1,308 @@
+import argparse
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import json
+import logging
+import time
+from modules.Triple import triple_to_json
+from modules.TriplesExtractor import TriplesExtractor
+
+logger = logging.getLogger(__name__)
+
+HTTP_REASONS = {200 : "OK", 400 : "Bad Request", 404 : "Not Found", 500 : "Internal Server Error"}
+
+
+class ExtractionService:
+    """Asyncio HTTP service gathering concurrent requests into micro-batches.
+
+    Endpoints:
+        POST /extract  {"id": ..., "text": ...} -> {"id": ..., "triples": [...], "reasons": [...]},
+                       triples are Triple records (as their to_dict) if the extractor has records set
+        GET /metrics   request, batch and latency statistics
+        GET /health    liveness check
+    """
+
+    def __init__(self, extractor:TriplesExtractor, max_batch=32, max_wait=0.01, latency_window=10000) -> None:
+        """Constructor
+
+        Args:
+            extractor (TriplesExtractor): extractor whose model parses the texts
+            max_batch (int, optional): maximum texts parsed together. Defaults to 32.
+            max_wait (float, optional): seconds a request waits for others to join its batch. Defaults to 0.01.
+            latency_window (int, optional): number of recent latencies kept for percentiles. Defaults to 10000.
+        """
+        self.extractor = extractor
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.latencies = deque(maxlen=latency_window)
+        self.n_requests = 0
+        self.n_batches = 0
+        #one thread so the model is never used concurrently
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.queue = None
+        self.server = None
+        self.batch_task = None
+
+    async def start(self, host="127.0.0.1", port=8080) -> None:
+        """Start the batching loop and listen for connections
+
+        Args:
+            host (str, optional): interface to bind. Defaults to "127.0.0.1".
+            port (int, optional): port to bind, 0 picks a free one. Defaults to 8080.
+        """
+        self.queue = asyncio.Queue()
+        self.batch_task = asyncio.create_task(self._batch_loop())
+        self.server = await asyncio.start_server(self._handle_connection, host, port)
+
+    @property
+    def port(self) -> int:
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        """Stop accepting connections and cancel the batching loop
+        """
+        self.server.close()
+        await self.server.wait_closed()
+        self.batch_task.cancel()
+        try:
+            await self.batch_task
+        except asyncio.CancelledError:
+            pass
+        self.executor.shutdown(wait=True)
+
+    async def extract(self, identifier, text:str) -> dict:
+        """Queue one text and wait for its batch to be processed
+
+        Args:
+            identifier: identifier of the text, used as the product of the triplets
+            text (str): text to extract product triplets from
+
+        Returns:
+            dict: identifier, triples and reasons
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((identifier, text, future, time.perf_counter()))
+        return await future
+
+    async def _batch_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch:
+                if not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                results = await loop.run_in_executor(self.executor, self._run_batch, batch)
+            except Exception as e:
+                for _, _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.n_batches += 1
+            now = time.perf_counter()
+            for (_, _, future, queued_at), result in zip(batch, results):
+                self.latencies.append(now - queued_at)
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def _run_batch(self, batch:list) -> list:
+        """Parse a micro-batch and extract product triplets, off the event loop
+
+        A text failing to parse or extract does not fail its batch: its result
+        is the exception, raised to its own request only.
+
+        Returns:
+            list: result dict or exception of every text, in batch order
+        """
+        pairs = [(identifier, text) for identifier, text, _, _ in batch]
+        try:
+            parsed = list(self.extractor.parse_docs(pairs, batch_size=len(pairs)))
+        except Exception:
+            #nlp.pipe fails as a whole, parse the texts one by one to isolate the failing ones
+            parsed = [self._parse_one(identifier, text) for identifier, text in pairs]
+
+        results = []
+        for identifier, tokens in parsed:
+            if isinstance(tokens, Exception):
+                results.append(tokens)
+                continue
+            try:
+                triples, reasons = self.extractor.parser.product_triplets(identifier, tokens, self.extractor.records)
+                results.append({"id" : identifier, "triples" : triples, "reasons" : reasons})
+            except Exception as e:
+                logger.exception("extraction failed for id %r", identifier)
+                results.append(e)
+
+        return results
+
+    def _parse_one(self, identifier, text:str) -> tuple:
+        """Parse a single text, returning the exception instead of raising it
+
+        Returns:
+            tuple: identifier, parsed spacy Doc or exception
+        """
+        try:
+            return next(self.extractor.parse_docs([(identifier, text)]))
+        except Exception as e:
+            logger.exception("parsing failed for id %r", identifier)
+            return identifier, e
+
+    def metrics(self) -> dict:
+        """Request, batch and latency statistics
+
+        Returns:
+            dict: counts, mean batch size and latency percentiles in milliseconds
+        """
+        latencies = sorted(self.latencies)
+        percentiles = {}
+        for name, q in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0)):
+            if latencies:
+                idx = min(len(latencies) - 1, max(0, int(round(q * len(latencies))) - 1))
+                percentiles[name] = latencies[idx] * 1000
+            else:
+                percentiles[name] = None
+
+        return {
+            "requests" : self.n_requests,
+            "batches" : self.n_batches,
+            "mean_batch_size" : self.n_requests / self.n_batches if self.n_batches else 0.0,
+            "latency_ms" : percentiles,
+        }
+
+    async def _handle_connection(self, reader:asyncio.StreamReader, writer:asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                status, payload = await self._route(method, path, body)
+                data = json.dumps(payload, default=triple_to_json).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n".encode("latin-1")
+                    + data
+                )
+                await writer.drain()
+
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method:str, path:str, body:bytes):
+        if method == "GET" and path == "/health":
+            return 200, {"status" : "ok"}
+        if method == "GET" and path == "/metrics":
+            return 200, self.metrics()
+        if method != "POST" or path != "/extract":
+            return 404, {"error" : f"no route for {method} {path}"}
+
+        try:
+            request = json.loads(body)
+            identifier, text = request["id"], request["text"]
+        except (ValueError, KeyError, TypeError):
+            return 400, {"error" : "expected a JSON object with id and text"}
+        if not isinstance(text, str):
+            return 400, {"error" : "text must be a string"}
+
+        self.n_requests += 1
+        try:
+            return 200, await self.extract(identifier, text)
+        except Exception as e:
+            return 500, {"error" : repr(e)}
+
+
+async def request(host:str, port:int, method="GET", path="/health", payload=None) -> tuple:
+    """Minimal local client for ExtractionService
+
+    Args:
+        host (str): service host
+        port (int): service port
+        method (str, optional): HTTP method. Defaults to "GET".
+        path (str, optional): request path. Defaults to "/health".
+        payload (dict, optional): JSON body. Defaults to None.
+
+    Returns:
+        tuple: HTTP status, decoded JSON response
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode("latin-1")
+        + body
+    )
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    data = await reader.readexactly(int(headers.get("content-length", 0)))
+    writer.close()
+
+    return status, json.loads(data)
+
+
+async def serve(args:argparse.Namespace) -> None:
+    extractor = TriplesExtractor(
+        args.model, method="product", profile=args.profile, engine=args.engine, records=args.records
+    )
+    service = ExtractionService(extractor, args.max_batch, args.max_wait)
+    await service.start(args.host, args.port)
+    logger.info("listening on %s:%d", args.host, service.port)
+    async with service.server:
+        await service.server.serve_forever()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Micro-batching product triplet extraction service")
+    arg_parser.add_argument("--model", default="en_core_web_sm")
+    arg_parser.add_argument("--profile", default="auto")
+    arg_parser.add_argument("--engine", default="token")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8080)
+    arg_parser.add_argument("--max-batch", type=int, default=32)
+    arg_parser.add_argument("--max-wait", type=float, default=0.01, help="seconds")
+    arg_parser.add_argument("--records", action="store_true", help="return Triple records with character offsets")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(serve(arg_parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+from collections import defaultdict
+import math
+
+
+class FuzzyIndex:
+    """Character n-gram index for approximate term lookup.
+
+    Terms are lowercased and their words sorted, so word order variants
+    ("life battery") are identical, and compared by the Jaccard similarity of
+    their padded character n-grams, so spelling variants ("batteri life") score
+    high. Queries only probe the postings of the rarest n-grams allowed by the
+    similarity threshold (prefix filtering) and verify those candidates,
+    instead of comparing against every term.
+    """
+
+    def __init__(self, terms=(), n=3) -> None:
+        """Constructor
+
+        Args:
+            terms (iterable, optional): terms to index. Defaults to ().
+            n (int, optional): character n-gram length. Defaults to 3.
+        """
+        self.n = n
+        self.terms = []
+        self.gram_sets = []
+        self.positions = {}
+        self.postings = defaultdict(list)
+
+        for term in terms:
+            self.add(term)
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    @staticmethod
+    def normalize(term:str) -> str:
+        """Lowercase and sort the words of a term
+
+        Args:
+            term (str): term
+
+        Returns:
+            str: normalized term
+        """
+        return " ".join(sorted(term.lower().split()))
+
+    def grams(self, term:str) -> frozenset:
+        """Padded character n-grams of the normalized term
+
+        Args:
+            term (str): term
+
+        Returns:
+            frozenset: n-grams, empty for a blank term
+        """
+        normalized = self.normalize(term)
+        if not normalized:
+            return frozenset()
+        pad = "$" * (self.n - 1)
+        padded = f"{pad}{normalized}{pad}"
+        return frozenset(padded[i:i + self.n] for i in range(len(padded) - self.n + 1))
+
+    def similarity(self, a:str, b:str) -> float:
+        """Jaccard similarity of the n-grams of two terms
+
+        Args:
+            a (str): first term
+            b (str): second term
+
+        Returns:
+            float: similarity between 0.0 and 1.0
+        """
+        return _jaccard(self.grams(a), self.grams(b))
+
+    def add(self, term:str) -> int:
+        """Index a term, ignoring terms whose normalized form is already indexed
+
+        Args:
+            term (str): term
+
+        Returns:
+            int: position of the term
+        """
+        key = self.normalize(term)
+        position = self.positions.get(key)
+        if position is None:
+            position = len(self.terms)
+            grams = self.grams(term)
+            self.positions[key] = position
+            self.terms.append(term)
+            self.gram_sets.append(grams)
+            for gram in grams:
+                self.postings[gram].append(position)
+        return position
+
+    def query(self, term:str, threshold=0.8, limit=None) -> list:
+        """Indexed terms with similarity of at least threshold
+
+        Args:
+            term (str): query term
+            threshold (float, optional): minimum similarity, above 0.0. Defaults to 0.8.
+            limit (int, optional): maximum number of results. Defaults to None.
+
+        Returns:
+            list: (term, similarity) pairs, most similar first
+        """
+        if not 0.0 < threshold <= 1.0:
+            raise ValueError("threshold must be in (0, 1]")
+
+        grams = self.grams(term)
+        if not grams:
+            return []
+
+        #similarity >= t needs an overlap of at least t * |grams|, so every match
+        #contains one of the len(grams) - overlap + 1 rarest grams
+        min_overlap = math.ceil(threshold * len(grams) - 1e-9)
+        prefix = sorted(grams, key=lambda gram: len(self.postings.get(gram, ())))
+        prefix = prefix[:len(grams) - min_overlap + 1]
+
+        min_len = threshold * len(grams) - 1e-9
+        max_len = len(grams) / threshold + 1e-9
+        candidates = set()
+        for gram in prefix:
+            candidates.update(self.postings.get(gram, ()))
+
+        results = []
+        for position in candidates:
+            other = self.gram_sets[position]
+            if min_len <= len(other) <= max_len:
+                score = _jaccard(grams, other)
+                if score >= threshold:
+                    results.append((-score, position))
+
+        results.sort()
+        if limit is not None:
+            results = results[:limit]
+        return [(self.terms[position], -score) for score, position in results]
+
+    def best_match(self, term:str, threshold=0.8):
+        """Most similar indexed term with similarity of at least threshold
+
+        Args:
+            term (str): query term
+            threshold (float, optional): minimum similarity, above 0.0. Defaults to 0.8.
+
+        Returns:
+            tuple: (term, similarity), or None without a match
+        """
+        results = self.query(term, threshold, limit=1)
+        return results[0] if results else None
+
+
+def _jaccard(a:frozenset, b:frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    overlap = len(a & b)
+    return overlap / (len(a) + len(b) - overlap)
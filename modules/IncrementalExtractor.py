@@ -0,0 +1,201 @@
+import hashlib
+import inspect
+import json
+import os
+import time
+from modules.ParseCache import model_fingerprint, text_hash
+from modules.Triple import Triple, triple_to_json
+from modules.TriplesExtractor import TriplesExtractor
+
+
+def rule_fingerprint(extractor:TriplesExtractor) -> str:
+    """Identify the extraction rules: method, engine, rule sets and rule source code
+
+    Args:
+        extractor (TriplesExtractor): configured extractor
+
+    Returns:
+        str: hex digest changing whenever the triples of an unchanged text could change
+    """
+    parser = extractor.parser
+    config = {
+        "method" : extractor.method,
+        "engine" : extractor.engine,
+        "records" : extractor.records,
+        "rules" : {
+            name : sorted(getattr(parser, name)) if isinstance(getattr(parser, name), list) else getattr(parser, name)
+            for name in ("NEGATION", "SUBJECTS", "OBJECTS", "ADJECTIVES", "COMPOUNDS", "PREPOSITIONS")
+        },
+    }
+    digest = hashlib.sha1(json.dumps(config, sort_keys=True).encode("utf-8"))
+
+    #one entry per module: an instrumented subclass shares the module of its rules
+    modules = set()
+    for cls in type(parser).__mro__:
+        if cls is object or cls.__module__ in modules:
+            continue
+        modules.add(cls.__module__)
+        try:
+            digest.update(inspect.getsource(inspect.getmodule(cls)).encode("utf-8"))
+        except (OSError, TypeError):
+            digest.update(cls.__qualname__.encode("utf-8"))
+
+    return digest.hexdigest()
+
+
+class IncrementalExtractor:
+    """Re-extract only new or changed texts, keeping a manifest of previous results.
+
+    The manifest is a JSON lines file with one record per identifier:
+    {"id", "text_hash", "model", "rules", "triples"}. A record is reused
+    when the text hash, the model fingerprint and the rule fingerprint all
+    match; identifiers missing from the input are dropped. The file is
+    rewritten atomically after every run.
+    """
+
+    def __init__(self, extractor:TriplesExtractor, manifest_path:str) -> None:
+        """Constructor
+
+        Args:
+            extractor (TriplesExtractor): extractor used for new and changed texts
+            manifest_path (str): JSON lines manifest, created on the first run
+        """
+        self.extractor = extractor
+        self.manifest_path = manifest_path
+        #fingerprints of the last update, recomputed by every update as the rules may change
+        self.model = None
+        self.rules = None
+        self.last_run_stats = {}
+
+    def load_manifest(self) -> dict:
+        """Read the manifest
+
+        Returns:
+            dict: identifier(key) and manifest record(values), empty if there is no manifest yet
+        """
+        manifest = {}
+        if not os.path.exists(self.manifest_path):
+            return manifest
+
+        with open(self.manifest_path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    record["id"] = _manifest_identifier(record["id"])
+                    manifest[record["id"]] = record
+
+        return manifest
+
+    def write_manifest(self, records) -> None:
+        """Atomically replace the manifest
+
+        Args:
+            records (iterable): manifest records
+        """
+        directory = os.path.dirname(os.path.abspath(self.manifest_path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, default=triple_to_json) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.manifest_path)
+
+    def semantic_triples(self, identifier_lst:list, text_lst:list, batch_size=None, n_process=1) -> dict:
+        """Generate semantic triples of the whole input, extracting only new or changed texts
+
+        Args:
+            identifier_lst (list): identifier to individual texts, the complete current catalogue
+            text_lst (list): texts to extract semantic triples
+            batch_size (int, optional): number of texts per nlp.pipe batch. Defaults to None.
+            n_process (int, optional): number of processes for nlp.pipe. Defaults to 1.
+
+        Returns:
+            dict: dictionary of identifiers(key) and semantic triples(values)
+        """
+        return self.update(zip(identifier_lst, text_lst), batch_size, n_process)
+
+    def update(self, pairs, batch_size=None, n_process=1) -> dict:
+        """Bring the manifest up to date with the current catalogue
+
+        Identifiers must be JSON serializable, tuple identifiers are read back as tuples.
+        The model and rule fingerprints are taken at the start of every update, so changes
+        to the rule sets of the extractor's parser (NEGATION, SUBJECTS, ...) are picked up.
+        As in semantic_triples, pairs with a None text are skipped (their identifier
+        counts as deleted) and the last text of a repeated identifier wins.
+        Counts of new, changed, unchanged and deleted identifiers are stored in last_run_stats.
+
+        Args:
+            pairs (iterable): (identifier, text) pairs, the complete current catalogue
+            batch_size (int, optional): number of texts per nlp.pipe batch. Defaults to None.
+            n_process (int, optional): number of processes for nlp.pipe. Defaults to 1.
+
+        Returns:
+            dict: dictionary of identifiers(key) and semantic triples(values)
+        """
+        start = time.perf_counter()
+        self.model = model_fingerprint(self.extractor.nlp_model)
+        self.rules = rule_fingerprint(self.extractor)
+        manifest = self.load_manifest()
+        current = {}
+        pending = []
+        n_new = n_changed = 0
+
+        catalogue = {}
+        for identifier, text in pairs:
+            if text is not None:
+                catalogue[identifier] = text
+
+        for identifier, text in catalogue.items():
+            key = text_hash(text)
+            record = manifest.get(identifier)
+            if (record is not None and record["text_hash"] == key
+                    and record["model"] == self.model and record["rules"] == self.rules):
+                current[identifier] = record
+                continue
+
+            if record is None:
+                n_new += 1
+            else:
+                n_changed += 1
+            current[identifier] = {"id" : identifier, "text_hash" : key, "model" : self.model, "rules" : self.rules}
+            pending.append((identifier, text))
+
+        for identifier, svo_lst in self.extractor.iter_semantic_triples(pending, batch_size, n_process):
+            current[identifier]["triples"] = svo_lst
+
+        self.write_manifest(current.values())
+
+        self.last_run_stats = TriplesExtractor.throughput_stats(len(pending), time.perf_counter() - start)
+        self.last_run_stats.update({
+            "identifiers" : len(current),
+            "new" : n_new,
+            "changed" : n_changed,
+            "unchanged" : len(current) - len(pending),
+            "deleted" : len(set(manifest) - set(current)),
+        })
+
+        return {
+            identifier : [_manifest_triple(triples) for triples in record["triples"]]
+            for identifier, record in current.items()
+        }
+
+
+def _manifest_identifier(identifier):
+    """Identifier of a manifest record, JSON turns tuple identifiers into lists
+    """
+    if isinstance(identifier, list):
+        return tuple(_manifest_identifier(value) for value in identifier)
+    return identifier
+
+
+def _manifest_triple(triples):
+    """Triple of a manifest record: extracted, or read back from JSON (Triple records as their to_dict)
+    """
+    if isinstance(triples, Triple):
+        return triples
+    if isinstance(triples, dict):
+        return Triple.from_dict(triples)
+    return tuple(triples)
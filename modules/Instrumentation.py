@@ -0,0 +1,290 @@
+from collections import Counter, defaultdict
+from functools import wraps
+import time
+
+#rule method -> product_triplets branch it implements
+BRANCH_METHODS = {
+    "triplets_with_subs_and_objs" : "subj_obj",
+    "triplets_with_subs" : "subj_only",
+    "triplets_with_objs" : "obj_only",
+}
+PHRASE_METHODS = ("sub_compound_phrase", "adjective_phrase")
+#rule class -> its instrumented subclass, built by instrumented_rule_class
+INSTRUMENTED_RULE_CLASSES = {}
+
+
+class Instrumentation:
+    """Stage timings, product_triplets branch counters and reason histograms.
+
+    The entry points of the extractor and parser it is attached to are wrapped
+    per instance (instance attributes shadowing the class methods), once per
+    object. Rule methods, also run by the DocArrays built for every doc, come
+    from an instrumented subclass swapped in as the class of the instance, so
+    no closures are created per doc and the shared rule classes, used by
+    uninstrumented extractors, are left untouched. Stages nest: "phrases" is
+    part of "rules", which excludes "parse" and "output".
+    """
+
+    def __init__(self, namespace="semextract") -> None:
+        """Constructor
+
+        Args:
+            namespace (str, optional): prefix of the Prometheus metric names. Defaults to "semextract".
+        """
+        self.namespace = namespace
+        self.reset()
+
+    def reset(self) -> None:
+        """Clear every timing, counter and histogram
+        """
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.counters = defaultdict(int)
+        self.branches = defaultdict(int)
+        self.reasons = Counter()
+
+    def add_time(self, stage:str, seconds:float, calls=1) -> None:
+        self.seconds[stage] += seconds
+        self.calls[stage] += calls
+
+    def count(self, name:str, n=1) -> None:
+        self.counters[name] += n
+
+    def add_reasons(self, reasons:list) -> None:
+        """Add product_triplets reasons to the histogram, keyed by reason category
+
+        "missing object and subject for verb loves" is counted as
+        "missing object and subject", so the histogram stays small.
+
+        Args:
+            reasons (list): reasons returned by product_triplets
+        """
+        for reason in reasons:
+            self.reasons[reason.split(" for verb ")[0]] += 1
+
+    def timed(self, stage:str, func):
+        """Wrap func so its wall clock time is added to stage
+
+        Args:
+            stage (str): stage name
+            func (callable): function to time
+
+        Returns:
+            callable: timed function
+        """
+        perf_counter = time.perf_counter
+        add_time = self.add_time
+
+        @wraps(func)
+        def timed_func(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                add_time(stage, perf_counter() - start)
+
+        return timed_func
+
+    def timed_iter(self, stage:str, iterable):
+        """Yield from iterable, adding the time spent producing each item to stage
+
+        Args:
+            stage (str): stage name
+            iterable (iterable): lazily computed items, e.g. parsed docs
+
+        Yields:
+            items of iterable
+        """
+        perf_counter = time.perf_counter
+        iterator = iter(iterable)
+        while True:
+            start = perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add_time(stage, perf_counter() - start, calls=0)
+                return
+            self.add_time(stage, perf_counter() - start)
+            yield item
+
+    def instrument_rules(self, rules) -> None:
+        """Count the product_triplets branches and time phrase generation of a rule object
+
+        Works on DepenParseProduct and on the DocArrays of DepenParseArray, which
+        share the branch and phrase method names. The instance gets the
+        instrumented subclass of its class (instrumented_rule_class), built once
+        per class, and this instrumentation as its instrumentation attribute.
+
+        Args:
+            rules: object implementing the DepenParseProduct rules
+        """
+        rules.instrumentation = self
+        rules.__class__ = instrumented_rule_class(type(rules))
+
+    def instrument_parser(self, parser) -> None:
+        """Attach to a DepenParseProduct: branch counters, phrase timings and reason histograms
+
+        Args:
+            parser (DepenParseProduct): rule engine
+        """
+        parser.instrumentation = self
+        self.instrument_rules(parser)
+
+        product_triplets = parser.product_triplets
+        extract_all = parser.extract_all
+
+        @wraps(product_triplets)
+        def instrumented_product_triplets(*args, **kwargs):
+            svos, reasons = product_triplets(*args, **kwargs)
+            self.add_reasons(reasons)
+            return svos, reasons
+
+        @wraps(extract_all)
+        def instrumented_extract_all(*args, **kwargs):
+            results = extract_all(*args, **kwargs)
+            self.add_reasons(results.get("reasons", ()))
+            return results
+
+        parser.product_triplets = instrumented_product_triplets
+        parser.extract_all = instrumented_extract_all
+
+    def instrument_extractor(self, extractor) -> None:
+        """Attach to a TriplesExtractor: parse, rules and output timings, doc and triple counts
+
+        Args:
+            extractor (TriplesExtractor): extractor, its parser is instrumented too
+        """
+        extractor.instrumentation = self
+        self.instrument_parser(extractor.parser)
+
+        parse_docs = extractor.parse_docs
+        extract = extractor.extract
+        perf_counter = time.perf_counter
+
+        @wraps(parse_docs)
+        def instrumented_parse_docs(*args, **kwargs):
+            return self.timed_iter("parse", parse_docs(*args, **kwargs))
+
+        #with dedup, extract runs once per unique text; the docs and triples
+        #counters are input rows, counted by iter_semantic_triples
+        @wraps(extract)
+        def instrumented_extract(*args, **kwargs):
+            start = perf_counter()
+            svo_lst = extract(*args, **kwargs)
+            self.add_time("rules", perf_counter() - start)
+            self.counters["parsed_docs"] += 1
+            return svo_lst
+
+        extractor.parse_docs = instrumented_parse_docs
+        extractor.extract = instrumented_extract
+
+    def to_dict(self) -> dict:
+        """Export every metric
+
+        Returns:
+            dict: stages (seconds and calls), counters, branches and reasons
+        """
+        return {
+            "stages" : {
+                stage : {"seconds" : self.seconds[stage], "calls" : self.calls[stage]}
+                for stage in self.seconds
+            },
+            "counters" : dict(self.counters),
+            "branches" : dict(self.branches),
+            "reasons" : dict(self.reasons),
+        }
+
+    def to_prometheus(self) -> str:
+        """Export every metric in the Prometheus text exposition format
+
+        Returns:
+            str: metrics text
+        """
+        ns = self.namespace
+        lines = []
+
+        def family(name, help_text, label, values):
+            lines.append(f"# HELP {ns}_{name} {help_text}")
+            lines.append(f"# TYPE {ns}_{name} counter")
+            for key, value in values.items():
+                lines.append(f'{ns}_{name}{{{label}="{_escape_label(key)}"}} {value}')
+
+        family("stage_seconds_total", "Wall clock seconds spent per stage.", "stage", self.seconds)
+        family("stage_calls_total", "Calls timed per stage.", "stage", self.calls)
+        family("events_total", "Input documents, parsed documents and triples.", "event", self.counters)
+        family("branch_total", "product_triplets branches taken.", "branch", self.branches)
+        family("reason_total", "product_triplets failure reasons.", "reason", self.reasons)
+
+        return "\n".join(lines) + "\n"
+
+
+def instrumented_rule_class(cls) -> type:
+    """Subclass of a rule class wrapping its branch, phrase and verb rule methods
+
+    The wrappers record into the instrumentation attribute of the instance,
+    which instrument_rules sets before swapping the class in. The subclass is
+    built once per class and adds no instance attributes, so it can replace
+    the class of an existing instance; cls itself is not modified.
+
+    Args:
+        cls (type): class implementing the DepenParseProduct rules
+
+    Returns:
+        type: instrumented subclass, cls if it is already instrumented
+    """
+    if cls in INSTRUMENTED_RULE_CLASSES.values():
+        return cls
+    if cls in INSTRUMENTED_RULE_CLASSES:
+        return INSTRUMENTED_RULE_CLASSES[cls]
+
+    def counted(branch, func):
+        @wraps(func)
+        def counted_func(self, *args, **kwargs):
+            self.instrumentation.branches[branch] += 1
+            return func(self, *args, **kwargs)
+        return counted_func
+
+    def timed_phrase(func):
+        @wraps(func)
+        def timed_func(self, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(self, *args, **kwargs)
+            finally:
+                self.instrumentation.add_time("phrases", time.perf_counter() - start)
+        return timed_func
+
+    def verb_rule(func):
+        @wraps(func)
+        def instrumented_triplets_from_verb(self, *args, **kwargs):
+            res, reasons = func(self, *args, **kwargs)
+            if reasons:
+                self.instrumentation.branches["verb_failed"] += 1
+            return res, reasons
+        return instrumented_triplets_from_verb
+
+    def verbless_rule(func):
+        @wraps(func)
+        def instrumented_triplets_without_verbs(self, *args, **kwargs):
+            res, reasons = func(self, *args, **kwargs)
+            self.instrumentation.branches["verbless" if res else "verbless_failed"] += 1
+            return res, reasons
+        return instrumented_triplets_without_verbs
+
+    wrappers = {method : (lambda func, branch=branch: counted(branch, func)) for method, branch in BRANCH_METHODS.items()}
+    wrappers.update({method : timed_phrase for method in PHRASE_METHODS})
+    wrappers["triplets_from_verb"] = verb_rule
+    wrappers["triplets_without_verbs"] = verbless_rule
+
+    #same module as cls, so source based fingerprints (rule_fingerprint) see the same rules
+    namespace = {"__slots__" : (), "__module__" : cls.__module__}
+    for method, wrap in wrappers.items():
+        if hasattr(cls, method):
+            namespace[method] = wrap(getattr(cls, method))
+
+    INSTRUMENTED_RULE_CLASSES[cls] = type(f"Instrumented{cls.__name__}", (cls,), namespace)
+    return INSTRUMENTED_RULE_CLASSES[cls]
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
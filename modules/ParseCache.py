@@ -0,0 +1,201 @@
+import hashlib
+import os
+from spacy.language import Language
+from spacy.tokens import Doc, DocBin
+
+
+def text_hash(text:str) -> str:
+    """Content hash of a text
+
+    Args:
+        text (str): input text
+
+    Returns:
+        str: hex digest of the text
+    """
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def model_fingerprint(nlp_model:Language) -> str:
+    """Identify a loaded pipeline by name, version and active components
+
+    Args:
+        nlp_model (Language): loaded spacy pipeline
+
+    Returns:
+        str: fingerprint usable as a directory name
+    """
+    meta = nlp_model.meta
+    pipes = hashlib.sha1(",".join(nlp_model.pipe_names).encode("utf-8")).hexdigest()[:8]
+
+    return f"{meta.get('lang', 'xx')}_{meta.get('name', 'pipeline')}-{meta.get('version', '0.0.0')}-{pipes}"
+
+
+class ParseCache:
+    """On-disk cache of parsed spacy Docs keyed by text hash and model fingerprint
+
+    Docs stored together by put_many share one DocBin file (one write, one
+    shared string table); each text has a small reference file naming the
+    batch and its position there. get_many reads each batch file once for
+    all the texts it holds. Eviction removes whole batches, least recently
+    used first; references to an evicted batch are cache misses.
+    """
+
+    def __init__(self, cache_dir:str, nlp_model:Language, max_bytes=2**30) -> None:
+        """Constructor
+
+        Args:
+            cache_dir (str): root directory of the cache, shared between models
+            nlp_model (Language): pipeline producing (and deserializing) the cached docs
+            max_bytes (int, optional): size above which least recently used batches are evicted. Defaults to 1GiB.
+        """
+        self.nlp_model = nlp_model
+        self.max_bytes = max_bytes
+        self.directory = os.path.join(cache_dir, model_fingerprint(nlp_model))
+        self.batch_directory = os.path.join(self.directory, "batches")
+        os.makedirs(self.batch_directory, exist_ok=True)
+
+    def _ref_path(self, key:str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.ref")
+
+    def _batch_path(self, name:str) -> str:
+        return os.path.join(self.batch_directory, f"{name}.spacy")
+
+    def _batches(self):
+        """Yield (path, last access time, size) of every batch file
+        """
+        for entry in os.scandir(self.batch_directory):
+            if entry.name.endswith(".spacy"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                yield entry.path, stat.st_mtime, stat.st_size
+
+    def size_bytes(self) -> int:
+        """Bytes of the batch files currently on disk, shared by every process using the directory
+
+        Returns:
+            int: total size of the cached docs
+        """
+        return sum(size for _, _, size in self._batches())
+
+    def get(self, text:str) -> Doc:
+        """Load the cached parse of a text
+
+        Args:
+            text (str): input text
+
+        Returns:
+            Doc: cached doc, None on a cache miss
+        """
+        return self.get_many([text])[0]
+
+    def put(self, text:str, doc:Doc) -> None:
+        """Store the parse of a text, evicting old entries if the cache is full
+
+        Args:
+            text (str): input text
+            doc (Doc): parsed doc of the text
+        """
+        self.put_many([text], [doc])
+
+    def get_many(self, text_lst:list) -> list:
+        """Load cached parses of many texts, reading each batch file once
+
+        Args:
+            text_lst (list): input texts
+
+        Returns:
+            list: cached docs aligned with text_lst, None for cache misses
+        """
+        doc_lst = [None] * len(text_lst)
+        #batch name -> [(index in text_lst, position in batch)]
+        wanted = {}
+
+        for i, text in enumerate(text_lst):
+            try:
+                with open(self._ref_path(text_hash(text)), encoding="utf-8") as f:
+                    name, position = f.read().split()
+            except (FileNotFoundError, ValueError):
+                continue
+            wanted.setdefault(name, []).append((i, int(position)))
+
+        for name, positions in wanted.items():
+            path = self._batch_path(name)
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                #evicted batch, its references are misses
+                continue
+            #mtime marks last access for eviction
+            os.utime(path)
+            docs = list(DocBin().from_bytes(data).get_docs(self.nlp_model.vocab))
+            for i, position in positions:
+                doc_lst[i] = docs[position]
+
+        return doc_lst
+
+    def put_many(self, text_lst:list, doc_lst:list) -> None:
+        """Store parses of many texts in one batch file, evicting old batches if the cache is full
+
+        Args:
+            text_lst (list): input texts
+            doc_lst (list): parsed docs aligned with text_lst
+        """
+        if not text_lst:
+            return
+
+        keys = [text_hash(text) for text in text_lst]
+        name = hashlib.sha1("".join(keys).encode("utf-8")).hexdigest()
+        doc_bin = DocBin(store_user_data=False)
+        for doc in doc_lst:
+            doc_bin.add(doc)
+        _write_atomic(self._batch_path(name), doc_bin.to_bytes())
+
+        for position, key in enumerate(keys):
+            path = self._ref_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _write_atomic(path, f"{name} {position}".encode("utf-8"))
+
+        if self.size_bytes() > self.max_bytes:
+            self.evict()
+
+    def evict(self, target_ratio=0.9) -> None:
+        """Remove least recently used batches until the cache fits in target_ratio of max_bytes
+
+        The size is read from the directory, so batches written by other processes count too.
+
+        Args:
+            target_ratio (float, optional): fraction of max_bytes to shrink to. Defaults to 0.9.
+        """
+        target = self.max_bytes * target_ratio
+        batches = sorted(self._batches(), key=lambda entry: entry[1])
+        total = sum(size for _, _, size in batches)
+
+        for path, _, size in batches:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self) -> None:
+        """Remove every cached doc of this model
+        """
+        for path, _, _ in list(self._batches()):
+            os.remove(path)
+        for shard in os.scandir(self.directory):
+            if shard.is_dir() and shard.path != self.batch_directory:
+                for entry in os.scandir(shard.path):
+                    os.remove(entry.path)
+
+
+def _write_atomic(path:str, data:bytes) -> None:
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
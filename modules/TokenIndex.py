@@ -0,0 +1,172 @@
+from collections import Counter, defaultdict
+from itertools import chain
+import random
+import zlib
+import numpy
+
+#hash functions are (a * x + b) mod MERSENNE_PRIME on 32 bit token hashes, which stays within uint64
+MERSENNE_PRIME = (1 << 31) - 1
+
+
+class TokenIndex:
+    """Inverted index over target token lists (e.g. the "gold standard") for many-to-many matching.
+
+    A source matches a target when they share more than threshold unique
+    tokens, the tokens_intersect criterion. In "exact" mode candidates come
+    from the postings of the source tokens; in "minhash" mode from MinHash
+    LSH buckets, which only finds targets of high Jaccard similarity but
+    never touches the postings of frequent tokens. Candidates are always
+    verified exactly, so "minhash" can miss matches but never adds any.
+    Token hashes are crc32 of the utf-8 token, so signatures (and the
+    matches of "minhash") are the same in every process and run.
+    """
+
+    def __init__(self, id_list:list, tokens_list:list, mode="exact", num_perm=64, bands=16, seed=0) -> None:
+        """Constructor
+
+        Args:
+            id_list (list): identifiers of the targets
+            tokens_list (list): tokens of the targets
+            mode (str, optional): "exact" or "minhash". Defaults to "exact".
+            num_perm (int, optional): MinHash signature length. Defaults to 64.
+            bands (int, optional): LSH bands, must divide num_perm. Defaults to 16.
+            seed (int, optional): seed of the MinHash functions. Defaults to 0.
+        """
+        if mode not in ("exact", "minhash"):
+            raise ValueError(f"unknown mode {mode}, expected exact or minhash")
+        if num_perm % bands:
+            raise ValueError("bands must divide num_perm")
+
+        self.mode = mode
+        self.ids = list(id_list)
+        self.token_sets = [frozenset(tokens) for tokens in tokens_list]
+        self.postings = defaultdict(list)
+        self.buckets = defaultdict(list)
+
+        if mode == "exact":
+            for position, tokens in enumerate(self.token_sets):
+                for token in tokens:
+                    self.postings[token].append(position)
+        else:
+            rng = random.Random(seed)
+            self.rows = num_perm // bands
+            self.coef_a = numpy.array([rng.randrange(1, MERSENNE_PRIME) for _ in range(num_perm)], dtype=numpy.uint64)
+            self.coef_b = numpy.array([rng.randrange(0, MERSENNE_PRIME) for _ in range(num_perm)], dtype=numpy.uint64)
+            for position, tokens in enumerate(self.token_sets):
+                for key in self.band_keys(tokens):
+                    self.buckets[key].append(position)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def signature(self, tokens:frozenset) -> numpy.ndarray:
+        """MinHash signature of a token set
+
+        Args:
+            tokens (frozenset): unique tokens
+
+        Returns:
+            numpy.ndarray: num_perm minimum hash values
+        """
+        hashes = numpy.fromiter(
+            (zlib.crc32(str(token).encode("utf-8")) for token in tokens), dtype=numpy.uint64, count=len(tokens)
+        )
+        return ((numpy.outer(self.coef_a, hashes) + self.coef_b[:, None]) % MERSENNE_PRIME).min(axis=1)
+
+    def band_keys(self, tokens:frozenset) -> list:
+        """LSH bucket keys of a token set, one per band
+
+        Args:
+            tokens (frozenset): unique tokens
+
+        Returns:
+            list: (band, band signature bytes) keys, empty for an empty set
+        """
+        if not tokens:
+            return []
+        signature = self.signature(tokens)
+        return [
+            (band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+            for band in range(len(signature) // self.rows)
+        ]
+
+    def candidates(self, tokens:frozenset, threshold:int) -> list:
+        """Positions of targets that may share more than threshold tokens with tokens
+        """
+        if threshold < 0:
+            #every target shares more than a negative number of tokens
+            return range(len(self.ids))
+        if self.mode == "exact":
+            counts = Counter(chain.from_iterable(self.postings.get(token, ()) for token in tokens))
+            return [position for position, count in counts.items() if count > threshold]
+        return set(chain.from_iterable(self.buckets.get(key, ()) for key in self.band_keys(tokens)))
+
+    def query_positions(self, tokens:list, threshold=3) -> list:
+        """Positions of the targets sharing more than threshold unique tokens with tokens
+
+        Args:
+            tokens (list): source tokens
+            threshold (int, optional): valid threshold. Defaults to 3.
+
+        Returns:
+            list: ascending target positions
+        """
+        tokens = frozenset(tokens)
+        if not tokens:
+            return []
+
+        token_sets = self.token_sets
+        return sorted(
+            position for position in self.candidates(tokens, threshold)
+            if len(tokens & token_sets[position]) > threshold
+        )
+
+    def query(self, tokens:list, threshold=3) -> list:
+        """Identifiers of the targets sharing more than threshold unique tokens with tokens
+
+        Args:
+            tokens (list): source tokens
+            threshold (int, optional): valid threshold. Defaults to 3.
+
+        Returns:
+            list: target identifiers, in index order
+        """
+        return [self.ids[position] for position in self.query_positions(tokens, threshold)]
+
+    def match(self, id_list:list, tokens_list:list, threshold=3) -> list:
+        """Every (source, target) pair sharing more than threshold unique tokens
+
+        Args:
+            id_list (list): identifiers of the sources
+            tokens_list (list): tokens of the sources
+            threshold (int, optional): valid threshold. Defaults to 3.
+
+        Returns:
+            list: (source identifier, target identifier) pairs
+        """
+        pairs = []
+
+        for _id, tokens in zip(id_list, tokens_list):
+            pairs.extend((_id, target_id) for target_id in self.query(tokens, threshold))
+
+        return pairs
+
+    @staticmethod
+    def intersect(id_list:list, source_tokens_list:list, target_tokens_list:list, threshold=3) -> list:
+        """Paired case of util.tokens_intersect: source i is only compared with target i
+
+        Pairs need one set intersection each, so no index is built; use a
+        TokenIndex for one-to-many queries.
+
+        Args:
+            id_list (list): list of id
+            source_tokens_list (list): source tokens
+            target_tokens_list (list): target tokens
+            threshold (int, optional): valid threshold. Defaults to 3.
+
+        Returns:
+            list: list of valid ids
+        """
+        #util pulls in nltk, only needed for the paired check
+        from modules.util import tokens_intersect
+        return tokens_intersect(id_list, source_tokens_list, target_tokens_list, threshold)
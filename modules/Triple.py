@@ -0,0 +1,181 @@
+from bisect import bisect_right
+
+#span of an element that does not come from the text, e.g. the product of product_triplets
+NO_SPAN = (-1, -1, -1)
+
+
+class Triple:
+    """Semantic triple traceable to its source text without holding spacy Tokens or Docs.
+
+    Each element has a span (start_char, end_char, sentence): the smallest
+    character range covering the tokens the element was built from, and the
+    sentence index of its first token (-1 without sentence boundaries).
+    As a sequence it is (subject, predicate, object): iterating, len,
+    indexing and slicing behave like the bare string triple of the same
+    extraction method, so records go wherever tuple triples do.
+    """
+
+    __slots__ = (
+        "subject", "predicate", "object", "negated",
+        "subject_start", "subject_end", "subject_sent",
+        "predicate_start", "predicate_end", "predicate_sent",
+        "object_start", "object_end", "object_sent",
+    )
+
+    def __init__(self, subject:str, predicate:str, obj:str, negated=False,
+        subject_span=NO_SPAN, predicate_span=NO_SPAN, object_span=NO_SPAN) -> None:
+        """Constructor
+
+        Args:
+            subject (str): subject
+            predicate (str): predicate, including the negation marker of the extraction method
+            obj (str): object
+            negated (bool, optional): if the predicate is negated. Defaults to False.
+            subject_span (tuple, optional): (start_char, end_char, sentence) of the subject. Defaults to NO_SPAN.
+            predicate_span (tuple, optional): (start_char, end_char, sentence) of the predicate. Defaults to NO_SPAN.
+            object_span (tuple, optional): (start_char, end_char, sentence) of the object. Defaults to NO_SPAN.
+        """
+        self.subject = subject
+        self.predicate = predicate
+        self.object = obj
+        self.negated = negated
+        self.subject_start, self.subject_end, self.subject_sent = subject_span
+        self.predicate_start, self.predicate_end, self.predicate_sent = predicate_span
+        self.object_start, self.object_end, self.object_sent = object_span
+
+    @classmethod
+    def from_tokens(cls, subject:str, predicate:str, obj:str, negated:bool,
+        subject_toks:list, predicate_toks:list, object_toks:list, sent_starts=None) -> "Triple":
+        """Build a triple, reading the spans off the tokens of each element
+
+        Args:
+            subject (str): subject
+            predicate (str): predicate
+            obj (str): object
+            negated (bool): if the predicate is negated
+            subject_toks (list): tokens of the subject, empty if it is not from the text
+            predicate_toks (list): tokens of the predicate
+            object_toks (list): tokens of the object
+            sent_starts (list, optional): token index of every sentence start, None without
+                sentence boundaries. Defaults to None.
+
+        Returns:
+            Triple: triple without references to the tokens
+        """
+        return cls(
+            subject, predicate, obj, negated,
+            token_span(subject_toks, sent_starts),
+            token_span(predicate_toks, sent_starts),
+            token_span(object_toks, sent_starts),
+        )
+
+    @property
+    def subject_span(self) -> tuple:
+        return (self.subject_start, self.subject_end, self.subject_sent)
+
+    @property
+    def predicate_span(self) -> tuple:
+        return (self.predicate_start, self.predicate_end, self.predicate_sent)
+
+    @property
+    def object_span(self) -> tuple:
+        return (self.object_start, self.object_end, self.object_sent)
+
+    def astuple(self) -> tuple:
+        """Bare (subject, predicate, object) triple
+
+        Returns:
+            tuple: subject, predicate, object
+        """
+        return (self.subject, self.predicate, self.object)
+
+    def with_subject(self, subject) -> "Triple":
+        """Copy of the triple with another subject, e.g. the product of a deduplicated text
+
+        Args:
+            subject: new subject, its span is kept
+
+        Returns:
+            Triple: copied triple
+        """
+        triple = Triple.__new__(Triple)
+        for slot in self.__slots__:
+            setattr(triple, slot, getattr(self, slot))
+        triple.subject = subject
+        return triple
+
+    def to_dict(self) -> dict:
+        return {slot : getattr(self, slot) for slot in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, fields:dict) -> "Triple":
+        """Rebuild a triple from to_dict output, e.g. read back from JSON
+
+        Args:
+            fields (dict): every slot of the triple
+
+        Returns:
+            Triple: triple
+        """
+        triple = cls.__new__(cls)
+        for slot in cls.__slots__:
+            setattr(triple, slot, fields[slot])
+        return triple
+
+    def __iter__(self):
+        return iter((self.subject, self.predicate, self.object))
+
+    def __len__(self) -> int:
+        return 3
+
+    def __getitem__(self, key):
+        return (self.subject, self.predicate, self.object)[key]
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Triple):
+            return NotImplemented
+        return all(getattr(self, slot) == getattr(other, slot) for slot in self.__slots__)
+
+    def __hash__(self) -> int:
+        return hash(tuple(getattr(self, slot) for slot in self.__slots__))
+
+    def __repr__(self) -> str:
+        return (
+            f"Triple({self.subject!r}, {self.predicate!r}, {self.object!r}, negated={self.negated}, "
+            f"spans={self.subject_span}, {self.predicate_span}, {self.object_span})"
+        )
+
+
+def triple_to_json(value):
+    """json.dumps default hook writing Triple records as their to_dict
+
+    Args:
+        value: object json cannot serialize
+
+    Returns:
+        dict: fields of the triple
+    """
+    if isinstance(value, Triple):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def token_span(toks:list, sent_starts=None) -> tuple:
+    """(start_char, end_char, sentence) covering tokens
+
+    Args:
+        toks (list): spacy tokens, NO_SPAN if empty
+        sent_starts (list, optional): token index of every sentence start. Defaults to None.
+
+    Returns:
+        tuple: start_char, end_char, sentence index of the first token (-1 without sent_starts)
+    """
+    if not toks:
+        return NO_SPAN
+
+    first = min(toks, key=lambda tok: tok.i)
+    start = first.idx
+    end = max(tok.idx + len(tok.text) for tok in toks)
+    sent = bisect_right(sent_starts, first.i) - 1 if sent_starts else -1
+
+    return (start, end, sent)
@@ -0,0 +1,326 @@
+from bisect import bisect_left
+from numbers import Integral
+import json
+import os
+import shutil
+import numpy
+import pandas as pd
+from modules.TripleStore import TripleStore
+
+INDEX_VERSION = 1
+#ordering name -> columns of its rows, sorted in this order
+ORDERINGS = {
+    "spo" : ("subject", "predicate", "object", "id"),
+    "pos" : ("predicate", "object", "subject", "id"),
+    "osp" : ("object", "subject", "predicate", "id"),
+}
+#bound elements -> ordering whose sort prefix they form
+ORDERING_FOR_BOUND = {
+    () : "spo",
+    ("subject",) : "spo",
+    ("subject", "predicate") : "spo",
+    ("subject", "predicate", "object") : "spo",
+    ("predicate",) : "pos",
+    ("predicate", "object") : "pos",
+    ("object",) : "osp",
+    ("subject", "object") : "osp",
+}
+ELEMENTS = ("subject", "predicate", "object")
+
+
+class TripleIndex:
+    """Persistent SPO/POS/OSP index over dictionary-encoded triples.
+
+    An index is a directory of .npy files opened with numpy memory mapping,
+    so lookups read a few pages instead of loading the triples, and reader
+    processes opening the same directory share the OS page cache. Subjects,
+    predicates and objects share one term dictionary, sorted so term codes
+    are found by binary search; identifiers have their own dictionary.
+    Each ordering stores its rows as (subject, predicate, object, id) codes
+    sorted on the ordering, so any combination of bound elements is a
+    contiguous range found with searchsorted.
+    Terms are stored as strings: a product identifier used as subject is
+    matched by its str().
+    """
+
+    def __init__(self, path:str) -> None:
+        """Open an index written by TripleIndex.build
+
+        Args:
+            path (str): index directory
+        """
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"unsupported triple index version {self.meta.get('version')}")
+
+        #plain ndarray views of the memory maps skip the numpy.memmap subclass overhead on every slice
+        load = lambda name: numpy.asarray(numpy.load(os.path.join(path, f"{name}.npy"), mmap_mode="r"))
+        self.terms = _StringColumn(load("terms"), load("term_offsets"))
+        if self.meta["id_type"] == "int":
+            self.ids = load("ids")
+        else:
+            self.ids = _StringColumn(load("ids"), load("id_offsets"))
+        self.orderings = {name : load(name) for name in ORDERINGS}
+
+    @classmethod
+    def build(cls, source, path:str) -> "TripleIndex":
+        """Write an index and open it
+
+        Args:
+            source: semantic_triples output (dict), df_from_triples_dict style dataframe,
+                TripleStore or iterable of (identifier, triples) pairs,
+                e.g. TriplesExtractor.iter_semantic_triples
+            path (str): index directory, created if missing and replaced if it holds an index.
+                The index is built in a sibling directory and renamed into place, so readers
+                opening path get the old or the new index (or, between the two renames, none),
+                never a mix of both.
+
+        Returns:
+            TripleIndex: opened index
+        """
+        if isinstance(source, TripleStore):
+            store = source
+        elif isinstance(source, pd.DataFrame):
+            store = TripleStore.from_dataframe(source)
+        elif isinstance(source, dict):
+            store = TripleStore.from_triples_dict(source)
+        else:
+            store = TripleStore.from_stream(source)
+
+        path = os.path.normpath(path)
+        if os.path.isdir(path) and os.listdir(path) and not os.path.exists(os.path.join(path, "meta.json")):
+            raise FileExistsError(f"{path} exists and is not a triple index")
+
+        #written to a sibling directory and swapped in, readers never see a partial index
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        try:
+            cls._write(store, tmp_path)
+            _replace_directory(tmp_path, path)
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+
+        return cls(path)
+
+    @staticmethod
+    def _write(store:TripleStore, path:str) -> None:
+        """Write the .npy files and meta.json of an index into an empty directory
+        """
+        save = lambda name, values: numpy.save(os.path.join(path, f"{name}.npy"), values)
+
+        #sorted dictionaries, codes remapped so that code order is term order
+        terms = numpy.array([str(term) for term in store.terms.terms], dtype=object)
+        sorted_terms, term_codes = numpy.unique(terms, return_inverse=True)
+        blob, offsets = _encode_strings(sorted_terms)
+        save("terms", blob)
+        save("term_offsets", offsets)
+
+        ids = store.ids.terms
+        if all(isinstance(identifier, Integral) and not isinstance(identifier, bool) for identifier in ids):
+            id_type = "int"
+            sorted_ids, id_codes = numpy.unique(numpy.array(ids, dtype=numpy.int64), return_inverse=True)
+            save("ids", sorted_ids)
+        else:
+            id_type = "str"
+            sorted_ids, id_codes = numpy.unique(
+                numpy.array([str(identifier) for identifier in ids], dtype=object), return_inverse=True
+            )
+            blob, offsets = _encode_strings(sorted_ids)
+            save("ids", blob)
+            save("id_offsets", offsets)
+
+        term_codes = term_codes.reshape(-1).astype(numpy.uint32)
+        columns = {
+            "id" : id_codes.reshape(-1).astype(numpy.uint32)[store.codes("id")],
+            "subject" : term_codes[store.codes("subject")],
+            "predicate" : term_codes[store.codes("predicate")],
+            "object" : term_codes[store.codes("object")],
+        }
+        for name, order in ORDERINGS.items():
+            #lexsort sorts on its last key first
+            perm = numpy.lexsort([columns[column] for column in reversed(order)])
+            rows = numpy.stack([columns[column][perm] for column in ELEMENTS + ("id",)])
+            save(name, rows)
+
+        meta = {
+            "version" : INDEX_VERSION,
+            "n_triples" : len(store),
+            "n_terms" : len(sorted_terms),
+            "n_ids" : len(sorted_ids),
+            "id_type" : id_type,
+        }
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    def __len__(self) -> int:
+        return self.meta["n_triples"]
+
+    def term_code(self, term) -> int:
+        """Code of a subject, predicate or object
+
+        Args:
+            term: term, compared as str
+
+        Returns:
+            int: code of the term, -1 if it is not in the index
+        """
+        return _find(self.terms, str(term))
+
+    def identifier_code(self, identifier) -> int:
+        """Code of an identifier
+
+        Args:
+            identifier: identifier of a source text
+
+        Returns:
+            int: code of the identifier, -1 if it is not in the index
+        """
+        if self.meta["id_type"] == "int":
+            if not isinstance(identifier, Integral):
+                return -1
+            pos = int(numpy.searchsorted(self.ids, identifier))
+            return pos if pos < len(self.ids) and self.ids[pos] == identifier else -1
+        return _find(self.ids, str(identifier))
+
+    def decode_identifier(self, code:int):
+        return int(self.ids[code]) if self.meta["id_type"] == "int" else self.ids[code]
+
+    def codes(self, subject=None, predicate=None, obj=None, identifier=None) -> numpy.ndarray:
+        """Rows matching the bound elements, as codes
+
+        Args:
+            subject (optional): subject to match, None for any. Defaults to None.
+            predicate (optional): predicate to match, None for any. Defaults to None.
+            obj (optional): object to match, None for any. Defaults to None.
+            identifier (optional): identifier to match, None for any. Defaults to None.
+
+        Returns:
+            numpy.ndarray: (4, n) uint32 subject, predicate, object and id codes,
+                a view of the memory map unless identifier is given
+        """
+        bound = {"subject" : subject, "predicate" : predicate, "object" : obj}
+        bound = {element : value for element, value in bound.items() if value is not None}
+        name = ORDERING_FOR_BOUND[tuple(element for element in ELEMENTS if element in bound)]
+        rows = self.orderings[name]
+
+        lo, hi = 0, rows.shape[1]
+        for element in ORDERINGS[name]:
+            if element not in bound:
+                break
+            code = self.term_code(bound[element])
+            if code < 0:
+                return rows[:, :0]
+            #a numpy scalar of the column dtype keeps searchsorted from casting the column
+            code = numpy.uint32(code)
+            column = rows[ELEMENTS.index(element), lo:hi]
+            lo, hi = (
+                lo + int(numpy.searchsorted(column, code, side="left")),
+                lo + int(numpy.searchsorted(column, code, side="right")),
+            )
+
+        rows = rows[:, lo:hi]
+        if identifier is not None:
+            id_code = self.identifier_code(identifier)
+            rows = rows[:, rows[3] == id_code] if id_code >= 0 else rows[:, :0]
+        return rows
+
+    def count(self, subject=None, predicate=None, obj=None, identifier=None) -> int:
+        """Number of triples matching the bound elements, without decoding them
+
+        Args:
+            subject (optional): subject to match, None for any. Defaults to None.
+            predicate (optional): predicate to match, None for any. Defaults to None.
+            obj (optional): object to match, None for any. Defaults to None.
+            identifier (optional): identifier to match, None for any. Defaults to None.
+
+        Returns:
+            int: number of matching triples
+        """
+        return self.codes(subject, predicate, obj, identifier).shape[1]
+
+    def match(self, subject=None, predicate=None, obj=None, identifier=None) -> list:
+        """Triples matching the bound elements
+
+        Args:
+            subject (optional): subject to match, None for any. Defaults to None.
+            predicate (optional): predicate to match, None for any. Defaults to None.
+            obj (optional): object to match, None for any. Defaults to None.
+            identifier (optional): identifier to match, None for any. Defaults to None.
+
+        Returns:
+            list: (identifier, (subject, predicate, object)) pairs in the order of the ordering used
+        """
+        rows = self.codes(subject, predicate, obj, identifier)
+        terms = self.terms
+        return [
+            (self.decode_identifier(id_code), (terms[sub], terms[pred], terms[ob]))
+            for sub, pred, ob, id_code in rows.T.tolist()
+        ]
+
+    def values(self, element:str, subject=None, predicate=None, obj=None, identifier=None) -> list:
+        """Distinct values of one element among the matching triples,
+        e.g. values("predicate", subject=product) or values("subject", obj="battery")
+
+        Args:
+            element (str): one of "subject", "predicate", "object", "id"
+            subject (optional): subject to match, None for any. Defaults to None.
+            predicate (optional): predicate to match, None for any. Defaults to None.
+            obj (optional): object to match, None for any. Defaults to None.
+            identifier (optional): identifier to match, None for any. Defaults to None.
+
+        Returns:
+            list: sorted distinct values
+        """
+        rows = self.codes(subject, predicate, obj, identifier)
+        if element == "id":
+            return [self.decode_identifier(code) for code in numpy.unique(rows[3]).tolist()]
+        return [self.terms[code] for code in numpy.unique(rows[ELEMENTS.index(element)]).tolist()]
+
+
+class _StringColumn:
+    """Sorted strings stored as a utf-8 blob and offsets, decoded on access
+    """
+
+    def __init__(self, blob:numpy.ndarray, offsets:numpy.ndarray) -> None:
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i:int) -> str:
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+
+def _encode_strings(values) -> tuple:
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = numpy.zeros(len(encoded) + 1, dtype=numpy.int64)
+    numpy.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return numpy.frombuffer(b"".join(encoded), dtype=numpy.uint8), offsets
+
+
+def _replace_directory(src:str, dst:str) -> None:
+    """Move the directory src to dst, replacing a previous index at dst
+
+    An existing dst is renamed aside first and removed once src is in place;
+    open memory maps of the old index stay valid until they are closed.
+    """
+    if os.path.isdir(dst) and os.listdir(dst):
+        old_path = f"{dst}.{os.getpid()}.old"
+        shutil.rmtree(old_path, ignore_errors=True)
+        os.replace(dst, old_path)
+        os.replace(src, dst)
+        shutil.rmtree(old_path, ignore_errors=True)
+    else:
+        if os.path.isdir(dst):
+            os.rmdir(dst)
+        os.replace(src, dst)
+
+
+def _find(column:_StringColumn, value:str) -> int:
+    pos = bisect_left(column, value)
+    return pos if pos < len(column) and column[pos] == value else -1
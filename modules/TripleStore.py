@@ -0,0 +1,210 @@
+from array import array
+import numpy
+import pandas as pd
+
+COLUMNS = ["id", "subject", "predicate", "object"]
+
+
+class TermDictionary:
+    """Interns terms into consecutive integer codes
+    """
+
+    def __init__(self, terms=()) -> None:
+        """Constructor
+
+        Args:
+            terms (iterable, optional): unique terms, coded in order. Defaults to ().
+        """
+        self.terms = list(terms)
+        self.codes = {term : code for code, term in enumerate(self.terms)}
+
+    def encode(self, term) -> int:
+        """Code of a term, adding it to the dictionary if unseen
+
+        Args:
+            term: term to encode
+
+        Returns:
+            int: code of the term
+        """
+        code = self.codes.get(term)
+        if code is None:
+            code = len(self.terms)
+            self.codes[term] = code
+            self.terms.append(term)
+        return code
+
+    def decode(self, code:int):
+        return self.terms[code]
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+
+class TripleStore:
+    """Columnar triple container with dictionary-encoded strings.
+
+    Identifiers and terms (subjects, predicates and objects share one
+    dictionary) are stored once; each triple costs four uint32 codes.
+    """
+
+    def __init__(self) -> None:
+        """Constructor
+        """
+        self.ids = TermDictionary()
+        self.terms = TermDictionary()
+        self.columns = {column : array("I") for column in COLUMNS}
+
+    def append(self, identifier, triple:tuple) -> None:
+        """Add one triple
+
+        Args:
+            identifier: identifier of the source text
+            triple (tuple): subject, predicate, object
+        """
+        encode = self.terms.encode
+        self.columns["id"].append(self.ids.encode(identifier))
+        self.columns["subject"].append(encode(triple[0]))
+        self.columns["predicate"].append(encode(triple[1]))
+        self.columns["object"].append(encode(triple[2]))
+
+    def extend(self, identifier, triples:list) -> None:
+        """Add the triples of one identifier
+
+        Args:
+            identifier: identifier of the source text
+            triples (list): list of (subject, predicate, object)
+        """
+        for triple in triples:
+            self.append(identifier, triple)
+
+    def __len__(self) -> int:
+        return len(self.columns["id"])
+
+    def __iter__(self):
+        """Yield (identifier, (subject, predicate, object)) in insertion order
+        """
+        ids = self.ids.terms
+        terms = self.terms.terms
+        for id_code, sub, pred, obj in zip(*self.columns.values()):
+            yield ids[id_code], (terms[sub], terms[pred], terms[obj])
+
+    def codes(self, column:str) -> numpy.ndarray:
+        """Zero-copy numpy view of a code column
+
+        Args:
+            column (str): one of "id", "subject", "predicate", "object"
+
+        Returns:
+            numpy.ndarray: uint32 codes, valid until the store is appended to
+        """
+        return numpy.frombuffer(self.columns[column], dtype=numpy.uint32)
+
+    def memory_usage(self) -> int:
+        """Approximate bytes held by the code columns (dictionaries excluded)
+
+        Returns:
+            int: bytes of the code columns
+        """
+        return sum(col.itemsize * len(col) for col in self.columns.values())
+
+    @classmethod
+    def from_triples_dict(cls, triples_dict:dict) -> "TripleStore":
+        """Build a store from semantic_triples output
+
+        Args:
+            triples_dict (dict): dictionary of identifiers(key) and semantic triples(values)
+
+        Returns:
+            TripleStore: store with every triple
+        """
+        return cls.from_stream(triples_dict.items())
+
+    @classmethod
+    def from_stream(cls, pairs) -> "TripleStore":
+        """Build a store from (identifier, triples) pairs, e.g. TriplesExtractor.iter_semantic_triples
+
+        Args:
+            pairs (iterable): (identifier, list of semantic triples) pairs
+
+        Returns:
+            TripleStore: store with every triple
+        """
+        store = cls()
+        for identifier, triples in pairs:
+            store.extend(identifier, triples)
+        return store
+
+    def to_triples_dict(self) -> dict:
+        """Convert to the semantic_triples representation
+
+        Returns:
+            dict: dictionary of identifiers(key) and semantic triples(values)
+        """
+        triples_dict = {}
+        for identifier, triple in self:
+            if identifier in triples_dict:
+                triples_dict[identifier].append(triple)
+            else:
+                triples_dict[identifier] = [triple]
+        return triples_dict
+
+    @classmethod
+    def from_dataframe(cls, triples_df:pd.DataFrame, identifier="id", subject="subject",
+        predicate="predicate", obj="object") -> "TripleStore":
+        """Build a store from a df_from_triples_dict style dataframe
+
+        Args:
+            triples_df (pd.DataFrame): pandas dataframe of semantic triples
+            identifier (str, optional): identifier column. Defaults to "id".
+            subject (str, optional): subject column. Defaults to "subject".
+            predicate (str, optional): predicate column. Defaults to "predicate".
+            obj (str, optional): object column. Defaults to "object".
+
+        Returns:
+            TripleStore: store with every row
+        """
+        store = cls()
+        n = len(triples_df)
+
+        id_codes, id_uniques = pd.factorize(triples_df[identifier], sort=False)
+        #one factorize over the three term columns gives them a shared dictionary
+        term_values = numpy.concatenate([
+            triples_df[column].to_numpy(dtype=object) for column in (subject, predicate, obj)
+        ])
+        term_codes, term_uniques = pd.factorize(term_values, sort=False)
+        if (id_codes < 0).any() or (term_codes < 0).any():
+            raise ValueError("triples dataframe contains missing values")
+
+        store.ids = TermDictionary(id_uniques.tolist())
+        store.terms = TermDictionary(term_uniques.tolist())
+        store.columns["id"] = array("I", id_codes.astype(numpy.uint32).tobytes())
+        for k, column in enumerate(["subject", "predicate", "object"]):
+            codes = term_codes[k * n:(k + 1) * n].astype(numpy.uint32)
+            store.columns[column] = array("I", codes.tobytes())
+
+        return store
+
+    def to_dataframe(self, categorical=True) -> pd.DataFrame:
+        """Convert to a df_from_triples_dict style dataframe
+
+        Args:
+            categorical (bool, optional): return pandas categoricals sharing the store
+                dictionaries instead of materialized values. Defaults to True.
+
+        Returns:
+            pd.DataFrame: dataframe with id, subject, predicate and object columns
+        """
+        id_index = pd.Index(self.ids.terms)
+        term_index = pd.Index(self.terms.terms, dtype=object)
+        data = {}
+
+        for column in COLUMNS:
+            codes = self.codes(column)
+            categories = id_index if column == "id" else term_index
+            if categorical:
+                data[column] = pd.Categorical.from_codes(codes.astype(numpy.int32), categories=categories)
+            else:
+                data[column] = categories.take(codes).to_numpy()
+
+        return pd.DataFrame(data, columns=COLUMNS)
@@ -1,49 +1,389 @@
-from DepenParseBase import DepenParseBase
+from modules.DepenParseArray import DepenParseArray
+from modules.DepenParseProduct import DepenParseProduct
+from modules.ParseCache import ParseCache
+from modules.streams import JsonlTriplesWriter, iter_chunks
+from modules.Triple import Triple
+import os
 import spacy
 import subprocess
+import sys
+import time
+
+#extraction method -> DepenParseProduct method producing the triples
+EXTRACTION_METHODS = {
+    "sv" : "find_sv",
+    "svos" : "find_svos",
+    "svaos" : "find_svaos",
+    "product" : "product_triplets",
+}
+
+#rule engine -> parser class
+ENGINES = {
+    "token" : DepenParseProduct,
+    "array" : DepenParseArray,
+}
+
+#pipeline profile -> spacy components excluded when loading the model
+PIPELINE_PROFILES = {
+    "full" : (),
+    #rules only read pos_, dep_, head, lefts/rights and lower_/orth_.
+    #attribute_ruler is kept as it maps the tagger's tag_ to pos_
+    "dependency" : ("ner", "lemmatizer"),
+}
+
+#profile picked by profile="auto": every extraction method reads the same token attributes,
+#so the smallest profile giving identical triples is the same for all of them
+AUTO_PROFILE = "dependency"
+
+def normalize_text(text:str) -> str:
+    """Collapse whitespace and casing variants of a text
+
+    Args:
+        text (str): input text
+
+    Returns:
+        str: text with single spaces, casefolded
+    """
+    return " ".join(text.split()).casefold()
+
+
+#dedup mode -> key under which texts are parsed once
+DEDUP_MODES = {
+    "exact" : lambda text : text,
+    #near duplicates share the parse of the first variant seen, so every variant gets
+    #the triples (and the casing) of that text; case-sensitive models (tagger, parser, NER)
+    #may parse "Apple" and "apple" differently, so results can differ from exact mode
+    "normalized" : normalize_text,
+}
+
+def with_product(triple, product):
+    """Product triple with its product (subject) replaced
+
+    Args:
+        triple (tuple or Triple): (product, predicate, object) triple or Triple record
+        product: new product
+
+    Returns:
+        tuple or Triple: triple of the same type
+    """
+    if isinstance(triple, Triple):
+        return triple.with_subject(product)
+    _, predicate, obj = triple
+    return (product, predicate, obj)
+
 
 class TriplesExtractor:
     """Extract semantic triples for knowledge graph construction
     """
 
-    def __init__(self, trained_model="en_core_web_sm") -> None:
+    def __init__(self, trained_model="en_core_web_sm", method="svos", profile="full", engine="token",
+        cache_dir=None, cache_max_bytes=2**30, cache_window=10000, instrumentation=None,
+        dedup=None, dedup_window=10000, records=False) -> None:
         """Constructor
 
         Args:
             trained_model (str, optional): trained model to load from spacy. Defaults to "en_core_web_sm".
+            method (str, optional): extraction method, one of EXTRACTION_METHODS. Defaults to "svos".
+            profile (str, optional): pipeline profile, one of PIPELINE_PROFILES or "auto" 
+                for AUTO_PROFILE. Defaults to "full".
+            engine (str, optional): rule engine, one of ENGINES. Defaults to "token".
+            cache_dir (str, optional): directory of the on-disk parse cache, disabled if None. Defaults to None.
+            cache_max_bytes (int, optional): size limit of the parse cache. Defaults to 1GiB.
+            cache_window (int, optional): texts looked up in the cache per nlp.pipe call. Defaults to 10000.
+            instrumentation (Instrumentation, optional): collects stage timings, branch counters
+                and reasons, disabled if None. Defaults to None.
+            dedup (str, optional): parse duplicate texts once, one of DEDUP_MODES, disabled if None.
+                "normalized" reuses the parse of the first casing/whitespace variant, which can change
+                the triples of the other variants. Defaults to None.
+            dedup_window (int, optional): texts deduplicated together. Defaults to 10000.
+            records (bool, optional): extract Triple records with character offsets instead of tuples,
+                not available for the "sv" method. Defaults to False.
         """
-        self.load_spacy_model(trained_model)
+        if method not in EXTRACTION_METHODS:
+            raise ValueError(f"unknown extraction method {method}, expected one of {list(EXTRACTION_METHODS)}")
+        if engine not in ENGINES:
+            raise ValueError(f"unknown rule engine {engine}, expected one of {list(ENGINES)}")
+        if dedup is not None and dedup not in DEDUP_MODES:
+            raise ValueError(f"unknown dedup mode {dedup}, expected one of {list(DEDUP_MODES)}")
+        if records and method == "sv":
+            raise ValueError("Triple records are not available for the sv method")
 
-    def load_spacy_model(self, trained_model:str) -> None:
+        self.method = method
+        self.engine = engine
+        self.records = records
+        self.parser = ENGINES[engine]()
+        if profile == "auto":
+            profile = AUTO_PROFILE
+        self.load_spacy_model(trained_model, profile)
+        self.parse_cache = None
+        if cache_dir is not None:
+            self.parse_cache = ParseCache(cache_dir, self.nlp_model, cache_max_bytes)
+        self.cache_window = cache_window
+        self.dedup = dedup
+        self.dedup_window = dedup_window
+        self.last_run_stats = {}
+        self.instrumentation = None
+        if instrumentation is not None:
+            instrumentation.instrument_extractor(self)
+
+    def load_spacy_model(self, trained_model:str, profile="full") -> None:
         """Loads trained spacy model
 
         Args:
             trained_model (str): model to load from spacy (https://spacy.io/usage/models)
+            profile (str, optional): pipeline profile, one of PIPELINE_PROFILES. Defaults to "full".
+        """
+
+        if profile not in PIPELINE_PROFILES:
+            raise ValueError(f"unknown pipeline profile {profile}, expected one of {list(PIPELINE_PROFILES)}")
+
+        #local model directories are loaded as is, so offline runs never try to download
+        if not spacy.util.is_package(trained_model) and not os.path.isdir(trained_model):
+            subprocess.run([sys.executable, "-m", "spacy", "download", trained_model])
+
+        self.trained_model = trained_model
+        self.profile = profile
+        self.nlp_model = spacy.load(trained_model, exclude=list(PIPELINE_PROFILES[profile]))
+
+    def extract(self, identifier, tokens) -> list:
+        """Extract semantic triples from a parsed text with the configured method
+
+        Args:
+            identifier: identifier of the text, used as the product for the "product" method
+            tokens (Doc): parsed spacy doc
+
+        Returns:
+            list: list of semantic triples, Triple records if records is set
         """
 
-        if not spacy.util.is_package(trained_model):
-            subprocess.run([f"python -m spacy download {trained_model}"])
+        if self.method == "product":
+            svos, _ = self.parser.product_triplets(identifier, tokens, self.records)
+            return svos
+        if self.records:
+            return getattr(self.parser, EXTRACTION_METHODS[self.method])(tokens, records=True)
 
-        self.nlp_model = spacy.load(trained_model)
+        return getattr(self.parser, EXTRACTION_METHODS[self.method])(tokens)
 
-    def semantic_triples(self, identifier_lst:list, text_lst:list) -> dict:
+    def semantic_triples(self, identifier_lst:list, text_lst:list,
+        batch_size=None, n_process=1) -> dict:
         """Generate semantic triples from unstructured texts
 
+        Texts are parsed one at a time unless batch_size is given or n_process > 1,
+        in which case they are streamed through nlp.pipe. Throughput of the run is
+        stored in last_run_stats.
+
         Args:
             identifier_lst (list): identifier to individual texts
             text_lst (list): texts to extract semantic triples
+            batch_size (int, optional): number of texts per nlp.pipe batch. Defaults to None.
+            n_process (int, optional): number of processes for nlp.pipe. Defaults to 1.
 
         Returns:
             dict: dictionary of identifiers(key) and semantic triples(values)
         """
 
-        parser = DepenParseBase()
         output_dict = {}
+        pairs = zip(identifier_lst, text_lst)
+
+        for identifier, svo_lst in self.iter_semantic_triples(pairs, batch_size, n_process):
+            output_dict[identifier] = svo_lst
+
+        return output_dict
+
+    def iter_semantic_triples(self, pairs, batch_size=None, n_process=1,
+        output_path=None, flush_every=1000):
+        """Lazily generate semantic triples from a stream of texts
+
+        Only one nlp.pipe batch is held in memory at a time, so pairs can be an
+        unbounded iterable such as streams.iter_jsonl_pairs. Pairs with a None text
+        are skipped. Throughput is stored in last_run_stats once the stream is exhausted,
+        with the number of unique texts and the dedup ratio when dedup is enabled.
+
+        Args:
+            pairs (iterable): (identifier, text) pairs
+            batch_size (int, optional): number of texts per nlp.pipe batch. Defaults to None.
+            n_process (int, optional): number of processes for nlp.pipe. Defaults to 1.
+            output_path (str, optional): also write results to this JSON lines file. Defaults to None.
+            flush_every (int, optional): records per chunk written to output_path. Defaults to 1000.
+
+        Yields:
+            tuple: identifier, list of semantic triples
+        """
+
+        writer = JsonlTriplesWriter(output_path, flush_every) if output_path else None
+        if writer is not None and self.instrumentation is not None:
+            writer.write = self.instrumentation.timed("output", writer.write)
+        start = time.perf_counter()
+        n_docs = 0
+        self.n_unique_texts = 0
+
+        if self.dedup is None:
+            results = (
+                (identifier, self.extract(identifier, tokens))
+                for identifier, tokens in self.parse_docs(pairs, batch_size, n_process)
+            )
+        else:
+            results = self.iter_deduplicated(pairs, batch_size, n_process)
+
+        try:
+            for identifier, svo_lst in results:
+                if writer is not None:
+                    writer.write(identifier, svo_lst)
+                n_docs += 1
+                if self.instrumentation is not None:
+                    self.instrumentation.count("docs")
+                    self.instrumentation.count("triples", len(svo_lst))
+                yield identifier, svo_lst
+        finally:
+            if writer is not None:
+                writer.close()
+            self.last_run_stats = self.throughput_stats(n_docs, time.perf_counter() - start)
+            if self.dedup is not None:
+                self.last_run_stats["unique_texts"] = self.n_unique_texts
+                self.last_run_stats["dedup_ratio"] = 1.0 - self.n_unique_texts / n_docs if n_docs else 0.0
+
+    def iter_deduplicated(self, pairs, batch_size=None, n_process=1):
+        """Extract each unique text of a dedup_window once and fan the triples out to every identifier
+
+        For the "product" method the product (first element) of every triple is
+        replaced by the identifier it is fanned out to. With the "normalized" dedup
+        mode, every variant gets the triples, in the wording, of the first variant seen.
+
+        Args:
+            pairs (iterable): (identifier, text) pairs
+            batch_size (int, optional): number of texts per nlp.pipe batch. Defaults to None.
+            n_process (int, optional): number of processes for nlp.pipe. Defaults to 1.
+
+        Yields:
+            tuple: identifier, list of semantic triples, in input order
+        """
+        dedup_key = DEDUP_MODES[self.dedup]
+
+        for window in iter_chunks(pairs, self.dedup_window):
+            unique_idx = {}
+            unique_pairs = []
+            keys = []
+
+            for identifier, text in window:
+                key = dedup_key(text) if text is not None else None
+                keys.append(key)
+                if key is not None and key not in unique_idx:
+                    unique_idx[key] = len(unique_pairs)
+                    unique_pairs.append((identifier, text))
+
+            results = [
+                (identifier, self.extract(identifier, tokens))
+                for identifier, tokens in self.parse_docs(unique_pairs, batch_size, n_process)
+            ]
+            self.n_unique_texts += len(unique_pairs)
+
+            for (identifier, _), key in zip(window, keys):
+                if key is None:
+                    continue
+                first_identifier, svo_lst = results[unique_idx[key]]
+                if self.method == "product" and identifier != first_identifier:
+                    yield identifier, [with_product(triples, identifier) for triples in svo_lst]
+                else:
+                    yield identifier, list(svo_lst)
+
+    def parse_docs(self, pairs, batch_size=None, n_process=1):
+        """Parse (identifier, text) pairs, skipping None texts
+
+        With a parse cache, texts are looked up cache_window at a time and only
+        the misses are parsed (and stored).
+
+        Args:
+            pairs (iterable): (identifier, text) pairs
+            batch_size (int, optional): number of texts per nlp.pipe batch. Defaults to None.
+            n_process (int, optional): number of processes for nlp.pipe. Defaults to 1.
+
+        Yields:
+            tuple: identifier, parsed spacy Doc
+        """
+
+        pairs = ((identifier, text) for identifier, text in pairs if text is not None)
+
+        if self.parse_cache is None:
+            text_pairs = ((text, identifier) for identifier, text in pairs)
+            for tokens, identifier in self.pipe(text_pairs, batch_size, n_process, as_tuples=True):
+                yield identifier, tokens
+            return
+
+        for window in iter_chunks(pairs, self.cache_window):
+            text_lst = [text for _, text in window]
+            doc_lst = self.parse_cache.get_many(text_lst)
+            miss_idx = [i for i, doc in enumerate(doc_lst) if doc is None]
+
+            if miss_idx:
+                miss_texts = [text_lst[i] for i in miss_idx]
+                parsed = list(self.pipe(miss_texts, batch_size, n_process))
+                self.parse_cache.put_many(miss_texts, parsed)
+                for i, doc in zip(miss_idx, parsed):
+                    doc_lst[i] = doc
+
+            for (identifier, _), tokens in zip(window, doc_lst):
+                yield identifier, tokens
+
+    def pipe(self, texts, batch_size=None, n_process=1, as_tuples=False):
+        """Parse texts one at a time, or through nlp.pipe when batching is requested
+
+        Args:
+            texts (iterable): texts, or (text, context) pairs if as_tuples
+            batch_size (int, optional): number of texts per nlp.pipe batch. Defaults to None.
+            n_process (int, optional): number of processes for nlp.pipe. Defaults to 1.
+            as_tuples (bool, optional): texts are (text, context) pairs. Defaults to False.
+
+        Returns:
+            iterable: parsed docs, or (doc, context) pairs if as_tuples
+        """
+
+        if batch_size is None and n_process == 1:
+            if as_tuples:
+                return ((self.nlp_model(text), context) for text, context in texts)
+            return (self.nlp_model(text) for text in texts)
+
+        return self.nlp_model.pipe(
+            texts, as_tuples=as_tuples, batch_size=batch_size, n_process=n_process
+        )
+
+    @staticmethod
+    def throughput_stats(n_docs:int, seconds:float) -> dict:
+        """Summarize throughput of an extraction run
+
+        Args:
+            n_docs (int): number of documents processed
+            seconds (float): wall clock time of the run
+
+        Returns:
+            dict: number of docs, elapsed seconds and docs per second
+        """
+        docs_per_sec = n_docs / seconds if seconds > 0 else 0.0
+
+        return {
+            "docs" : n_docs,
+            "seconds" : seconds,
+            "docs_per_sec" : docs_per_sec,
+        }
+
+
+def verify_profile(text_lst:list, profile:str, trained_model="en_core_web_sm", method="svos") -> list:
+    """Check that a pipeline profile extracts the same triples as the full pipeline
+
+    Args:
+        text_lst (list): texts to compare on
+        profile (str): pipeline profile to check
+        trained_model (str, optional): trained model to load from spacy. Defaults to "en_core_web_sm".
+        method (str, optional): extraction method. Defaults to "svos".
+
+    Returns:
+        list: indexes of texts whose triples differ, empty if the profile is safe
+    """
+
+    full = TriplesExtractor(trained_model, method, "full")
+    reduced = TriplesExtractor(trained_model, method, profile)
+    identifier_lst = list(range(len(text_lst)))
 
-        for identifier, text in zip(identifier_lst, text_lst):
-            if text is not None:
-                tokens = self.nlp_model(text)
-                svo_lst = parser.find_svos(tokens)
-                output_dict[identifier] = svo_lst
+    expected = full.semantic_triples(identifier_lst, text_lst, batch_size=256)
+    actual = reduced.semantic_triples(identifier_lst, text_lst, batch_size=256)
 
-        return output_dict
\ No newline at end of file
+    return [i for i in expected if expected[i] != actual.get(i)]
@@ -1,3 +1,17 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import chain
+import numpy
+import pandas as pd
+from modules.FuzzyIndex import FuzzyIndex
+from modules.streams import iter_chunks
+
+VALIDATION_COLUMNS = [
+    "id", "n_triples", "n_elements", "n_source_tokens", "n_unique_source_tokens",
+    "matches", "covered", "match_pct", "precision", "recall", "f1",
+]
+
+
 class Meta:
 
     def __init__(self, identifier:str, source_tokens:list, triples_list:list) -> None:
@@ -20,10 +34,11 @@ class Meta:
         """
 
         self.matching_counts = 0
+        source_tokens = set(self.source_tokens)
         
         for triples in self.triples_list:
             for item in triples:
-                if item in self.source_tokens:
+                if item in source_tokens:
                     self.matching_counts += 1
 
         return self.matching_counts 
@@ -35,6 +50,7 @@ class Meta:
             float: matching percentage
         """
         source_len = len(self.source_tokens)
+        self.match_pct = 0.0
         if source_len > 0: #division by zero check
             self.match_pct = self.matching_counts/source_len
             if self.match_pct > 1.0:
@@ -70,4 +86,225 @@ class TriplesValidator:
 
         return results_collection
 
-        
\ No newline at end of file
+        
+    def bulk_validation(self, triples, source, n_workers=1, chunk_size=10000,
+        fuzzy_threshold=None, fuzzy_n=3, max_phrase_words=3) -> pd.DataFrame:
+        """Vectorized validation of whole triple and source tables
+
+        Counts are computed over the exploded triple elements and source tokens
+        of a whole chunk of identifiers at once (_validate_frame).
+
+        Per identifier present in both tables:
+            matches: triple elements found in the source tokens, as Meta.count_match
+            covered: unique source tokens equal to some triple element
+            match_pct: matches / source tokens capped at 1.0, as Meta.generate_match_pct
+            precision: matches / triple elements
+            recall: covered / unique source tokens
+            f1: harmonic mean of precision and recall
+
+        With fuzzy_threshold, also:
+            fuzzy_matches: triple elements with a FuzzyIndex similarity of at least fuzzy_threshold
+                to a source phrase (up to max_phrase_words consecutive source tokens)
+            fuzzy_match_pct: fuzzy_matches / source tokens capped at 1.0
+            fuzzy_precision: fuzzy_matches / triple elements
+
+        Args:
+            triples (dict or pd.DataFrame): triples dictionary, or df_from_triples_dict style dataframe
+            source (dict or pd.DataFrame): dictionary of source tokens("ground truths"),
+                or dataframe with id and tokens columns
+            n_workers (int, optional): worker processes for exact and fuzzy matching, 1 validates in process. Defaults to 1.
+            chunk_size (int, optional): identifiers per task sent to a worker. Defaults to 10000.
+            fuzzy_threshold (float, optional): minimum fuzzy similarity, None skips fuzzy matching. Defaults to None.
+            fuzzy_n (int, optional): character n-gram length of the fuzzy index. Defaults to 3.
+            max_phrase_words (int, optional): longest source phrase matched fuzzily. Defaults to 3.
+
+        Returns:
+            pd.DataFrame: one row per identifier with VALIDATION_COLUMNS (and the fuzzy columns)
+        """
+        if isinstance(triples, pd.DataFrame):
+            #util pulls in nltk, only needed for dataframe input
+            from modules.util import triples_dict_from_df
+            triples = triples_dict_from_df(triples)
+        if isinstance(source, pd.DataFrame):
+            source = dict(zip(source["id"], source["tokens"]))
+
+        items = [
+            (triples_key, triples_lst, source[triples_key])
+            for triples_key, triples_lst in triples.items() if triples_key in source
+        ]
+        validate = partial(
+            _validate_chunk, fuzzy_threshold=fuzzy_threshold, fuzzy_n=fuzzy_n, max_phrase_words=max_phrase_words
+        )
+
+        if n_workers > 1 and len(items) > chunk_size:
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                results_df = pd.concat(list(executor.map(validate, iter_chunks(items, chunk_size))), ignore_index=True)
+        else:
+            results_df = validate(items)
+
+        if fuzzy_threshold is not None:
+            fuzzy_matches = results_df["fuzzy_matches"]
+            n_source = results_df["n_source_tokens"].where(results_df["n_source_tokens"] > 0)
+            n_elements = results_df["n_elements"].where(results_df["n_elements"] > 0)
+            results_df["fuzzy_match_pct"] = (fuzzy_matches / n_source).clip(upper=1.0).fillna(0.0)
+            results_df["fuzzy_precision"] = (fuzzy_matches / n_elements).fillna(0.0)
+
+        return results_df
+
+    @staticmethod
+    def validation_summary(results_df:pd.DataFrame) -> pd.Series:
+        """Aggregate bulk_validation results
+
+        Micro scores pool the counts of every identifier, macro scores average the per identifier scores.
+
+        Args:
+            results_df (pd.DataFrame): output of bulk_validation
+
+        Returns:
+            pd.Series: identifier count, micro precision/recall/f1 and macro match_pct/precision/recall/f1
+        """
+        n_elements = results_df["n_elements"].sum()
+        n_unique = results_df["n_unique_source_tokens"].sum()
+
+        micro_precision = results_df["matches"].sum() / n_elements if n_elements else 0.0
+        micro_recall = results_df["covered"].sum() / n_unique if n_unique else 0.0
+        summary = {
+            "identifiers" : len(results_df),
+            "micro_precision" : micro_precision,
+            "micro_recall" : micro_recall,
+            "micro_f1" : _f1(micro_precision, micro_recall),
+        }
+        if "fuzzy_matches" in results_df:
+            summary["micro_fuzzy_precision"] = results_df["fuzzy_matches"].sum() / n_elements if n_elements else 0.0
+
+        for column in ("match_pct", "precision", "recall", "f1", "fuzzy_match_pct", "fuzzy_precision"):
+            if column in results_df:
+                summary[f"macro_{column}"] = results_df[column].mean() if len(results_df) else 0.0
+
+        return pd.Series(summary)
+
+
+def _f1(precision:float, recall:float) -> float:
+    return 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+
+
+def _validate_frame(items:list) -> pd.DataFrame:
+    """Validation rows of (identifier, triples, source tokens) items, run in worker processes
+
+    Triple elements and source tokens are exploded into long arrays of
+    (identifier position, value code) keys, so the counts are sorted joins
+    and bincounts over the whole chunk instead of a set comparison per identifier.
+    """
+    n_items = len(items)
+    positions = numpy.arange(n_items)
+    triples_lsts = [triples_lst for _, triples_lst, _ in items]
+    source_lsts = [source_tokens for _, _, source_tokens in items]
+
+    n_triples = numpy.fromiter(map(len, triples_lsts), dtype=numpy.int64, count=n_items)
+    triples_flat = list(chain.from_iterable(triples_lsts))
+    triple_lengths = numpy.fromiter(map(len, triples_flat), dtype=numpy.int64, count=len(triples_flat))
+    elements = list(chain.from_iterable(triples_flat))
+    n_source = numpy.fromiter(map(len, source_lsts), dtype=numpy.int64, count=n_items)
+    tokens = list(chain.from_iterable(source_lsts))
+
+    #one factorization for both sides, so equal elements and tokens share a code,
+    #and one int64 key per (identifier position, code) pair
+    values = numpy.empty(len(elements) + len(tokens), dtype=object)
+    values[:len(elements)] = elements
+    values[len(elements):] = tokens
+    codes, uniques = pd.factorize(values)
+    #missing values share one extra code, as use_na_sentinel=False would give on pandas >= 1.5
+    codes[codes < 0] = len(uniques)
+    n_codes = len(uniques) + 1
+
+    element_positions = numpy.repeat(numpy.repeat(positions, n_triples), triple_lengths)
+    element_keys = element_positions * n_codes + codes[:len(elements)]
+    source_keys = _sorted_unique(numpy.repeat(positions, n_source) * n_codes + codes[len(elements):])
+
+    per_item = lambda keys: numpy.bincount(keys // n_codes, minlength=n_items)
+    n_elements = numpy.bincount(element_positions, minlength=n_items)
+    n_unique = per_item(source_keys)
+    #every element occurrence found in the source tokens of its identifier
+    matches = per_item(element_keys[_isin_sorted(element_keys, source_keys)])
+    #unique source tokens equal to some element of their identifier
+    covered = per_item(source_keys[_isin_sorted(source_keys, _sorted_unique(element_keys))])
+
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        match_pct = numpy.where(n_source > 0, numpy.minimum(matches / n_source, 1.0), 0.0)
+        precision = numpy.where(n_elements > 0, matches / n_elements, 0.0)
+        recall = numpy.where(n_unique > 0, covered / n_unique, 0.0)
+        f1 = numpy.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+
+    return pd.DataFrame({
+        "id" : [identifier for identifier, _, _ in items],
+        "n_triples" : n_triples,
+        "n_elements" : n_elements,
+        "n_source_tokens" : n_source,
+        "n_unique_source_tokens" : n_unique,
+        "matches" : matches,
+        "covered" : covered,
+        "match_pct" : match_pct,
+        "precision" : precision,
+        "recall" : recall,
+        "f1" : f1,
+    }, columns=VALIDATION_COLUMNS)
+
+
+def _sorted_unique(keys:numpy.ndarray) -> numpy.ndarray:
+    """Sorted distinct keys (a plain sort, faster than numpy.unique on large int arrays)
+    """
+    keys = numpy.sort(keys)
+    return keys[numpy.concatenate(([True], keys[1:] != keys[:-1]))] if len(keys) else keys
+
+
+def _isin_sorted(keys:numpy.ndarray, sorted_keys:numpy.ndarray) -> numpy.ndarray:
+    """Mask of keys found in sorted_keys, by binary search
+    """
+    if not len(sorted_keys):
+        return numpy.zeros(len(keys), dtype=bool)
+    found = numpy.searchsorted(sorted_keys, keys).clip(max=len(sorted_keys) - 1)
+    return sorted_keys[found] == keys
+
+
+def _validate_chunk(items:list, fuzzy_threshold:float, fuzzy_n:int, max_phrase_words:int) -> pd.DataFrame:
+    """Validation rows of one chunk of items, with fuzzy_matches unless fuzzy_threshold is None
+    """
+    results_df = _validate_frame(items)
+    if fuzzy_threshold is not None:
+        results_df["fuzzy_matches"] = numpy.array(
+            _fuzzy_match_counts(items, fuzzy_threshold, fuzzy_n, max_phrase_words), dtype=numpy.int64
+        )
+    return results_df
+
+
+def _source_phrases(source_tokens:list, max_phrase_words:int) -> set:
+    """Normalized phrases of 1 to max_phrase_words consecutive source tokens
+    """
+    phrases = set()
+    for k in range(1, max_phrase_words + 1):
+        for i in range(len(source_tokens) - k + 1):
+            phrases.add(FuzzyIndex.normalize(" ".join(source_tokens[i:i + k])))
+    phrases.discard("")
+    return phrases
+
+
+def _fuzzy_match_counts(items:list, threshold:float, n:int, max_phrase_words:int) -> list:
+    """Fuzzy matching triple elements per (identifier, triples, source tokens) item
+
+    Each item gets an index of its own source phrases, so an element only
+    matches the source of its identifier; an element repeated within the
+    item is queried once.
+    """
+    counts = []
+    for _, triples_lst, source_tokens in items:
+        index = FuzzyIndex(_source_phrases([str(token) for token in source_tokens], max_phrase_words), n=n)
+        found = {}
+        count = 0
+        for triples in triples_lst:
+            for item in triples:
+                if item not in found:
+                    found[item] = bool(index.query(str(item), threshold, limit=1))
+                count += found[item]
+        counts.append(count)
+
+    return counts
@@ -0,0 +1,4 @@
+import sys
+from modules.cli import main
+
+sys.exit(main())
@@ -0,0 +1,121 @@
+import argparse
+import sys
+import time
+from modules.CorpusRunner import CorpusRunner
+from modules.TriplesExtractor import DEDUP_MODES, ENGINES, EXTRACTION_METHODS, PIPELINE_PROFILES, TriplesExtractor
+from modules.streams import READERS, WRITERS, infer_format, iter_pairs, open_writer
+
+#output formats with the span columns of Triple records
+SPAN_FORMATS = ("jsonl", "csv", "parquet")
+
+
+def positive_int(value:str) -> int:
+    """argparse type of the counts that must be at least 1
+
+    Args:
+        value (str): command line value
+
+    Returns:
+        int: parsed value
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: {value!r}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    """Command line arguments of the semextract batch extractor
+
+    Returns:
+        argparse.ArgumentParser: argument parser
+    """
+    arg_parser = argparse.ArgumentParser(
+        prog="semextract",
+        description="Stream texts from a JSONL, CSV or Parquet file and write their semantic triples "
+            "as (id, subject, predicate, object) rows, or as N-Triples/Turtle.",
+    )
+    arg_parser.add_argument("input", help="input file of (id, text) records")
+    arg_parser.add_argument("output", help="output file of triples")
+    arg_parser.add_argument("--input-format", choices=list(READERS), help="defaults to the input extension")
+    arg_parser.add_argument("--output-format", choices=list(WRITERS), help="defaults to the output extension")
+    arg_parser.add_argument("--id-field", default="id")
+    arg_parser.add_argument("--text-field", default="text")
+    arg_parser.add_argument("--model", default="en_core_web_sm")
+    arg_parser.add_argument("--method", choices=list(EXTRACTION_METHODS), default="svos")
+    arg_parser.add_argument("--profile", choices=list(PIPELINE_PROFILES) + ["auto"], default="auto")
+    arg_parser.add_argument("--engine", choices=list(ENGINES), default="token")
+    arg_parser.add_argument("--batch-size", type=positive_int, default=256, help="texts per nlp.pipe batch")
+    arg_parser.add_argument("--workers", type=positive_int, default=1, help="worker processes, each loading the model once")
+    arg_parser.add_argument("--shard-size", type=positive_int, default=1000, help="texts per worker task")
+    arg_parser.add_argument("--cache-dir", help="directory of the on-disk parse cache")
+    arg_parser.add_argument("--dedup", choices=list(DEDUP_MODES),
+        help="parse duplicate texts once; normalized also merges casing variants, which can change triples")
+    arg_parser.add_argument("--records", action="store_true",
+        help="extract Triple records and add their character offsets to jsonl, csv and parquet rows")
+    arg_parser.add_argument("--progress-every", type=positive_int, default=10000, help="docs between progress reports")
+    arg_parser.add_argument("--quiet", action="store_true", help="no progress reports")
+
+    return arg_parser
+
+
+def main(argv=None) -> int:
+    args = build_arg_parser().parse_args(argv)
+    extractor_kwargs = {
+        "method" : args.method,
+        "profile" : args.profile,
+        "engine" : args.engine,
+        "cache_dir" : args.cache_dir,
+        "dedup" : args.dedup,
+        "records" : args.records,
+    }
+
+    if args.workers > 1:
+        extractor = CorpusRunner(
+            args.model, n_workers=args.workers, shard_size=args.shard_size,
+            batch_size=args.batch_size, **extractor_kwargs
+        )
+        triples_stream = extractor.iter_semantic_triples
+    else:
+        extractor = TriplesExtractor(args.model, **extractor_kwargs)
+        triples_stream = lambda pairs: extractor.iter_semantic_triples(pairs, args.batch_size)
+
+    pairs = iter_pairs(args.input, args.input_format, args.id_field, args.text_field)
+    output_format = args.output_format or infer_format(args.output)
+    writer_kwargs = {"spans" : True} if args.records and output_format in SPAN_FORMATS else {}
+    start = time.perf_counter()
+    n_docs = 0
+    n_triples = 0
+
+    with open_writer(args.output, output_format, **writer_kwargs) as writer:
+        for identifier, triples in triples_stream(pairs):
+            writer.write(identifier, triples)
+            n_docs += 1
+            n_triples += len(triples)
+            if not args.quiet and n_docs % args.progress_every == 0:
+                elapsed = time.perf_counter() - start
+                print(f"{n_docs} docs, {n_triples} triples, {n_docs / elapsed:.1f} docs/sec", file=sys.stderr)
+
+    elapsed = time.perf_counter() - start
+    if not args.quiet:
+        print(
+            f"done: {n_docs} docs, {n_triples} triples in {elapsed:.1f}s "
+            f"({n_docs / elapsed if elapsed > 0 else 0.0:.1f} docs/sec)",
+            file=sys.stderr,
+        )
+        run_stats = extractor.last_run_stats
+        if "dedup_ratio" in run_stats:
+            print(f"dedup: {run_stats['unique_texts']} unique texts, ratio {run_stats['dedup_ratio']:.1%}", file=sys.stderr)
+    failed_shards = getattr(extractor, "failed_shards", [])
+    if failed_shards:
+        print(f"{len(failed_shards)} shards failed: {[f['shard'] for f in failed_shards]}", file=sys.stderr)
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
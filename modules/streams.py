@@ -0,0 +1,533 @@
+from abc import ABC, abstractmethod
+import csv
+import json
+from itertools import islice
+import re
+from urllib.parse import quote
+from modules.Triple import triple_to_json
+
+DEFAULT_BASE_IRI = "http://semextract.local/"
+RDF_STATEMENT_PREDICATES = {
+    "type" : "<http://www.w3.org/1999/02/22-rdf-syntax-ns#type>",
+    "statement" : "<http://www.w3.org/1999/02/22-rdf-syntax-ns#Statement>",
+    "subject" : "<http://www.w3.org/1999/02/22-rdf-syntax-ns#subject>",
+    "predicate" : "<http://www.w3.org/1999/02/22-rdf-syntax-ns#predicate>",
+    "object" : "<http://www.w3.org/1999/02/22-rdf-syntax-ns#object>",
+}
+#N-Triples ECHAR escapes, every other character is written as is in utf-8
+LITERAL_ESCAPES = {"\\" : "\\\\", "\"" : "\\\"", "\n" : "\\n", "\r" : "\\r", "\t" : "\\t"}
+LITERAL_ESCAPE_PATTERN = re.compile(r'[\\"\n\r\t]')
+
+
+def iter_chunks(iterable, size:int):
+    """Split an iterable into lists of at most size items
+
+    Args:
+        iterable (iterable): input items
+        size (int): maximum chunk length
+
+    Yields:
+        list: consecutive chunk of items
+    """
+
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
+def iter_jsonl_pairs(path:str, id_field="id", text_field="text"):
+    """Lazily read (identifier, text) pairs from a JSON lines file
+
+    Args:
+        path (str): path to JSON lines file
+        id_field (str, optional): key holding the identifier. Defaults to "id".
+        text_field (str, optional): key holding the text. Defaults to "text".
+
+    Yields:
+        tuple: identifier, text (None if the key is missing)
+    """
+
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            yield record[id_field], record.get(text_field)
+
+
+def iter_csv_pairs(path:str, id_field="id", text_field="text"):
+    """Lazily read (identifier, text) pairs from a csv file with a header row
+
+    Args:
+        path (str): path to csv file
+        id_field (str, optional): column holding the identifier. Defaults to "id".
+        text_field (str, optional): column holding the text. Defaults to "text".
+
+    Yields:
+        tuple: identifier, text (None if the cell is empty)
+    """
+
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            yield row[id_field], row.get(text_field) or None
+
+
+class JsonlTriplesWriter:
+    """Append (identifier, triples) records to a JSON lines file in chunks
+    """
+
+    def __init__(self, path:str, flush_every=1000) -> None:
+        """Constructor
+
+        Args:
+            path (str): output path, truncated on open
+            flush_every (int, optional): records buffered before writing to disk. Defaults to 1000.
+        """
+        self.path = path
+        self.flush_every = flush_every
+        self.buffer = []
+        self.file = open(path, "w", encoding="utf-8")
+
+    def write(self, identifier, triples:list) -> None:
+        """Buffer one record, flushing when the chunk is full
+
+        Args:
+            identifier: identifier of the source text
+            triples (list): semantic triples of the source text
+        """
+        self.buffer.append(json.dumps({"id" : identifier, "triples" : triples}, default=triple_to_json))
+        if len(self.buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write buffered records to disk
+        """
+        if self.buffer:
+            self.file.write("\n".join(self.buffer) + "\n")
+            self.buffer = []
+        self.file.flush()
+
+    def close(self) -> None:
+        """Flush remaining records and close the file
+        """
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def iter_parquet_pairs(path:str, id_field="id", text_field="text", batch_size=10000):
+    """Lazily read (identifier, text) pairs from a parquet file, one record batch at a time
+
+    Args:
+        path (str): path to parquet file
+        id_field (str, optional): column holding the identifier. Defaults to "id".
+        text_field (str, optional): column holding the text. Defaults to "text".
+        batch_size (int, optional): rows read per record batch. Defaults to 10000.
+
+    Yields:
+        tuple: identifier, text (None for nulls)
+    """
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=batch_size, columns=[id_field, text_field]):
+        columns = batch.to_pydict()
+        yield from zip(columns[id_field], columns[text_field])
+
+
+READERS = {
+    "jsonl" : iter_jsonl_pairs,
+    "csv" : iter_csv_pairs,
+    "parquet" : iter_parquet_pairs,
+}
+
+
+def infer_format(path:str) -> str:
+    """Infer the file format from the file extension
+
+    Args:
+        path (str): file path
+
+    Returns:
+        str: one of "jsonl", "csv", "parquet", "nt", "ttl"
+    """
+    extension = path.rsplit(".", 1)[-1].lower()
+    if extension in ("jsonl", "json", "ndjson"):
+        return "jsonl"
+    if extension in ("csv", "parquet", "nt", "ttl"):
+        return extension
+    raise ValueError(f"cannot infer format of {path}, expected .jsonl, .csv, .parquet, .nt or .ttl")
+
+
+def iter_pairs(path:str, fmt=None, id_field="id", text_field="text"):
+    """Lazily read (identifier, text) pairs from a JSON lines, csv or parquet file
+
+    Args:
+        path (str): input path
+        fmt (str, optional): one of READERS, inferred from the extension if None. Defaults to None.
+        id_field (str, optional): field holding the identifier. Defaults to "id".
+        text_field (str, optional): field holding the text. Defaults to "text".
+
+    Returns:
+        iterable: (identifier, text) pairs
+    """
+    fmt = fmt or infer_format(path)
+    if fmt not in READERS:
+        raise ValueError(f"cannot read {fmt} input, expected one of {list(READERS)}")
+    return READERS[fmt](path, id_field, text_field)
+
+
+class TripleRowWriter(ABC):
+    """Write triples incrementally in the df_from_triples_dict layout (id, subject, predicate, object)
+
+    Writers taking spans=True add the SPAN_COLUMNS of Triple records to every row.
+    """
+
+    COLUMNS = ["id", "subject", "predicate", "object"]
+    SPAN_COLUMNS = [
+        f"{element}_{field}" for element in ("subject", "predicate", "object") for field in ("start", "end", "sent")
+    ]
+    spans = False
+
+    @abstractmethod
+    def write(self, identifier, triples:list) -> None:
+        """Write the triples of one identifier, one row per triple
+
+        Args:
+            identifier: identifier of the source text
+            triples (list): semantic triples of the source text
+        """
+
+    @abstractmethod
+    def close(self) -> None:
+        """Flush and close the output
+        """
+
+    def row(self, identifier, triple) -> tuple:
+        """Values of one row, with the spans of the Triple record if spans is set
+
+        Args:
+            identifier: identifier of the source text
+            triple (tuple or Triple): semantic triple, a Triple record if spans is set
+
+        Returns:
+            tuple: values in the order of COLUMNS (and SPAN_COLUMNS)
+        """
+        if self.spans:
+            return (identifier, *triple[:3], *(getattr(triple, column) for column in self.SPAN_COLUMNS))
+        return (identifier, *triple[:3])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class JsonlRowWriter(TripleRowWriter):
+    """One JSON object per triple
+    """
+
+    def __init__(self, path:str, spans=False) -> None:
+        self.file = open(path, "w", encoding="utf-8")
+        self.spans = spans
+        self.columns = self.COLUMNS + self.SPAN_COLUMNS if spans else self.COLUMNS
+
+    def write(self, identifier, triples:list) -> None:
+        for triple in triples:
+            self.file.write(json.dumps(dict(zip(self.columns, self.row(identifier, triple)))) + "\n")
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class CsvRowWriter(TripleRowWriter):
+    """csv file with a header row
+    """
+
+    def __init__(self, path:str, spans=False) -> None:
+        self.file = open(path, "w", encoding="utf-8", newline="")
+        self.spans = spans
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(self.COLUMNS + self.SPAN_COLUMNS if spans else self.COLUMNS)
+
+    def write(self, identifier, triples:list) -> None:
+        self.writer.writerows(self.row(identifier, triple) for triple in triples)
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class ParquetRowWriter(TripleRowWriter):
+    """Parquet file written one row group at a time
+
+    At most row_group_size rows are buffered, so memory does not grow with the corpus.
+    """
+
+    def __init__(self, path:str, row_group_size=100000, compression="snappy", negation=None, spans=False) -> None:
+        """Constructor
+
+        Args:
+            path (str): output path
+            row_group_size (int, optional): rows buffered per row group. Defaults to 100000.
+            compression (str, optional): parquet compression codec. Defaults to "snappy".
+            negation (str, optional): negation marker of the extraction method (e.g. "not "),
+                if given the markers are removed from the predicates (see split_negation) and 
+                a boolean negated column is added. Defaults to None.
+            spans (bool, optional): add the int64 SPAN_COLUMNS of Triple records. Defaults to False.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.pq = pq
+        self.path = path
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.negation = negation
+        self.spans = spans
+        self.columns_out = self.COLUMNS + ["negated"] if negation is not None else list(self.COLUMNS)
+        if spans:
+            self.columns_out += self.SPAN_COLUMNS
+        self.columns = {column : [] for column in self.columns_out}
+        self.schema = None
+        self.writer = None
+
+    def write(self, identifier, triples:list) -> None:
+        for triple in triples:
+            predicate = triple[1]
+            if self.negation is not None:
+                predicate, negated = split_negation(predicate, self.negation)
+                self.columns["negated"].append(negated)
+            self.columns["id"].append(identifier)
+            self.columns["subject"].append(triple[0])
+            self.columns["predicate"].append(predicate)
+            self.columns["object"].append(triple[2])
+            if self.spans:
+                for column in self.SPAN_COLUMNS:
+                    self.columns[column].append(getattr(triple, column))
+
+        if len(self.columns["id"]) >= self.row_group_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write buffered rows as one row group
+        """
+        if not self.columns["id"]:
+            return
+
+        table = self.pa.table(self.columns, schema=self.schema)
+        if self.writer is None:
+            #the first row group fixes the schema, e.g. the identifier type
+            self.schema = table.schema
+            self.writer = self.pq.ParquetWriter(self.path, self.schema, compression=self.compression)
+        self.writer.write_table(table, row_group_size=self.row_group_size)
+        self.columns = {column : [] for column in self.columns_out}
+
+    def close(self) -> None:
+        self.flush()
+        if self.writer is None:
+            types = dict.fromkeys(self.SPAN_COLUMNS, self.pa.int64())
+            types["negated"] = self.pa.bool_()
+            schema = self.pa.schema([
+                (column, types.get(column, self.pa.string()))
+                for column in self.columns_out
+            ])
+            self.writer = self.pq.ParquetWriter(self.path, schema, compression=self.compression)
+        self.writer.close()
+
+
+def split_negation(predicate:str, negation="not ") -> tuple:
+    """Remove the negation marker of find_sv/find_svos/find_svaos ("!love")
+    or product_triplets ("not love", "i not love") from a predicate
+
+    Args:
+        predicate (str): extracted predicate
+        negation (str, optional): negation marker of product_triplets. Defaults to "not ".
+
+    Returns:
+        tuple: predicate without the marker, if the predicate was negated
+    """
+    if predicate.startswith("!"):
+        return predicate[1:], True
+    if predicate.startswith(negation):
+        return predicate[len(negation):], True
+    #product_triplets puts the marker between the subject phrase and the verb
+    marker = " " + negation
+    if marker in predicate:
+        return predicate.replace(marker, " ", 1), True
+    return predicate, False
+
+
+def iri_local_name(term) -> str:
+    """Percent-encode a term for use in an IRI
+
+    Every character except ASCII letters, digits and "_" is encoded, so the
+    result is also a valid Turtle local name and N-Triples and Turtle output
+    share the same IRIs.
+
+    Args:
+        term: term, converted with str
+
+    Returns:
+        str: encoded term
+    """
+    return quote(str(term), safe="").replace(".", "%2E").replace("-", "%2D").replace("~", "%7E")
+
+
+def rdf_literal(value:str) -> str:
+    """N-Triples/Turtle string literal
+
+    Args:
+        value (str): literal value
+
+    Returns:
+        str: quoted and escaped literal
+    """
+    return '"' + LITERAL_ESCAPE_PATTERN.sub(lambda m: LITERAL_ESCAPES[m.group()], value) + '"'
+
+
+class RdfRowWriter(TripleRowWriter):
+    """Base class of the N-Triples and Turtle writers
+
+    Each triple becomes subject IRI, predicate IRI and object literal (or IRI).
+    Both negation markers are encoded the same way: the marker is removed and
+    the predicate IRI is taken from the negated namespace, so "!love" and
+    "not love" both give <{base}predicate/not/love>. With reify, every triple
+    is also an rdf:Statement linked to the identifier it was extracted from.
+    """
+
+    def __init__(self, path:str, base=DEFAULT_BASE_IRI, object_iri=False, reify=False, negation="not ") -> None:
+        """Constructor
+
+        Args:
+            path (str): output path, truncated on open
+            base (str, optional): base IRI of the generated IRIs. Defaults to DEFAULT_BASE_IRI.
+            object_iri (bool, optional): write objects as term IRIs instead of literals. Defaults to False.
+            reify (bool, optional): add an rdf:Statement per triple with its source identifier. Defaults to False.
+            negation (str, optional): negation marker of product_triplets. Defaults to "not ".
+        """
+        self.base = base
+        self.object_iri = object_iri
+        self.reify = reify
+        self.negation = negation
+        self.namespaces = {
+            "term" : f"{base}term/",
+            "pred" : f"{base}predicate/",
+            "neg" : f"{base}predicate/not/",
+            "doc" : f"{base}doc/",
+            "sx" : base,
+        }
+        self.file = open(path, "w", encoding="utf-8")
+
+    def iri(self, namespace:str, local_name:str) -> str:
+        return f"<{self.namespaces[namespace]}{local_name}>"
+
+    def statements(self, identifier, triples:list):
+        """Yield (subject, predicate, object) RDF terms of the triples of one identifier
+
+        Args:
+            identifier: identifier of the source text
+            triples (list): semantic triples of the source text
+
+        Yields:
+            tuple: subject, predicate, object as RDF terms
+        """
+        doc_name = iri_local_name(identifier)
+        for k, triple in enumerate(triples):
+            predicate, negated = split_negation(triple[1], self.negation)
+            sub = self.iri("term", iri_local_name(triple[0]))
+            pred = self.iri("neg" if negated else "pred", iri_local_name(predicate))
+            obj = self.iri("term", iri_local_name(triple[2])) if self.object_iri else rdf_literal(triple[2])
+            yield sub, pred, obj
+
+            if self.reify:
+                statement = self.iri("doc", f"{doc_name}/{k}")
+                yield statement, RDF_STATEMENT_PREDICATES["type"], RDF_STATEMENT_PREDICATES["statement"]
+                yield statement, RDF_STATEMENT_PREDICATES["subject"], sub
+                yield statement, RDF_STATEMENT_PREDICATES["predicate"], pred
+                yield statement, RDF_STATEMENT_PREDICATES["object"], obj
+                yield statement, self.iri("sx", "source"), self.iri("doc", doc_name)
+
+    def write(self, identifier, triples:list) -> None:
+        self.file.writelines(
+            f"{sub} {pred} {obj} .\n" for sub, pred, obj in self.statements(identifier, triples)
+        )
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class NTriplesRowWriter(RdfRowWriter):
+    """N-Triples, one RDF triple per line
+    """
+
+
+class TurtleRowWriter(RdfRowWriter):
+    """Turtle with prefixed names, one RDF triple per line
+    """
+
+    def __init__(self, path:str, base=DEFAULT_BASE_IRI, object_iri=False, reify=False, negation="not ") -> None:
+        super().__init__(path, base, object_iri, reify, negation)
+        self.file.writelines(
+            f"@prefix {prefix}: <{namespace}> .\n" for prefix, namespace in self.namespaces.items()
+        )
+        self.file.write("\n")
+
+    def iri(self, namespace:str, local_name:str) -> str:
+        #statement names contain "/", which is not allowed in a local name
+        if "/" in local_name:
+            return super().iri(namespace, local_name)
+        return f"{namespace}:{local_name}"
+
+
+WRITERS = {
+    "jsonl" : JsonlRowWriter,
+    "csv" : CsvRowWriter,
+    "parquet" : ParquetRowWriter,
+    "nt" : NTriplesRowWriter,
+    "ttl" : TurtleRowWriter,
+}
+
+
+def open_writer(path:str, fmt=None, **kwargs) -> TripleRowWriter:
+    """Open a triple row writer for a JSON lines, csv, parquet, N-Triples or Turtle file
+
+    Args:
+        path (str): output path
+        fmt (str, optional): one of WRITERS, inferred from the extension if None. Defaults to None.
+        **kwargs: options of the writer, e.g. row_group_size or base
+
+    Returns:
+        TripleRowWriter: writer accepting (identifier, triples)
+    """
+    return WRITERS[fmt or infer_format(path)](path, **kwargs)
+
+
+def export_triples(pairs, path:str, fmt=None, **kwargs) -> tuple:
+    """Stream (identifier, triples) pairs, e.g. TriplesExtractor.iter_semantic_triples, to a file
+
+    Args:
+        pairs (iterable): (identifier, list of semantic triples) pairs
+        path (str): output path
+        fmt (str, optional): one of WRITERS, inferred from the extension if None. Defaults to None.
+        **kwargs: options of the writer
+
+    Returns:
+        tuple: number of identifiers, number of triples written
+    """
+    n_docs = n_triples = 0
+    with open_writer(path, fmt, **kwargs) as writer:
+        for identifier, triples in pairs:
+            writer.write(identifier, triples)
+            n_docs += 1
+            n_triples += len(triples)
+    return n_docs, n_triples
@@ -1,9 +1,32 @@
+from functools import lru_cache
+from itertools import chain
+import numpy
 import pandas as pd
 import re
 from nltk.corpus import stopwords
 from nltk.stem import PorterStemmer
 
 
+TRIPLES_COLUMNS = ["id", "subject", "predicate", "object"]
+STEM_CACHE_SIZE = 2**18
+TOKEN_PATTERN = re.compile(r'\w+')
+
+_stemmer = PorterStemmer()
+
+
+@lru_cache(maxsize=STEM_CACHE_SIZE)
+def stem(word:str) -> str:
+    """Porter stem of a word, memoized in a bounded LRU cache shared across calls
+
+    Args:
+        word (str): word to stem
+
+    Returns:
+        str: stemmed word
+    """
+    return _stemmer.stem(word)
+
+
 def df_from_triples_dict(triples_dict:dict) -> pd.DataFrame:
     """Converts triples dictionary to pandas dataframe
 
@@ -14,27 +37,52 @@ def df_from_triples_dict(triples_dict:dict) -> pd.DataFrame:
         pd.DataFrame: pandas dataframe of semantic triples
     """
 
-    key_lst = []
-    subject_lst = []
-    predicate_lst = []
-    object_lst = []
+    lengths = [len(triples_lst) for triples_lst in triples_dict.values()]
+    flat_triples = list(chain.from_iterable(triples_dict.values()))
 
-    for key, triples_lst in triples_dict.items():
+    if not flat_triples:
+        return pd.DataFrame.from_dict({column : [] for column in TRIPLES_COLUMNS})
 
-        for triples in triples_lst:
-            key_lst.append(key)
-            subject_lst.append(triples[0])
-            predicate_lst.append(triples[1])
-            object_lst.append(triples[2])
+    #keys are repeated once per triple, with the dtype inference of a plain list of the keys 
+    #that have triples (keys without triples produce no rows and must not change the dtype)
+    keys_with_rows = [key for key, length in zip(triples_dict.keys(), lengths) if length]
+    id_series = pd.Series(keys_with_rows).repeat([length for length in lengths if length]).reset_index(drop=True)
+    if any(len(triples) != 3 for triples in flat_triples):
+        flat_triples = [triples[:3] for triples in flat_triples]
+    triples_df = pd.DataFrame(flat_triples, columns=TRIPLES_COLUMNS[1:])
+    triples_df.insert(0, "id", id_series)
 
-    dct = {
-        "id" : key_lst,
-        "subject" : subject_lst,
-        "predicate" : predicate_lst,
-        "object" : object_lst
-    }
+    return triples_df
 
-    return pd.DataFrame.from_dict(dct)
+
+def iter_df_from_triples(pairs, chunk_rows=1000000):
+    """Converts (identifier, triples) pairs to pandas dataframes of at most about chunk_rows rows
+
+    Args:
+        pairs (iterable): (identifier, triples) pairs, e.g. triples_dict.items()
+            or TriplesExtractor.iter_semantic_triples
+        chunk_rows (int, optional): rows per dataframe, exceeded only by a single identifier. Defaults to 1000000.
+
+    Yields:
+        pd.DataFrame: pandas dataframe of semantic triples
+    """
+
+    chunk = {}
+    n_rows = 0
+
+    for key, triples_lst in pairs:
+        if n_rows + len(triples_lst) > chunk_rows and chunk:
+            yield df_from_triples_dict(chunk)
+            chunk = {}
+            n_rows = 0
+        if key in chunk:
+            chunk[key] = chunk[key] + list(triples_lst)
+        else:
+            chunk[key] = triples_lst
+        n_rows += len(triples_lst)
+
+    if chunk:
+        yield df_from_triples_dict(chunk)
 
 
 def triples_dict_from_df(triples_df:pd.DataFrame, 
@@ -56,16 +104,46 @@ def triples_dict_from_df(triples_df:pd.DataFrame,
         dict: dictionary representation of semantic triples
     """
 
-    triples_dict = {}
+    id_lst = _column_values(triples_df[identifier])
+    subject_lst = _column_values(triples_df[subject])
+    predicate_lst = _column_values(triples_df[predicate])
+    obj_lst = _column_values(triples_df[obj])
+    if len(id_lst) == 0:
+        return {}
 
-    id_lst = triples_df[identifier].values
-    subject_lst = triples_df[subject].values
-    predicate_lst = triples_df[predicate].values
-    obj_lst = triples_df[obj].values
+    codes, uniques = pd.factorize(triples_df[identifier], sort=False)
 
-    zipped = zip(id_lst, subject_lst, predicate_lst, obj_lst)
+    if (codes < 0).any():
+        #missing identifiers have no single group key, keep row by row semantics
+        return _triples_dict_from_rows(id_lst, subject_lst, predicate_lst, obj_lst)
 
-    for id_value, sub, pred, obj in zipped:
+    #stable sort keeps row order within each identifier, codes follow first appearance
+    order = numpy.argsort(codes, kind="stable")
+    starts = numpy.flatnonzero(numpy.diff(codes[order])) + 1
+    starts = numpy.concatenate([[0], starts]).tolist()
+    ends = starts[1:] + [len(order)]
+
+    keys = _column_values(uniques).tolist()
+
+    triples = list(zip(subject_lst[order], predicate_lst[order], obj_lst[order]))
+    return {key : triples[start:end] for key, start, end in zip(keys, starts, ends)}
+
+
+def _column_values(values) -> numpy.ndarray:
+    """Object array of a column holding Python scalars, as iterating the column would give
+
+    Numeric columns become Python ints/floats instead of numpy scalars, extension 
+    arrays (e.g. arrow strings) become objects, datetimes stay Timestamps.
+    """
+    if isinstance(values, (pd.Series, pd.Index)):
+        return values.to_numpy(dtype=object)
+    return numpy.asarray(values, dtype=object)
+
+
+def _triples_dict_from_rows(id_lst, subject_lst, predicate_lst, obj_lst) -> dict:
+    triples_dict = {}
+
+    for id_value, sub, pred, obj in zip(id_lst, subject_lst, predicate_lst, obj_lst):
         
         triples = (sub, pred, obj)
 
@@ -77,6 +155,40 @@ def triples_dict_from_df(triples_df:pd.DataFrame,
     return triples_dict
 
 
+def triples_dict_from_df_chunks(chunks, 
+        identifier="id",
+        subject="subject",
+        predicate="predicate",
+        obj="object"
+    ) -> dict:
+    """Converts semantic triples (ST) df chunks to one dictionary representation
+
+    Gives the same result as triples_dict_from_df on the concatenated chunks,
+    without materializing the full dataframe.
+
+    Args:
+        chunks (iterable): pandas dataframes of ST, e.g. pd.read_csv(..., chunksize=...)
+        identifier (str, optional): identifier for ST. Defaults to "id".
+        subject (str, optional): subject of ST. Defaults to "subject".
+        predicate (str, optional): predicate of ST. Defaults to "predicate".
+        obj (str, optional): object of ST. Defaults to "object".
+
+    Returns:
+        dict: dictionary representation of semantic triples
+    """
+
+    triples_dict = {}
+
+    for chunk in chunks:
+        for id_value, triples_lst in triples_dict_from_df(chunk, identifier, subject, predicate, obj).items():
+            if id_value in triples_dict:
+                triples_dict[id_value].extend(triples_lst)
+            else:
+                triples_dict[id_value] = triples_lst
+
+    return triples_dict
+
+
 def simple_preprocess(text_list:list) -> list:
     """Performs simple preprocessing on the list of texts
 
@@ -111,18 +223,11 @@ def tokens_intersect(id_list:list, source_tokens_list:list, target_tokens_list:l
 
     for _id, source_tokens, target_tokens in zip(id_list, source_tokens_list, target_tokens_list):
 
-        #make tokens unique:
-        uniq_source_tokens = list(set(source_tokens))
-        uniq_target_tokens = list(set(target_tokens))
+        #make tokens unique, one hashed intersection instead of list membership per token:
+        uniq_source_tokens = set(source_tokens)
 
-        count = 0
-
-        for source_token in uniq_source_tokens:
-            if source_token in uniq_target_tokens:
-                count += 1
-            if count > threshold:
-                valid_id_list.append(_id)
-                break
+        if uniq_source_tokens and len(uniq_source_tokens.intersection(target_tokens)) > threshold:
+            valid_id_list.append(_id)
     
     return valid_id_list
 
@@ -136,13 +241,22 @@ def remove_stopwords(tokens_list:list) -> list:
     Returns:
         list: list of token lists with stop words removed
     """
-    return_lst = []
-    stopw = stopwords.words('english')
+    stopw = stopword_set('english')
 
-    for lst in tokens_list:
-        return_lst.append([word for word in lst if word not in stopw])
+    return [[word for word in lst if word not in stopw] for lst in tokens_list]
 
-    return return_lst
+
+@lru_cache(maxsize=None)
+def stopword_set(language="english") -> frozenset:
+    """nltk stopwords as a frozenset, loaded once per language
+
+    Args:
+        language (str, optional): nltk stopwords language. Defaults to "english".
+
+    Returns:
+        frozenset: stopwords
+    """
+    return frozenset(stopwords.words(language))
 
 
 def remove_numbers(tokens_list:list) -> list:
@@ -188,13 +302,42 @@ def stem_words(tokens_list:list) -> list:
     Returns:
         list: list of tokens with stemmed words
     """
-    return_lst = []
-    stemmer = PorterStemmer()
+    return [[stem(s) for s in lst] for lst in tokens_list]
 
-    for lst in tokens_list:
-        return_lst.append([stemmer.stem(s) for s in lst])
 
-    return return_lst
+def iter_preprocess(text_list, drop_numbers=True, drop_single_characters=True,
+    drop_stopwords=True, stemming=False, stem_cache=True, language="english"):
+    """Fused simple_preprocess, remove_numbers, remove_single_character, remove_stopwords 
+    and stem_words, in one pass over each text
+
+    Args:
+        text_list (iterable): texts, e.g. a streaming corpus
+        drop_numbers (bool, optional): remove number tokens. Defaults to True.
+        drop_single_characters (bool, optional): remove single character tokens. Defaults to True.
+        drop_stopwords (bool, optional): remove nltk stopwords. Defaults to True.
+        stemming (bool, optional): stem the remaining tokens. Defaults to False.
+        stem_cache (bool, optional): stem through the shared LRU cache of stem. Defaults to True.
+        language (str, optional): nltk stopwords language. Defaults to "english".
+
+    Yields:
+        list: preprocessed tokens of one text, as from the chained functions
+    """
+    findall = TOKEN_PATTERN.findall
+    stopw = stopword_set(language) if drop_stopwords else frozenset()
+    min_len = 2 if drop_single_characters else 1
+    stem_func = (stem if stem_cache else PorterStemmer().stem) if stemming else None
+
+    for text in text_list:
+        #\w+ runs are the tokens left by substituting non word characters and splitting
+        tokens = [
+            token for token in findall(text.lower())
+            if len(token) >= min_len
+            and not (drop_numbers and token.isdigit())
+            and token not in stopw
+        ]
+        if stem_func is not None:
+            tokens = [stem_func(token) for token in tokens]
+        yield tokens
 
 
 def stem_triples(df:pd.DataFrame, id_col="id", 
@@ -214,28 +357,10 @@ def stem_triples(df:pd.DataFrame, id_col="id",
         pd.DataFrame: [description]
     """
 
-    stemmer = PorterStemmer()
-    sbj_lst = df[sbj_col].tolist()
-    predicate_lst = df[pred_col].tolist()
-    obj_lst = df[obj_col].tolist() 
-    
-    stem_sbj_lst = []
-    stem_predicate_lst = []
-    stem_obj_lst = [] 
-    
-    for sbj, pred, obj in zip(sbj_lst, predicate_lst, obj_lst):
-        negation_removed = False
-        if negation in pred:
-            pred = pred.replace(negation,'')
-            negation_removed = True
-
-        stemmed_pred = stemmer.stem(pred)
-        if negation_removed:
-            stemmed_pred = f"{negation}{stemmed_pred}"
-        stem_predicate_lst.append(stemmer.stem(stemmed_pred))
-        
-        stem_sbj_lst.append(stemmer.stem(sbj))
-        stem_obj_lst.append(stemmer.stem(obj))
+    #triple columns are highly repetitive, so only unique values are stemmed
+    stem_sbj_lst = _map_unique(df[sbj_col], stem)
+    stem_predicate_lst = _map_unique(df[pred_col], lambda pred: _stem_predicate(pred, negation))
+    stem_obj_lst = _map_unique(df[obj_col], stem)
         
     output_df = pd.DataFrame(
         {
@@ -246,4 +371,28 @@ def stem_triples(df:pd.DataFrame, id_col="id",
         }
     )
     
-    return output_df
\ No newline at end of file
+    return output_df
+
+
+def _stem_predicate(pred:str, negation:str) -> str:
+    negation_removed = False
+    if negation in pred:
+        pred = pred.replace(negation,'')
+        negation_removed = True
+
+    stemmed_pred = stem(pred)
+    if negation_removed:
+        stemmed_pred = f"{negation}{stemmed_pred}"
+
+    return stem(stemmed_pred)
+
+
+def _map_unique(column:pd.Series, func) -> list:
+    """Apply func once per unique value of column and map the results back to every row
+    """
+    codes, uniques = pd.factorize(column, sort=False)
+    if (codes < 0).any():
+        raise ValueError(f"column {column.name} contains missing values")
+
+    mapped = numpy.array([func(value) for value in _column_values(uniques)], dtype=object)
+    return mapped[codes].tolist()
@@ -0,0 +1,140 @@
+import importlib
+import sys
+import pytest
+import spacy
+from spacy.language import Language
+from spacy.tokens import Doc
+
+#hand-built dependency trees: token texts -> (heads, deps, pos), heads as token indexes
+TREES = {
+    ("i", "love", "the", "screen") : (
+        [1, 1, 3, 1],
+        ["nsubj", "ROOT", "det", "dobj"],
+        ["PRON", "VERB", "DET", "NOUN"],
+    ),
+    ("the", "battery", "does", "not", "last", "long") : (
+        [1, 4, 4, 4, 4, 4],
+        ["det", "nsubj", "aux", "neg", "ROOT", "advmod"],
+        ["DET", "NOUN", "AUX", "PART", "VERB", "ADV"],
+    ),
+    ("i", "love", "the", "camera", "and", "the", "big", "screen") : (
+        [1, 1, 3, 1, 3, 7, 7, 3],
+        ["nsubj", "ROOT", "det", "dobj", "cc", "det", "amod", "conj"],
+        ["PRON", "VERB", "DET", "NOUN", "CCONJ", "DET", "ADJ", "NOUN"],
+    ),
+    ("great", "phone") : (
+        [1, 1],
+        ["amod", "ROOT"],
+        ["ADJ", "NOUN"],
+    ),
+    ("the", "phone", "charges", "fast", ".", "i", "hate", "the", "case", ".") : (
+        [1, 2, 2, 2, 2, 6, 6, 8, 6, 6],
+        ["det", "nsubj", "ROOT", "advmod", "punct", "nsubj", "ROOT", "det", "dobj", "punct"],
+        ["DET", "NOUN", "VERB", "ADV", "PUNCT", "PRON", "VERB", "DET", "NOUN", "PUNCT"],
+    ),
+    ("my", "wife", "and", "i", "never", "use", "the", "touch", "screen", "lock") : (
+        [1, 5, 1, 1, 5, 5, 9, 8, 9, 5],
+        ["poss", "nsubj", "cc", "conj", "neg", "ROOT", "det", "compound", "compound", "dobj"],
+        ["DET", "NOUN", "CCONJ", "PRON", "ADV", "VERB", "DET", "NOUN", "NOUN", "NOUN"],
+    ),
+}
+TEXTS = [" ".join(words).replace(" .", ".") for words in TREES]
+
+RANDOM_WORDS = ["i", "it", "me", "the", "and", "not", "no", "never", "n't", "love", "works", "is",
+    "charge", "fast", "great", "bad", "screen", "battery", "phone", "camera"]
+RANDOM_POS = ["VERB", "NOUN", "ADJ", "ADP", "PRON", "DET", "ADV", "CCONJ", "PART", "AUX"]
+RANDOM_DEPS = ["nsubj", "nsubjpass", "csubj", "agent", "expl", "dobj", "dative", "attr", "oprd",
+    "acomp", "advcl", "advmod", "amod", "appos", "nmod", "ccomp", "xcomp", "poss", "compound",
+    "prep", "conj", "cc", "aux", "neg", "det", "pobj"]
+
+MODEL_PACKAGE = "tree_model"
+MODEL_INIT = '''from pathlib import Path
+from spacy.util import load_model_from_path
+
+
+def load(**overrides):
+    return load_model_from_path(Path(__file__).parent / "model", **overrides)
+'''
+
+
+def tree_doc(vocab, words:tuple) -> Doc:
+    """Doc of one of the TREES
+
+    Args:
+        vocab (Vocab): vocab of the doc
+        words (tuple): token texts, a key of TREES
+
+    Returns:
+        Doc: parsed doc
+    """
+    heads, deps, pos = TREES[tuple(words)]
+    spaces = [i + 1 < len(words) and words[i + 1] != "." for i in range(len(words))]
+    return Doc(vocab, words=list(words), spaces=spaces, heads=heads, deps=deps, pos=pos)
+
+
+def random_doc(vocab, rng) -> Doc:
+    """Doc with a random projective tree and random labels, covering rule branches the TREES miss
+
+    Args:
+        vocab (Vocab): vocab of the doc
+        rng (random.Random): seeded random generator
+
+    Returns:
+        Doc: parsed doc of 1 to 25 tokens, one sentence
+    """
+    n = rng.randint(1, 25)
+    heads = list(range(n))
+
+    def attach(lo, hi, parent):
+        #the tokens in [lo, hi) form the subtree of one child of parent
+        if lo >= hi:
+            return
+        head = rng.randrange(lo, hi)
+        heads[head] = parent
+        attach(lo, head, head)
+        attach(head + 1, hi, head)
+
+    root = rng.randrange(n)
+    attach(0, root, root)
+    attach(root + 1, n, root)
+    deps = [rng.choice(RANDOM_DEPS) for _ in range(n)]
+    deps[root] = "ROOT"
+
+    return Doc(
+        vocab, words=[rng.choice(RANDOM_WORDS) for _ in range(n)], heads=heads, deps=deps,
+        pos=[rng.choice(RANDOM_POS) for _ in range(n)],
+    )
+
+
+@Language.component("tree_parser")
+def tree_parser(doc:Doc) -> Doc:
+    """Copy the parse of the matching TREES entry onto the doc
+    """
+    from spacy.attrs import DEP, HEAD, POS
+    parsed = tree_doc(doc.vocab, tuple(tok.text for tok in doc))
+    doc.from_array([HEAD, DEP, POS], parsed.to_array([HEAD, DEP, POS]))
+    return doc
+
+
+@pytest.fixture(scope="session")
+def tree_model(tmp_path_factory) -> str:
+    """Installed model package parsing TEXTS with the tree_parser, loaded by name like en_core_web_sm
+
+    The package and its dist-info live in a temporary directory put on sys.path,
+    so spacy.util.is_package finds it and no download is attempted.
+    """
+    site = tmp_path_factory.mktemp("site")
+    package = site / MODEL_PACKAGE
+    package.mkdir()
+    nlp = spacy.blank("en")
+    nlp.add_pipe("tree_parser")
+    nlp.to_disk(package / "model")
+    (package / "__init__.py").write_text(MODEL_INIT)
+    dist_info = site / f"{MODEL_PACKAGE}-0.0.0.dist-info"
+    dist_info.mkdir()
+    (dist_info / "METADATA").write_text(f"Metadata-Version: 2.1\nName: {MODEL_PACKAGE}\nVersion: 0.0.0\n")
+
+    sys.path.insert(0, str(site))
+    importlib.invalidate_caches()
+    yield MODEL_PACKAGE
+    sys.path.remove(str(site))
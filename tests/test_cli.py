@@ -0,0 +1,77 @@
+import csv
+import json
+import pytest
+from modules.TriplesExtractor import TriplesExtractor
+from modules.cli import main
+from modules.streams import DEFAULT_BASE_IRI
+from tests.conftest import TEXTS
+
+
+def write_input(path, texts=TEXTS) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps({"id" : f"p{i}", "text" : text}) + "\n" for i, text in enumerate(texts))
+
+
+def expected_rows(tree_model:str, method:str) -> list:
+    results = TriplesExtractor(tree_model, method=method).semantic_triples([f"p{i}" for i in range(len(TEXTS))], TEXTS)
+    return [[identifier, *triple] for identifier, triples in results.items() for triple in triples]
+
+
+def test_csv_run(tree_model, tmp_path, capsys):
+    write_input(tmp_path / "input.jsonl")
+    output = tmp_path / "triples.csv"
+
+    assert main([str(tmp_path / "input.jsonl"), str(output), "--model", tree_model, "--method", "product"]) == 0
+    with open(output, encoding="utf-8", newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["id", "subject", "predicate", "object"]
+    assert rows[1:] == expected_rows(tree_model, "product")
+    assert f"done: {len(TEXTS)} docs" in capsys.readouterr().err
+
+
+def test_jsonl_run_from_csv_input(tree_model, tmp_path, capsys):
+    with open(tmp_path / "input.csv", "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["key", "body"])
+        writer.writerows([f"p{i}", text] for i, text in enumerate(TEXTS))
+    output = tmp_path / "triples.jsonl"
+
+    assert main([
+        str(tmp_path / "input.csv"), str(output), "--model", tree_model, "--id-field", "key",
+        "--text-field", "body", "--batch-size", "2", "--quiet",
+    ]) == 0
+    with open(output, encoding="utf-8") as f:
+        rows = [list(json.loads(line).values()) for line in f]
+    assert rows == expected_rows(tree_model, "svos")
+    assert capsys.readouterr().err == ""
+
+
+def test_dedup_run_reports_ratio(tree_model, tmp_path, capsys):
+    write_input(tmp_path / "input.jsonl", TEXTS + TEXTS)
+    output = tmp_path / "triples.csv"
+
+    assert main([str(tmp_path / "input.jsonl"), str(output), "--model", tree_model, "--dedup", "exact"]) == 0
+    with open(output, encoding="utf-8", newline="") as f:
+        assert len(list(csv.reader(f))) == 2 * len(expected_rows(tree_model, "svos")) + 1
+    assert f"dedup: {len(TEXTS)} unique texts, ratio 50.0%" in capsys.readouterr().err
+
+
+def test_ntriples_run(tree_model, tmp_path):
+    write_input(tmp_path / "input.jsonl")
+    output = tmp_path / "triples.nt"
+
+    assert main([str(tmp_path / "input.jsonl"), str(output), "--model", tree_model, "--quiet"]) == 0
+    with open(output, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert len(lines) == len(expected_rows(tree_model, "svos"))
+    assert lines[0] == f"<{DEFAULT_BASE_IRI}term/i> <{DEFAULT_BASE_IRI}predicate/love> \"screen\" ."
+    assert any(f"<{DEFAULT_BASE_IRI}predicate/not/use>" in line for line in lines)
+
+
+@pytest.mark.parametrize("option", ["--progress-every", "--batch-size", "--workers", "--shard-size"])
+@pytest.mark.parametrize("value", ["0", "-1", "x"])
+def test_counts_must_be_positive(tmp_path, capsys, option, value):
+    with pytest.raises(SystemExit) as excinfo:
+        main([str(tmp_path / "input.jsonl"), str(tmp_path / "triples.csv"), option, value])
+    assert excinfo.value.code == 2
+    assert option in capsys.readouterr().err
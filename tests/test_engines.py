@@ -0,0 +1,127 @@
+import random
+import pytest
+import spacy
+from benchmarks.bench_conjunctions import coordination_doc, recursive_closure
+from modules.DepenParseBase import DepenParseBase
+from modules.DepenParseArray import DepenParseArray
+from modules.DepenParseProduct import DepenParseProduct
+from spacy.tokens import Doc
+from tests.conftest import TREES, random_doc, tree_doc
+
+VOCAB = spacy.blank("en").vocab
+
+
+def all_flavors(parser, doc) -> tuple:
+    return parser.find_svos(doc), parser.find_svaos(doc), parser.product_triplets("p", doc)
+
+
+@pytest.fixture(scope="module")
+def parsers() -> tuple:
+    return DepenParseProduct(), DepenParseArray()
+
+
+def test_fixed_trees(parsers):
+    token, _ = parsers
+    doc = tree_doc(VOCAB, ("i", "love", "the", "camera", "and", "the", "big", "screen"))
+
+    assert token.find_svos(doc) == [("i", "love", "camera"), ("i", "love", "screen")]
+    assert token.find_svaos(doc) == [("i", "love", "camera"), ("i", "love", "big screen")]
+    assert token.product_triplets("p", doc) == ([("p", "i love", "camera"), ("p", "i love", "big screen")], [])
+
+    doc = tree_doc(VOCAB, ("the", "battery", "does", "not", "last", "long"))
+    assert token.find_svaos(doc) == [("battery", "!last", "long")]
+    assert token.product_triplets("p", doc) == ([("p", "battery not last", "long")], [])
+
+    doc = tree_doc(VOCAB, ("great", "phone"))
+    assert token.product_triplets("p", doc) == ([("p", "great", "phone")], [])
+
+
+@pytest.mark.parametrize("words", list(TREES))
+def test_engines_agree_on_fixed_trees(parsers, words):
+    token, array = parsers
+    doc = tree_doc(VOCAB, words)
+
+    assert all_flavors(array, doc) == all_flavors(token, doc)
+
+
+def test_engines_agree_on_random_trees(parsers):
+    token, array = parsers
+    rng = random.Random(0)
+    n_triples = 0
+
+    for _ in range(500):
+        doc = random_doc(VOCAB, rng)
+        expected = all_flavors(token, doc)
+        assert all_flavors(array, doc) == expected
+        n_triples += len(expected[0]) + len(expected[1]) + len(expected[2][0])
+
+    assert n_triples > 0
+
+
+@pytest.mark.parametrize("shape", ["flat", "nested", "tree"])
+def test_conjunction_closure_is_duplicate_free(parsers, shape):
+    doc = coordination_doc(VOCAB, 31, shape)
+    base = DepenParseBase()
+
+    objs = base.get_objs_from_conjunctions([doc[3]])
+    assert len(objs) == 30
+    #same first-occurrence order as re-expanding the accumulated list
+    assert objs == list(dict.fromkeys(recursive_closure(base, [doc[3]])))
+
+    #one triple per conjunct, words repeat every len(FEATURES) conjuncts
+    assert len(base.find_svos(doc)) == 31
+    assert all_flavors(parsers[1], doc) == all_flavors(parsers[0], doc)
+
+
+def test_phrases_are_built_once_per_doc(monkeypatch):
+    parser = DepenParseProduct()
+    doc = Doc(
+        VOCAB, words=["wife", "and", "husband", "like", "the", "screen", "and", "battery", "and", "camera"],
+        heads=[3, 0, 0, 3, 5, 3, 5, 5, 5, 5],
+        deps=["nsubj", "cc", "conj", "ROOT", "det", "dobj", "cc", "conj", "cc", "conj"],
+        pos=["NOUN", "CCONJ", "NOUN", "VERB", "DET", "NOUN", "CCONJ", "NOUN", "CCONJ", "NOUN"],
+    )
+    built = []
+    for name in ("generate_sub_compound", "generate_left_right_adjectives"):
+        method = getattr(parser, name)
+        monkeypatch.setattr(parser, name, lambda tok, method=method: built.append(tok.i) or method(tok))
+
+    #2 subjects x 3 objects, each phrase built once
+    triples, _ = parser.product_triplets("p", doc)
+    assert len(triples) == 6
+    assert sorted(built) == [0, 2, 5, 7, 9]
+
+
+@pytest.mark.parametrize("engine", [DepenParseProduct, DepenParseArray])
+def test_single_pass_matches_separate_calls(engine):
+    parser = engine()
+    rng = random.Random(1)
+
+    for _ in range(200):
+        doc = random_doc(VOCAB, rng)
+        svos, svaos, product = all_flavors(parser, doc)
+        assert parser.find_all(doc) == {"svos" : svos, "svaos" : svaos}
+        results = parser.extract_all("p", doc)
+        assert (results["svos"], results["svaos"], (results["product"], results["reasons"])) == (svos, svaos, product)
+    parser = engine()
+    rng = random.Random(1)
+
+    for _ in range(200):
+        doc = random_doc(VOCAB, rng)
+        svos, svaos, product = all_flavors(parser, doc)
+        assert parser.find_all(doc) == {"svos" : svos, "svaos" : svaos}
+        results = parser.extract_all("p", doc)
+        assert (results["svos"], results["svaos"], (results["product"], results["reasons"])) == (svos, svaos, product)
+
+
+@pytest.mark.parametrize("engine", [DepenParseProduct, DepenParseArray])
+def test_rule_changes_apply_to_the_next_call(engine):
+    parser = engine()
+    doc = tree_doc(VOCAB, ("the", "battery", "does", "not", "last", "long"))
+    assert parser.find_svaos(doc) == [("battery", "!last", "long")]
+
+    parser.NEGATION = "no "
+    assert parser.product_triplets("p", doc) == ([("p", "battery no last", "long")], [])
+
+    parser.SUBJECTS = [label for label in parser.SUBJECTS if label != "nsubj"]
+    assert parser.find_svaos(doc) == []
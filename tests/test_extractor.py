@@ -0,0 +1,220 @@
+import json
+import multiprocessing
+import os
+import pytest
+import spacy
+import time
+from modules.CorpusRunner import CorpusRunner, WorkerInitError, _extract_shard
+from modules.DepenParseBase import DepenParseBase
+from modules.TriplesExtractor import TriplesExtractor, verify_profile
+from tests.conftest import TEXTS
+
+IDENTIFIERS = [f"p{i}" for i in range(len(TEXTS))]
+
+
+def test_batched_parsing_matches_single_docs(tree_model):
+    extractor = TriplesExtractor(tree_model)
+    nlp = spacy.load(tree_model)
+    expected = {identifier : DepenParseBase().find_svos(nlp(text)) for identifier, text in zip(IDENTIFIERS, TEXTS)}
+
+    assert extractor.semantic_triples(IDENTIFIERS, TEXTS) == expected
+    assert extractor.semantic_triples(IDENTIFIERS, TEXTS, batch_size=2) == expected
+    assert extractor.last_run_stats["docs"] == len(TEXTS)
+
+
+def test_none_texts_are_skipped(tree_model):
+    extractor = TriplesExtractor(tree_model)
+
+    for batch_size in (None, 2):
+        results = extractor.semantic_triples(["a", "b", "c"], [None, TEXTS[0], None], batch_size=batch_size)
+        assert results == {"b" : [("i", "love", "screen")]}
+        assert extractor.last_run_stats["docs"] == 1
+
+
+def test_stream_yields_in_input_order(tree_model, tmp_path):
+    extractor = TriplesExtractor(tree_model)
+    expected = extractor.semantic_triples(IDENTIFIERS, TEXTS)
+    path = tmp_path / "triples.jsonl"
+
+    #a generator input, consumed lazily
+    stream = extractor.iter_semantic_triples(
+        ((identifier, text) for identifier, text in zip(IDENTIFIERS, TEXTS)), batch_size=2,
+        output_path=str(path), flush_every=4,
+    )
+    assert next(stream) == (IDENTIFIERS[0], expected[IDENTIFIERS[0]])
+    results = [next(stream)] + list(stream)
+
+    assert [identifier for identifier, _ in results] == IDENTIFIERS[1:]
+    assert extractor.last_run_stats["docs"] == len(TEXTS)
+    with open(path, encoding="utf-8") as f:
+        written = {record["id"] : [tuple(triple) for triple in record["triples"]] for record in map(json.loads, f)}
+    assert written == expected
+
+
+@pytest.mark.parametrize("method", ["sv", "svos", "svaos", "product"])
+def test_methods_match_parser(tree_model, method):
+    extractor = TriplesExtractor(tree_model, method=method)
+    parser = extractor.parser
+    nlp = spacy.load(tree_model)
+
+    results = extractor.semantic_triples(IDENTIFIERS, TEXTS)
+    for identifier, text in zip(IDENTIFIERS, TEXTS):
+        doc = nlp(text)
+        if method == "product":
+            assert results[identifier] == parser.product_triplets(identifier, doc)[0]
+        else:
+            assert results[identifier] == getattr(parser, f"find_{method}")(doc)
+
+
+@pytest.mark.parametrize("profile", ["dependency", "auto"])
+def test_profiles_give_the_full_triples(tree_model, profile):
+    expected = TriplesExtractor(tree_model, method="svaos").semantic_triples(IDENTIFIERS, TEXTS)
+
+    assert TriplesExtractor(tree_model, method="svaos", profile=profile).semantic_triples(IDENTIFIERS, TEXTS) == expected
+    assert verify_profile(TEXTS, profile, tree_model, method="svaos") == []
+
+
+@pytest.mark.parametrize("engine", ["token", "array"])
+def test_engines_and_batching_agree(tree_model, engine):
+    expected = TriplesExtractor(tree_model, method="product").semantic_triples(IDENTIFIERS, TEXTS)
+    extractor = TriplesExtractor(tree_model, method="product", engine=engine)
+
+    assert extractor.semantic_triples(IDENTIFIERS, TEXTS, batch_size=2) == expected
+    assert extractor.last_run_stats["docs"] == len(TEXTS)
+
+
+@pytest.mark.parametrize("method", ["svaos", "product"])
+def test_dedup_fan_out(tree_model, method):
+    texts = TEXTS + TEXTS[::-1] + [None]
+    identifiers = [f"p{i}" for i in range(len(texts))]
+    expected = TriplesExtractor(tree_model, method=method).semantic_triples(identifiers, texts)
+
+    extractor = TriplesExtractor(tree_model, method=method, dedup="exact", dedup_window=5)
+    results = list(extractor.iter_semantic_triples(zip(identifiers, texts)))
+
+    assert dict(results) == expected
+    assert [identifier for identifier, _ in results] == identifiers[:-1]
+    stats = extractor.last_run_stats
+    assert stats["docs"] == len(texts) - 1
+    #windows of 5 texts: duplicates are only merged within a window
+    assert len(TEXTS) <= stats["unique_texts"] < len(texts) - 1
+    assert stats["dedup_ratio"] == pytest.approx(1 - stats["unique_texts"] / stats["docs"])
+
+
+def test_fan_out_lists_are_not_shared(tree_model):
+    extractor = TriplesExtractor(tree_model, dedup="exact")
+    results = extractor.semantic_triples(["a", "b"], [TEXTS[0], TEXTS[0]])
+
+    results["a"].append(("x", "y", "z"))
+    assert results["b"] == [("i", "love", "screen")]
+
+
+def test_normalized_dedup_shares_the_first_variant(tree_model):
+    extractor = TriplesExtractor(tree_model, method="product", dedup="normalized")
+    variant = "  " + TEXTS[0].replace(" ", "   ") + " "
+
+    results = extractor.semantic_triples(["a", "b"], [TEXTS[0], variant])
+    assert results["b"] == [("b", *triple[1:]) for triple in results["a"]]
+    assert extractor.last_run_stats["unique_texts"] == 1
+
+
+def test_invalid_options(tree_model):
+    for kwargs in ({"method" : "spo"}, {"engine" : "gpu"}, {"dedup" : "fuzzy"}, {"profile" : "tiny"}):
+        with pytest.raises(ValueError):
+            TriplesExtractor(tree_model, **kwargs)
+
+
+fork_only = pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(),
+    reason="workers need the tree_parser component registered by the test process",
+)
+
+
+def crashing_shard(shard:list, *args):
+    #kills the worker process on a "crash" text
+    if any(text == "crash" for _, text in shard):
+        os._exit(1)
+    return _extract_shard(shard, *args)
+
+
+@fork_only
+def test_corpus_runner_matches_extractor(tree_model):
+    texts = TEXTS * 3
+    identifiers = list(range(len(texts)))
+    expected = TriplesExtractor(tree_model, method="product").semantic_triples(identifiers, texts)
+
+    runner = CorpusRunner(tree_model, n_workers=2, shard_size=4, method="product", start_method="fork")
+    assert list(runner.iter_semantic_triples(zip(identifiers, texts))) == list(expected.items())
+    assert runner.failed_shards == []
+    assert runner.last_run_stats["docs"] == len(texts)
+
+
+@fork_only
+def test_corpus_runner_dedup_stats(tree_model):
+    #dedup runs per shard, so keep the copies next to each other
+    texts = [text for text in TEXTS for _ in range(3)]
+    identifiers = list(range(len(texts)))
+    expected = TriplesExtractor(tree_model, method="product").semantic_triples(identifiers, texts)
+
+    runner = CorpusRunner(tree_model, n_workers=2, shard_size=4, method="product", dedup="exact", start_method="fork")
+    assert runner.semantic_triples(identifiers, texts) == expected
+    assert runner.last_run_stats["unique_texts"] < len(texts)
+    assert runner.last_run_stats["dedup_ratio"] > 0
+
+
+@fork_only
+def test_corpus_runner_isolates_failing_shards(tree_model):
+    #the tree_parser raises on texts without a tree
+    texts = TEXTS[:2] + ["no tree for this text"] + TEXTS[2:4]
+    runner = CorpusRunner(tree_model, n_workers=2, shard_size=2, start_method="fork")
+
+    results = runner.semantic_triples(list(range(len(texts))), texts)
+    assert sorted(results) == [0, 1, 4]
+    assert [failure["shard"] for failure in runner.failed_shards] == [1]
+    assert runner.failed_shards[0]["identifiers"] == [2, 3]
+
+
+@fork_only
+def test_corpus_runner_survives_worker_crash(tree_model, monkeypatch):
+    monkeypatch.setattr("modules.CorpusRunner._extract_shard", crashing_shard)
+    texts = TEXTS[:3] + ["crash"] + TEXTS[3:]
+    runner = CorpusRunner(tree_model, n_workers=2, shard_size=1, start_method="fork")
+
+    results = runner.semantic_triples(list(range(len(texts))), texts)
+    assert sorted(results) == [i for i in range(len(texts)) if i != 3]
+    assert [failure["identifiers"] for failure in runner.failed_shards] == [[3]]
+
+
+@fork_only
+def test_corpus_runner_survives_crash_between_submits(tree_model, monkeypatch):
+    monkeypatch.setattr("modules.CorpusRunner._extract_shard", crashing_shard)
+    texts = TEXTS[:3] + ["crash"] + TEXTS[3:]
+
+    def slow_pairs():
+        #the pool is broken by the time the shards after "crash" are submitted
+        for identifier, text in enumerate(texts):
+            yield identifier, text
+            if text == "crash":
+                time.sleep(1)
+
+    runner = CorpusRunner(tree_model, n_workers=2, shard_size=1, max_in_flight=len(texts), start_method="fork")
+    results = dict(runner.iter_semantic_triples(slow_pairs()))
+    assert sorted(results) == [i for i in range(len(texts)) if i != 3]
+    assert [failure["identifiers"] for failure in runner.failed_shards] == [[3]]
+
+
+def test_corpus_runner_fails_fast_without_model(tmp_path, monkeypatch):
+    #no download attempt for the missing model
+    monkeypatch.setattr("modules.TriplesExtractor.subprocess.run", lambda *args, **kwargs: None)
+    runner = CorpusRunner(str(tmp_path / "missing_model"), n_workers=2, shard_size=1, start_method="fork")
+
+    with pytest.raises(WorkerInitError):
+        runner.semantic_triples([1, 2], TEXTS[:2])
+
+
+def test_trained_model():
+    pytest.importorskip("en_core_web_sm")
+    extractor = TriplesExtractor("en_core_web_sm", profile="auto")
+
+    #find_svos emits lowercased tokens
+    assert extractor.semantic_triples([1], ["I love the screen."]) == {1 : [("i", "love", "screen")]}
@@ -0,0 +1,26 @@
+import random
+import pytest
+from modules.FuzzyIndex import FuzzyIndex
+
+
+def test_fuzzy_index_query():
+    index = FuzzyIndex(["battery life", "screen", "touch screen lock", "Life Battery"])
+
+    assert len(index) == 3
+    assert index.query("batery life", 0.5)[0][0] == "battery life"
+    assert index.best_match("life battery") == ("battery life", 1.0)
+    assert index.best_match("camera") is None
+    assert index.query("", 0.5) == []
+    with pytest.raises(ValueError):
+        index.query("screen", 0.0)
+
+
+def test_fuzzy_query_matches_brute_force():
+    rng = random.Random(5)
+    letters = "abcdefgh"
+    terms = ["".join(rng.choice(letters) for _ in range(rng.randint(2, 9))) for _ in range(300)]
+    index = FuzzyIndex(terms)
+
+    for query in terms[:50]:
+        expected = {term for term in index.terms if index.similarity(query, term) >= 0.6}
+        assert {term for term, _ in index.query(query, 0.6)} == expected
@@ -0,0 +1,50 @@
+import sys
+import pytest
+import spacy
+from benchmarks.corpus import CORPORA, synthetic_corpus
+from benchmarks.harness import compare
+from modules.TriplesExtractor import TriplesExtractor
+from tests.conftest import TEXTS
+
+
+def results(**seconds) -> dict:
+    return {"meta" : {}, "results" : {name : {"seconds" : value} for name, value in seconds.items()}}
+
+
+def test_compare_flags_only_regressions_beyond_noise():
+    baseline = results(parse=1.0, rules=0.0005, convert=2.0, dropped=1.0)
+    current = results(parse=1.2, rules=0.001, convert=2.1, added=1.0)
+
+    rows = {name : regressed for name, _, _, _, regressed in compare(baseline, current, tolerance=0.1)}
+    #rules doubled, but by less than min_seconds
+    assert rows == {"parse" : True, "rules" : False, "convert" : False}
+
+
+@pytest.mark.parametrize("kind", list(CORPORA))
+def test_synthetic_corpora_are_seeded(kind):
+    texts = synthetic_corpus(kind, 20, seed=1)
+
+    assert len(texts) == 20 and all(isinstance(text, str) and text for text in texts)
+    assert synthetic_corpus(kind, 20, seed=1) == texts
+    assert synthetic_corpus(kind, 20, seed=2) != texts
+
+
+def test_local_model_directory_is_not_downloaded(tree_model, tmp_path, monkeypatch):
+    path = str(tmp_path / "model")
+    spacy.load(tree_model).to_disk(path)
+
+    def no_download(*args, **kwargs):
+        raise AssertionError("download attempted")
+    monkeypatch.setattr("modules.TriplesExtractor.subprocess.run", no_download)
+    extractor = TriplesExtractor(path)
+
+    assert extractor.semantic_triples([0], TEXTS[:1]) == {0 : [("i", "love", "screen")]}
+
+
+def test_missing_model_is_downloaded_with_the_current_interpreter(monkeypatch):
+    commands = []
+    monkeypatch.setattr("modules.TriplesExtractor.subprocess.run", lambda command, **kwargs: commands.append(command))
+
+    with pytest.raises(OSError):
+        TriplesExtractor("missing_model")
+    assert commands == [[sys.executable, "-m", "spacy", "download", "missing_model"]]
@@ -0,0 +1,80 @@
+from modules.IncrementalExtractor import IncrementalExtractor
+from modules.TriplesExtractor import TriplesExtractor
+from tests.conftest import TEXTS
+
+IDENTIFIERS = [f"p{i}" for i in range(len(TEXTS))]
+
+
+def spy_on_extraction(extractor:TriplesExtractor) -> list:
+    """Record the identifiers the extractor parses"""
+    extracted = []
+    iter_semantic_triples = extractor.iter_semantic_triples
+
+    def spied(pairs, *args, **kwargs):
+        pairs = list(pairs)
+        extracted.extend(identifier for identifier, _ in pairs)
+        return iter_semantic_triples(pairs, *args, **kwargs)
+    extractor.iter_semantic_triples = spied
+    return extracted
+
+
+def test_only_new_and_changed_texts_are_extracted(tree_model, tmp_path):
+    extractor = TriplesExtractor(tree_model, method="svaos")
+    expected = extractor.semantic_triples(IDENTIFIERS, TEXTS)
+    manifest_path = str(tmp_path / "manifest.jsonl")
+
+    assert IncrementalExtractor(extractor, manifest_path).semantic_triples(IDENTIFIERS[:4], TEXTS[:4]) == {
+        identifier : expected[identifier] for identifier in IDENTIFIERS[:4]
+    }
+
+    #p0 deleted, p1 changed, p4 and p5 new
+    incremental = IncrementalExtractor(extractor, manifest_path)
+    extracted = spy_on_extraction(extractor)
+    texts = [TEXTS[0]] + TEXTS[2:]
+    results = incremental.semantic_triples(IDENTIFIERS[1:], texts)
+
+    assert extracted == ["p1", "p4", "p5"]
+    assert results == {identifier : expected[identifier] for identifier in IDENTIFIERS[2:]} | {"p1" : expected["p0"]}
+    stats = incremental.last_run_stats
+    assert (stats["new"], stats["changed"], stats["unchanged"], stats["deleted"]) == (2, 1, 2, 1)
+    assert stats["docs"] == 3
+
+    assert IncrementalExtractor(extractor, manifest_path).semantic_triples(IDENTIFIERS[1:], texts) == results
+    assert extracted == ["p1", "p4", "p5"]
+
+
+def test_other_rules_reextract_everything(tree_model, tmp_path):
+    manifest_path = str(tmp_path / "manifest.jsonl")
+    IncrementalExtractor(TriplesExtractor(tree_model, method="svos"), manifest_path).semantic_triples(IDENTIFIERS, TEXTS)
+
+    extractor = TriplesExtractor(tree_model, method="svaos")
+    incremental = IncrementalExtractor(extractor, manifest_path)
+    results = incremental.semantic_triples(IDENTIFIERS, TEXTS)
+
+    assert results == extractor.semantic_triples(IDENTIFIERS, TEXTS)
+    assert incremental.last_run_stats["changed"] == len(TEXTS)
+
+
+def test_rule_changes_on_the_same_extractor_reextract(tree_model, tmp_path):
+    extractor = TriplesExtractor(tree_model, method="svaos")
+    incremental = IncrementalExtractor(extractor, str(tmp_path / "manifest.jsonl"))
+    incremental.semantic_triples(IDENTIFIERS, TEXTS)
+
+    extractor.parser.SUBJECTS = [label for label in extractor.parser.SUBJECTS if label != "nsubj"]
+    results = incremental.semantic_triples(IDENTIFIERS, TEXTS)
+    assert results == extractor.semantic_triples(IDENTIFIERS, TEXTS)
+    assert incremental.last_run_stats["changed"] == len(TEXTS)
+    assert not any(results.values())
+
+
+def test_tuple_identifiers_survive_the_manifest(tree_model, tmp_path):
+    extractor = TriplesExtractor(tree_model, method="svaos")
+    manifest_path = str(tmp_path / "manifest.jsonl")
+    identifiers = [("shop", i) for i in range(len(TEXTS))]
+    expected = IncrementalExtractor(extractor, manifest_path).semantic_triples(identifiers, TEXTS)
+
+    incremental = IncrementalExtractor(extractor, manifest_path)
+    extracted = spy_on_extraction(extractor)
+    assert incremental.semantic_triples(identifiers, TEXTS) == expected
+    assert extracted == []
+    assert incremental.last_run_stats["unchanged"] == len(TEXTS)
@@ -0,0 +1,79 @@
+from modules.DepenParseArray import DepenParseArray, DocArrays
+from modules.DepenParseBase import DepenParseBase
+from modules.DepenParseProduct import DepenParseProduct
+from modules.IncrementalExtractor import rule_fingerprint
+from modules.Instrumentation import Instrumentation
+from modules.TriplesExtractor import TriplesExtractor
+from tests.conftest import TEXTS
+
+IDENTIFIERS = [f"p{i}" for i in range(len(TEXTS))]
+
+
+def test_counts_match_between_engines(tree_model):
+    counts = {}
+    for engine in ("token", "array"):
+        instrumentation = Instrumentation()
+        extractor = TriplesExtractor(
+            tree_model, method="product", engine=engine, instrumentation=instrumentation, dedup="exact"
+        )
+        results = extractor.semantic_triples(IDENTIFIERS + ["copy"], TEXTS + TEXTS[:1])
+        metrics = instrumentation.to_dict()
+
+        #docs and triples per input row, parsed_docs per unique text
+        assert metrics["counters"] == {
+            "docs" : len(TEXTS) + 1,
+            "parsed_docs" : len(TEXTS),
+            "triples" : sum(map(len, results.values())),
+        }
+        assert {"parse", "rules", "phrases"} <= set(metrics["stages"])
+        counts[engine] = metrics["branches"], metrics["reasons"]
+
+    assert counts["token"] == counts["array"]
+    assert counts["token"][0]["verbless"] == 1
+
+
+def test_uninstrumented_extractor_records_nothing(tree_model):
+    instrumentation = Instrumentation()
+    TriplesExtractor(tree_model, method="product", engine="array", instrumentation=instrumentation)
+    before = instrumentation.to_dict()
+
+    TriplesExtractor(tree_model, method="product", engine="array").semantic_triples(IDENTIFIERS, TEXTS)
+    assert instrumentation.to_dict() == before
+
+
+def test_shared_rule_classes_are_not_modified(tree_model):
+    classes = (DepenParseBase, DepenParseProduct, DepenParseArray, DocArrays)
+    before = [dict(cls.__dict__) for cls in classes]
+
+    for engine in ("token", "array"):
+        instrumentation = Instrumentation()
+        extractor = TriplesExtractor(tree_model, method="product", engine=engine, instrumentation=instrumentation)
+        extractor.semantic_triples(IDENTIFIERS, TEXTS)
+        assert instrumentation.branches
+        assert type(extractor.parser) is not type(TriplesExtractor(tree_model, method="product", engine=engine).parser)
+
+    assert [dict(cls.__dict__) for cls in classes] == before
+    plain = TriplesExtractor(tree_model, method="product", engine="array")
+    assert type(plain.parser) is DepenParseArray
+    assert rule_fingerprint(plain) == rule_fingerprint(extractor)
+
+
+def test_output_stage_and_reset(tree_model, tmp_path):
+    instrumentation = Instrumentation()
+    extractor = TriplesExtractor(tree_model, method="svos", instrumentation=instrumentation)
+    list(extractor.iter_semantic_triples(enumerate(TEXTS), output_path=str(tmp_path / "triples.jsonl")))
+
+    assert instrumentation.to_dict()["stages"]["output"]["calls"] == len(TEXTS)
+    instrumentation.reset()
+    assert instrumentation.to_dict() == {"stages" : {}, "counters" : {}, "branches" : {}, "reasons" : {}}
+
+
+def test_prometheus_export(tree_model):
+    instrumentation = Instrumentation(namespace="test")
+    TriplesExtractor(tree_model, method="product", instrumentation=instrumentation).semantic_triples(IDENTIFIERS, TEXTS)
+    text = instrumentation.to_prometheus()
+
+    assert f'test_events_total{{event="docs"}} {len(TEXTS)}' in text
+    assert "# TYPE test_branch_total counter" in text
+    instrumentation.reasons['quote " and \\ newline\n'] += 1
+    assert 'reason="quote \\" and \\\\ newline\\n"' in instrumentation.to_prometheus()
@@ -0,0 +1,65 @@
+import spacy
+import pytest
+from modules.ParseCache import ParseCache, model_fingerprint
+from modules.TriplesExtractor import TriplesExtractor
+from tests.conftest import TEXTS
+
+
+@pytest.fixture()
+def nlp(tree_model):
+    return spacy.load(tree_model)
+
+
+def parse(doc) -> list:
+    return [(tok.text, tok.dep_, tok.head.i, tok.pos_) for tok in doc]
+
+
+def test_miss_then_hit(nlp, tmp_path):
+    cache = ParseCache(str(tmp_path), nlp)
+    assert cache.get_many(TEXTS) == [None] * len(TEXTS)
+
+    cache.put_many(TEXTS[:4], [nlp(text) for text in TEXTS[:4]])
+    docs = cache.get_many(TEXTS)
+
+    assert [doc is not None for doc in docs] == [True] * 4 + [False] * (len(TEXTS) - 4)
+    assert [parse(doc) for doc in docs[:4]] == [parse(nlp(text)) for text in TEXTS[:4]]
+    assert parse(cache.get(TEXTS[0])) == parse(nlp(TEXTS[0]))
+
+
+def test_eviction_and_clear(nlp, tmp_path):
+    cache = ParseCache(str(tmp_path), nlp)
+    for text in TEXTS:
+        cache.put(text, nlp(text))
+    batch_size = cache.size_bytes() / len(TEXTS)
+
+    #another process sharing the directory with a smaller limit evicts the oldest batches
+    small = ParseCache(str(tmp_path), nlp, max_bytes=int(batch_size * 3))
+    small.put(TEXTS[0], nlp(TEXTS[0]))
+    assert small.size_bytes() <= small.max_bytes
+    assert cache.get(TEXTS[0]) is not None
+    assert any(doc is None for doc in cache.get_many(TEXTS))
+
+    cache.clear()
+    assert cache.size_bytes() == 0
+    assert cache.get_many(TEXTS) == [None] * len(TEXTS)
+
+
+def test_fingerprint_depends_on_pipes(nlp, tree_model):
+    assert model_fingerprint(nlp) == model_fingerprint(spacy.load(tree_model))
+    assert model_fingerprint(nlp) != model_fingerprint(spacy.blank("en"))
+
+
+def test_extractor_with_cache(tree_model, tmp_path, monkeypatch):
+    identifiers = list(range(len(TEXTS)))
+    expected = TriplesExtractor(tree_model, method="product").semantic_triples(identifiers, TEXTS)
+
+    extractor = TriplesExtractor(tree_model, method="product", cache_dir=str(tmp_path))
+    assert extractor.semantic_triples(identifiers, TEXTS) == expected
+
+    #every text is cached now, nothing is parsed again
+    def no_parsing(texts, *args, **kwargs):
+        texts = list(texts)
+        assert texts == []
+        return iter(())
+    monkeypatch.setattr(extractor, "pipe", no_parsing)
+    assert extractor.semantic_triples(identifiers, TEXTS) == expected
@@ -0,0 +1,86 @@
+import asyncio
+from modules.ExtractionService import ExtractionService, request
+from modules.Triple import Triple
+from modules.TriplesExtractor import TriplesExtractor
+from tests.conftest import TEXTS
+
+HOST = "127.0.0.1"
+
+
+async def with_service(extractor:TriplesExtractor, calls, **kwargs):
+    """Run calls(port) against a started service, then close it"""
+    service = ExtractionService(extractor, **kwargs)
+    await service.start(HOST, 0)
+    try:
+        return await calls(service.port)
+    finally:
+        await service.close()
+
+
+def test_concurrent_requests_are_batched(tree_model):
+    extractor = TriplesExtractor(tree_model, method="product")
+    texts = TEXTS * 2
+    expected = extractor.semantic_triples(list(range(len(texts))), texts)
+
+    async def calls(port):
+        responses = await asyncio.gather(*(
+            request(HOST, port, "POST", "/extract", {"id" : i, "text" : text}) for i, text in enumerate(texts)
+        ))
+        return responses, await request(HOST, port, "GET", "/metrics")
+
+    responses, (status, metrics) = asyncio.run(with_service(extractor, calls, max_batch=4, max_wait=0.05))
+    assert [status for status, _ in responses] == [200] * len(texts)
+    assert {body["id"] : [tuple(triple) for triple in body["triples"]] for _, body in responses} == expected
+
+    assert status == 200
+    assert metrics["requests"] == len(texts)
+    #at most max_batch texts per batch, and fewer batches than requests
+    assert len(texts) / 4 <= metrics["batches"] < len(texts)
+    assert metrics["mean_batch_size"] == len(texts) / metrics["batches"]
+    assert 0 <= metrics["latency_ms"]["p50"] <= metrics["latency_ms"]["max"]
+
+
+def test_invalid_requests(tree_model):
+    extractor = TriplesExtractor(tree_model, method="product")
+
+    async def calls(port):
+        return [
+            await request(HOST, port, "GET", "/health"),
+            await request(HOST, port, "GET", "/missing"),
+            await request(HOST, port, "POST", "/extract", {"id" : 1}),
+            await request(HOST, port, "POST", "/extract", {"id" : 1, "text" : None}),
+            await request(HOST, port, "GET", "/metrics"),
+        ]
+
+    responses = asyncio.run(with_service(extractor, calls))
+    assert [status for status, _ in responses] == [200, 404, 400, 400, 200]
+    assert responses[-1][1]["requests"] == 0
+
+
+def test_failing_text_only_fails_its_request(tree_model):
+    extractor = TriplesExtractor(tree_model, method="product")
+    #the tree_parser raises on texts without a tree
+    texts = TEXTS[:2] + ["no tree for this text"] + TEXTS[2:4]
+    expected = extractor.semantic_triples(list(range(5)), TEXTS[:2] + [None] + TEXTS[2:4])
+
+    async def calls(port):
+        return await asyncio.gather(*(
+            request(HOST, port, "POST", "/extract", {"id" : i, "text" : text}) for i, text in enumerate(texts)
+        ))
+
+    responses = asyncio.run(with_service(extractor, calls, max_batch=8, max_wait=0.05))
+    assert [status for status, _ in responses] == [200, 200, 500, 200, 200]
+    assert "error" in responses[2][1]
+    assert {body["id"] : [tuple(triple) for triple in body["triples"]] for status, body in responses if status == 200} == expected
+
+
+def test_records_are_serialized(tree_model):
+    extractor = TriplesExtractor(tree_model, method="product", records=True)
+    expected = extractor.semantic_triples([0], TEXTS[:1])
+
+    async def calls(port):
+        return await request(HOST, port, "POST", "/extract", {"id" : 0, "text" : TEXTS[0]})
+
+    status, body = asyncio.run(with_service(extractor, calls))
+    assert status == 200
+    assert [Triple.from_dict(triple) for triple in body["triples"]] == expected[0]
@@ -0,0 +1,196 @@
+import csv
+import json
+import pytest
+from modules.streams import (
+    DEFAULT_BASE_IRI,
+    JsonlTriplesWriter,
+    ParquetRowWriter,
+    TripleRowWriter,
+    export_triples,
+    infer_format,
+    iri_local_name,
+    iter_chunks,
+    iter_csv_pairs,
+    iter_jsonl_pairs,
+    iter_pairs,
+    open_writer,
+    rdf_literal,
+    split_negation,
+)
+
+PAIRS = [
+    (1, [("i", "love", "screen"), ("battery", "not last", "long \"very\"")]),
+    (2, []),
+    (3, [("phone", "!charge", "fast")]),
+]
+ROWS = [
+    [1, "i", "love", "screen"],
+    [1, "battery", "not last", "long \"very\""],
+    [3, "phone", "!charge", "fast"],
+]
+
+
+def test_pair_readers(tmp_path):
+    records = [{"id" : 1, "text" : "i love the screen"}, {"id" : 2, "text" : ""}, {"id" : 3}]
+
+    path = tmp_path / "input.jsonl"
+    path.write_text("\n".join(json.dumps(record) for record in records) + "\n\n", encoding="utf-8")
+    assert list(iter_jsonl_pairs(str(path))) == [(1, "i love the screen"), (2, ""), (3, None)]
+
+    path = tmp_path / "input.csv"
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, ["id", "text"])
+        writer.writeheader()
+        writer.writerows(records)
+    assert list(iter_csv_pairs(str(path))) == [("1", "i love the screen"), ("2", None), ("3", None)]
+
+
+def test_jsonl_triples_writer_flushes_chunks(tmp_path):
+    path = tmp_path / "triples.jsonl"
+
+    with JsonlTriplesWriter(str(path), flush_every=2) as writer:
+        for identifier, triples in PAIRS:
+            writer.write(identifier, triples)
+        #the first chunk is on disk before the writer is closed
+        assert len(path.read_text(encoding="utf-8").splitlines()) == 2
+
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert [(record["id"], [tuple(triple) for triple in record["triples"]]) for record in records] == PAIRS
+
+
+def test_writer_is_abstract():
+    with pytest.raises(TypeError):
+        TripleRowWriter()
+
+
+def test_iter_chunks():
+    assert list(iter_chunks(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(iter_chunks([], 2)) == []
+
+
+def test_infer_format():
+    assert infer_format("out.JSON") == "jsonl"
+    assert infer_format("out.parquet") == "parquet"
+    assert infer_format("out.ttl") == "ttl"
+    with pytest.raises(ValueError):
+        infer_format("out.txt")
+
+
+def test_jsonl_writer(tmp_path):
+    path = str(tmp_path / "triples.jsonl")
+    assert export_triples(PAIRS, path) == (3, 3)
+
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert [[record[column] for column in TripleRowWriter.COLUMNS] for record in records] == ROWS
+
+
+def test_csv_writer(tmp_path):
+    path = str(tmp_path / "triples.csv")
+    export_triples(PAIRS, path)
+
+    with open(path, encoding="utf-8", newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == TripleRowWriter.COLUMNS
+    assert rows[1:] == [[str(row[0]), *row[1:]] for row in ROWS]
+
+
+def test_parquet_writer(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "triples.parquet")
+
+    with ParquetRowWriter(path, row_group_size=2) as writer:
+        for identifier, triples in PAIRS:
+            writer.write(identifier, triples)
+    assert pq.ParquetFile(path).num_row_groups == 2
+    assert [list(row.values()) for row in pq.read_table(path).to_pylist()] == ROWS
+
+
+def test_parquet_negated_column(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "triples.parquet")
+
+    export_triples(PAIRS, path, negation="not ")
+    table = pq.read_table(path)
+    assert table.schema.names == TripleRowWriter.COLUMNS + ["negated"]
+    assert table.column("predicate").to_pylist() == ["love", "last", "charge"]
+    assert table.column("negated").to_pylist() == [False, True, True]
+
+
+def test_empty_parquet_has_schema(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "empty.parquet")
+
+    export_triples([], path)
+    assert pq.read_table(path).schema.names == TripleRowWriter.COLUMNS
+
+
+def test_ntriples_writer(tmp_path):
+    path = str(tmp_path / "triples.nt")
+    export_triples(PAIRS, path)
+
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    assert lines[0] == f"<{DEFAULT_BASE_IRI}term/i> <{DEFAULT_BASE_IRI}predicate/love> \"screen\" ."
+    assert lines[1] == (
+        f"<{DEFAULT_BASE_IRI}term/battery> <{DEFAULT_BASE_IRI}predicate/not/last> \"long \\\"very\\\"\" ."
+    )
+    assert lines[2].split()[1] == f"<{DEFAULT_BASE_IRI}predicate/not/charge>"
+
+
+def test_turtle_reification(tmp_path):
+    path = str(tmp_path / "triples.ttl")
+    export_triples(PAIRS, path, reify=True)
+
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    assert text.startswith("@prefix term: ")
+    assert "term:i pred:love \"screen\" ." in text
+    assert f"<{DEFAULT_BASE_IRI}doc/1/0> sx:source doc:1 ." in text
+    assert text.count("rdf-syntax-ns#Statement") == 3
+
+
+def test_rdf_helpers():
+    assert split_negation("!love") == ("love", True)
+    assert split_negation("not love") == ("love", True)
+    assert split_negation("i not love") == ("i love", True)
+    assert split_negation("love") == ("love", False)
+    assert iri_local_name("big screen.") == "big%20screen%2E"
+    assert rdf_literal("a\n\"b\"") == "\"a\\n\\\"b\\\"\""
+
+
+@pytest.mark.parametrize("fmt", ["jsonl", "csv", "parquet"])
+def test_readers(tmp_path, fmt):
+    records = [{"id" : 1, "text" : "i love the screen"}, {"id" : 2, "text" : None}]
+    path = str(tmp_path / f"input.{fmt}")
+
+    if fmt == "jsonl":
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(record) + "\n" for record in records)
+    elif fmt == "csv":
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, ["id", "text"])
+            writer.writeheader()
+            writer.writerows(records)
+    else:
+        pa = pytest.importorskip("pyarrow")
+        pytest.importorskip("pyarrow.parquet").write_table(pa.Table.from_pylist(records), path)
+
+    pairs = list(iter_pairs(path))
+    assert [text for _, text in pairs] == ["i love the screen", None]
+    assert [str(identifier) for identifier, _ in pairs] == ["1", "2"]
+
+
+def test_rdf_is_not_an_input_format(tmp_path):
+    with pytest.raises(ValueError):
+        iter_pairs(str(tmp_path / "triples.nt"))
+
+
+def test_open_writer_format_override(tmp_path):
+    path = str(tmp_path / "triples.out")
+
+    with open_writer(path, "csv") as writer:
+        writer.write("a", [("s", "p", "o")])
+    with open(path, encoding="utf-8") as f:
+        assert f.read().splitlines() == ["id,subject,predicate,object", "a,s,p,o"]
@@ -0,0 +1,67 @@
+import os
+import random
+import subprocess
+import sys
+import pytest
+from modules.TokenIndex import TokenIndex
+from modules.util import tokens_intersect
+
+WORDS = [f"w{i}" for i in range(30)]
+
+
+def random_token_lists(seed:int, n:int) -> list:
+    rng = random.Random(seed)
+    return [[rng.choice(WORDS) for _ in range(rng.randint(0, 12))] for _ in range(n)]
+
+
+def test_exact_index_matches_tokens_intersect():
+    targets = random_token_lists(0, 60)
+    sources = random_token_lists(1, 40)
+    index = TokenIndex(range(len(targets)), targets)
+
+    for threshold in (-1, 0, 3, 6):
+        expected = [
+            (i, j) for i, source in enumerate(sources) for j, target in enumerate(targets)
+            if tokens_intersect([j], [source], [target], threshold)
+        ]
+        assert index.match(range(len(sources)), sources, threshold) == expected
+
+
+def test_minhash_only_returns_true_matches():
+    targets = random_token_lists(2, 60)
+    sources = targets[:20]
+    exact = set(TokenIndex(range(len(targets)), targets).match(range(len(sources)), sources, 2))
+    approx = set(TokenIndex(range(len(targets)), targets, mode="minhash").match(range(len(sources)), sources, 2))
+
+    assert approx <= exact
+    #identical token sets always share every band
+    assert {(i, i) for i, tokens in enumerate(sources) if len(set(tokens)) > 2} <= approx
+
+
+def test_minhash_signature_is_stable_across_processes():
+    code = (
+        "from modules.TokenIndex import TokenIndex; "
+        "print(TokenIndex([], [], mode='minhash').signature(frozenset(['battery', 'screen'])).tolist())"
+    )
+    signatures = {
+        subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True,
+            env={**os.environ, "PYTHONHASHSEED" : seed},
+        ).stdout
+        for seed in ("1", "2")
+    }
+    assert len(signatures) == 1
+
+
+def test_intersect_is_paired():
+    sources = random_token_lists(3, 50)
+    targets = random_token_lists(4, 50)
+
+    assert TokenIndex.intersect(range(50), sources, targets, 2) == tokens_intersect(range(50), sources, targets, 2)
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        TokenIndex([], [], mode="fuzzy")
+    with pytest.raises(ValueError):
+        TokenIndex([], [], mode="minhash", num_perm=10, bands=3)
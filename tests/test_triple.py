@@ -0,0 +1,194 @@
+import csv
+import json
+import pickle
+import pytest
+import spacy
+from modules.DepenParseArray import DepenParseArray
+from modules.DepenParseProduct import DepenParseProduct
+from modules.Triple import NO_SPAN, Triple, triple_to_json
+from modules.TripleIndex import TripleIndex
+from modules.TripleStore import TripleStore
+from modules.TriplesExtractor import TriplesExtractor, with_product
+from modules.streams import open_writer
+from modules.util import df_from_triples_dict
+from tests.conftest import TEXTS, TREES, tree_doc
+
+VOCAB = spacy.blank("en").vocab
+DOCS = [tree_doc(VOCAB, words) for words in TREES]
+
+
+def flavors(parser, doc, records:bool) -> tuple:
+    return (
+        parser.find_svos(doc, records=records),
+        parser.find_svaos(doc, records=records),
+        parser.product_triplets("p", doc, records=records)[0],
+    )
+
+
+@pytest.mark.parametrize("engine", [DepenParseProduct, DepenParseArray])
+def test_parser_records_match_tuples(engine):
+    parser = engine()
+
+    for doc in DOCS:
+        tuples = flavors(parser, doc, False)
+        records = flavors(parser, doc, True)
+        assert all(isinstance(triple, Triple) for lst in records for triple in lst)
+        assert [[tuple(triple) for triple in lst] for lst in records] == list(tuples)
+
+
+def test_parser_record_spans():
+    parser = DepenParseProduct()
+    doc = tree_doc(VOCAB, ("the", "phone", "charges", "fast", ".", "i", "hate", "the", "case", "."))
+
+    triple = parser.find_svos(doc, records=True)[-1]
+    assert triple.astuple() == ("i", "hate", "case")
+    assert doc.text[triple.subject_start:triple.subject_end] == "i"
+    assert doc.text[triple.object_start:triple.object_end] == "case"
+    assert (triple.subject_sent, triple.predicate_sent, triple.object_sent) == (1, 1, 1)
+
+    product = parser.product_triplets("p", doc, records=True)[0][0]
+    assert product.subject_span == NO_SPAN
+
+    doc = tree_doc(VOCAB, ("the", "battery", "does", "not", "last", "long"))
+    triple = parser.find_svaos(doc, records=True)[0]
+    assert triple.negated and triple.predicate == "!last"
+
+
+def test_records_outlive_the_doc():
+    triple = DepenParseProduct().find_svaos(DOCS[2], records=True)[-1]
+    copy = pickle.loads(pickle.dumps(triple))
+
+    assert copy == triple and hash(copy) == hash(triple)
+    assert copy.to_dict()["object"] == "big screen"
+    assert copy != Triple(*triple.astuple())
+
+
+def test_with_product_keeps_the_triple_type():
+    assert with_product(("p1", "love", "screen"), "p2") == ("p2", "love", "screen")
+
+    record = DepenParseProduct().product_triplets("p1", DOCS[1], records=True)[0][0]
+    copy = with_product(record, "p2")
+    assert copy.subject == "p2" and record.subject == "p1"
+    assert (copy.predicate, copy.negated, copy.object_span) == (record.predicate, record.negated, record.object_span)
+
+
+def extract(model:str, records:bool, method="svaos", **kwargs) -> dict:
+    extractor = TriplesExtractor(model, method=method, records=records, **kwargs)
+    return extractor.semantic_triples(list(range(len(TEXTS))), TEXTS)
+
+
+@pytest.fixture(scope="module")
+def triples_pair(tree_model) -> tuple:
+    """(tuple triples, Triple records) of TEXTS"""
+    return extract(tree_model, False), extract(tree_model, True)
+
+
+def test_triple_is_a_sequence():
+    triple = Triple("i", "love", "screen", False, (0, 1, 0), (2, 6, 0), (11, 17, 0))
+
+    assert len(triple) == 3
+    assert triple[0] == "i" and triple[-1] == "screen"
+    assert triple[:3] == ("i", "love", "screen")
+    assert triple[1:] == ("love", "screen")
+    subject, predicate, obj = triple
+    assert (subject, predicate, obj) == tuple(triple) == triple.astuple()
+
+
+def test_triple_dict_round_trip():
+    triple = Triple("p1", "not love", "screen", True, NO_SPAN, (2, 6, 0), (11, 17, 0))
+
+    assert Triple.from_dict(json.loads(json.dumps(triple, default=triple_to_json))) == triple
+    assert triple.with_subject("p2").subject == "p2"
+    assert triple.with_subject("p2").object_span == triple.object_span
+
+
+@pytest.mark.parametrize("method", ["svos", "svaos", "product"])
+def test_records_match_tuples(tree_model, method):
+    tuples = extract(tree_model, False, method)
+    records = extract(tree_model, True, method)
+
+    assert any(records.values())
+    assert all(isinstance(triple, Triple) for lst in records.values() for triple in lst)
+    assert {key : [tuple(triple) for triple in lst] for key, lst in records.items()} == tuples
+
+
+def test_records_spans_point_into_text(triples_pair):
+    _, records = triples_pair
+
+    for key, lst in records.items():
+        for triple in lst:
+            start, end, _ = triple.object_span
+            assert TEXTS[key][start:end].endswith(triple.object.split()[-1])
+
+
+def test_sv_records_rejected(tree_model):
+    with pytest.raises(ValueError):
+        TriplesExtractor(tree_model, method="sv", records=True)
+
+
+def test_records_to_dataframe(triples_pair):
+    tuples, records = triples_pair
+
+    assert df_from_triples_dict(records).equals(df_from_triples_dict(tuples))
+
+
+def test_records_to_store_and_index(triples_pair, tmp_path):
+    tuples, records = triples_pair
+
+    assert TripleStore.from_triples_dict(records).to_triples_dict() == TripleStore.from_triples_dict(tuples).to_triples_dict()
+
+    index = TripleIndex.build(records, str(tmp_path / "records.idx"))
+    expected = TripleIndex.build(tuples, str(tmp_path / "tuples.idx"))
+    assert index.match() == expected.match()
+    assert index.values("object", subject="i") == expected.values("object", subject="i")
+
+
+@pytest.mark.parametrize("fmt", ["jsonl", "csv", "nt", "ttl", "parquet"])
+def test_records_to_writers(triples_pair, tmp_path, fmt):
+    if fmt == "parquet":
+        pytest.importorskip("pyarrow")
+    tuples, records = triples_pair
+
+    for name, triples_dict in (("tuples", tuples), ("records", records)):
+        with open_writer(str(tmp_path / f"{name}.{fmt}")) as writer:
+            for key, lst in triples_dict.items():
+                writer.write(key, lst)
+
+    assert (tmp_path / f"records.{fmt}").read_bytes() == (tmp_path / f"tuples.{fmt}").read_bytes()
+
+
+def test_span_columns(triples_pair, tmp_path):
+    _, records = triples_pair
+    path = str(tmp_path / "spans.csv")
+
+    with open_writer(path, spans=True) as writer:
+        for key, lst in records.items():
+            writer.write(key, lst)
+
+    with open(path, encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    first = records[0][0]
+    assert len(rows) == sum(map(len, records.values()))
+    assert (int(rows[0]["object_start"]), int(rows[0]["object_end"])) == first.object_span[:2]
+
+
+def test_records_dedup_fan_out(tree_model):
+    texts = TEXTS + TEXTS
+    identifiers = [f"p{i}" for i in range(len(texts))]
+    extractor = TriplesExtractor(tree_model, method="product", records=True, dedup="exact")
+    records = extractor.semantic_triples(identifiers, texts)
+
+    for i, text in enumerate(TEXTS):
+        first, copy = records[f"p{i}"], records[f"p{i + len(TEXTS)}"]
+        assert [triple.subject for triple in copy] == [f"p{i + len(TEXTS)}"] * len(copy)
+        assert [triple.with_subject(f"p{i}") for triple in copy] == first
+
+
+def test_records_jsonl_output(tree_model, tmp_path):
+    path = tmp_path / "records.jsonl"
+    extractor = TriplesExtractor(tree_model, method="svos", records=True)
+    results = dict(extractor.iter_semantic_triples(enumerate(TEXTS), output_path=str(path)))
+
+    with open(path, encoding="utf-8") as f:
+        written = {record["id"] : [Triple.from_dict(triple) for triple in record["triples"]] for record in map(json.loads, f)}
+    assert written == results
@@ -0,0 +1,103 @@
+import random
+import pandas as pd
+import pytest
+from modules.TripleIndex import TripleIndex
+from modules.TripleStore import TripleStore
+from modules.util import df_from_triples_dict
+
+TERMS = ["i", "phone", "battery", "screen", "love", "hate", "charge", "fast", "big screen", "wife"]
+
+
+def random_triples(seed:int, n_ids=40, str_ids=False) -> dict:
+    rng = random.Random(seed)
+    return {
+        (f"p{i}" if str_ids else i) : [tuple(rng.choice(TERMS) for _ in range(3)) for _ in range(rng.randint(0, 6))]
+        for i in range(n_ids)
+    }
+
+
+def brute_force(triples_dict:dict, subject=None, predicate=None, obj=None, identifier=None) -> list:
+    return sorted(
+        (key, triple) for key, lst in triples_dict.items() for triple in lst
+        if (subject is None or triple[0] == subject) and (predicate is None or triple[1] == predicate)
+        and (obj is None or triple[2] == obj) and (identifier is None or key == identifier)
+    )
+
+
+@pytest.fixture(scope="module", params=[False, True], ids=["int_ids", "str_ids"])
+def built(request, tmp_path_factory) -> tuple:
+    triples_dict = random_triples(0, str_ids=request.param)
+    path = tmp_path_factory.mktemp("index") / "triples.idx"
+    return triples_dict, TripleIndex.build(triples_dict, str(path))
+
+
+def test_len(built):
+    triples_dict, index = built
+
+    assert len(index) == sum(map(len, triples_dict.values()))
+
+
+@pytest.mark.parametrize("bound", [
+    {}, {"subject" : "i"}, {"predicate" : "love"}, {"obj" : "screen"},
+    {"subject" : "i", "predicate" : "love"}, {"predicate" : "love", "obj" : "fast"},
+    {"subject" : "phone", "obj" : "battery"}, {"subject" : "i", "predicate" : "hate", "obj" : "wife"},
+    {"subject" : "big screen"}, {"subject" : "missing"},
+])
+def test_match_and_count(built, bound):
+    triples_dict, index = built
+    expected = brute_force(triples_dict, **bound)
+
+    assert sorted(index.match(**bound)) == expected
+    assert index.count(**bound) == len(expected)
+
+
+def test_identifier_filter(built):
+    triples_dict, index = built
+    identifier = next(key for key, lst in triples_dict.items() if lst)
+
+    assert sorted(index.match(identifier=identifier)) == brute_force(triples_dict, identifier=identifier)
+    assert index.match(subject="i", identifier="not an id") == []
+
+
+def test_values(built):
+    triples_dict, index = built
+
+    assert index.values("predicate", subject="i") == sorted({t[1] for _, t in brute_force(triples_dict, subject="i")})
+    assert index.values("id", obj="fast") == sorted({key for key, _ in brute_force(triples_dict, obj="fast")})
+
+
+def test_sources_build_the_same_index(tmp_path):
+    triples_dict = random_triples(1)
+    expected = TripleIndex.build(triples_dict, str(tmp_path / "dict.idx")).match()
+
+    sources = {
+        "frame" : df_from_triples_dict(triples_dict),
+        "store" : TripleStore.from_triples_dict(triples_dict),
+        "stream" : iter(triples_dict.items()),
+    }
+    for name, source in sources.items():
+        assert TripleIndex.build(source, str(tmp_path / f"{name}.idx")).match() == expected
+
+
+def test_rebuild_replaces_index(tmp_path):
+    path = str(tmp_path / "triples.idx")
+    old = TripleIndex.build(random_triples(2, str_ids=True), path)
+    old_triples = old.match()
+
+    new = TripleIndex.build(random_triples(3), path)
+    assert sorted(new.match()) == brute_force(random_triples(3))
+    #no file of the string identifier index is left behind
+    assert not (tmp_path / "triples.idx" / "id_offsets.npy").exists()
+    #open readers keep their memory maps
+    assert old.match() == old_triples
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["triples.idx"]
+
+
+def test_build_refuses_other_directories(tmp_path):
+    (tmp_path / "data").mkdir()
+    (tmp_path / "data" / "keep.txt").write_text("keep")
+
+    with pytest.raises(FileExistsError):
+        TripleIndex.build(random_triples(4), str(tmp_path / "data"))
+    assert (tmp_path / "data" / "keep.txt").exists()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["data"]
@@ -0,0 +1,46 @@
+import numpy
+import pytest
+from modules.TripleStore import TripleStore
+from modules.util import df_from_triples_dict, triples_dict_from_df
+
+TRIPLES_DICT = {
+    3 : [("i", "love", "screen"), ("i", "love", "camera")],
+    1 : [("battery", "!last", "long")],
+    7 : [],
+    2 : [("phone", "charges", "fast"), ("i", "hate", "case"), ("i", "love", "screen")],
+}
+EXPECTED = {key : lst for key, lst in TRIPLES_DICT.items() if lst}
+
+
+def test_codes_share_one_term_dictionary():
+    store = TripleStore.from_triples_dict(TRIPLES_DICT)
+
+    assert len(store) == 6
+    assert list(store)[0] == (3, ("i", "love", "screen"))
+    assert len(store.ids) == 3
+    assert len(store.terms) == 12
+    assert store.codes("subject").dtype == numpy.uint32
+    assert store.codes("subject")[0] == store.codes("subject")[4] == store.terms.encode("i")
+    assert store.memory_usage() == 6 * 4 * 4
+
+
+def test_from_stream_matches_dict():
+    store = TripleStore.from_stream(iter(TRIPLES_DICT.items()))
+
+    assert list(store) == list(TripleStore.from_triples_dict(TRIPLES_DICT))
+
+
+@pytest.mark.parametrize("categorical", [True, False])
+def test_triple_store_round_trips(categorical):
+    store = TripleStore.from_triples_dict(TRIPLES_DICT)
+
+    assert store.to_triples_dict() == EXPECTED
+    triples_df = store.to_dataframe(categorical=categorical)
+    assert triples_dict_from_df(triples_df) == EXPECTED
+    assert TripleStore.from_dataframe(triples_df).to_triples_dict() == EXPECTED
+
+
+def test_plain_dataframe_equals_df_from_triples_dict():
+    triples_df = TripleStore.from_triples_dict(TRIPLES_DICT).to_dataframe(categorical=False)
+
+    assert triples_df.equals(df_from_triples_dict(EXPECTED))
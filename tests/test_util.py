@@ -0,0 +1,123 @@
+import pandas as pd
+import pytest
+from nltk.stem import PorterStemmer
+from modules.util import (
+    df_from_triples_dict,
+    iter_df_from_triples,
+    iter_preprocess,
+    remove_numbers,
+    remove_single_character,
+    remove_stopwords,
+    simple_preprocess,
+    stem,
+    stem_triples,
+    stem_words,
+    stopword_set,
+    tokens_intersect,
+    triples_dict_from_df,
+    triples_dict_from_df_chunks,
+)
+
+TRIPLES_DICT = {
+    3 : [("i", "love", "screen"), ("i", "love", "camera")],
+    1 : [("battery", "!last", "long")],
+    7 : [],
+    2 : [("phone", "charges", "fast"), ("i", "hate", "case"), ("i", "love", "screen")],
+}
+
+
+def test_df_from_triples_dict():
+    triples_df = df_from_triples_dict(TRIPLES_DICT)
+
+    assert list(triples_df.columns) == ["id", "subject", "predicate", "object"]
+    assert triples_df["id"].tolist() == [3, 3, 1, 2, 2, 2]
+    assert triples_df.iloc[2].tolist() == [1, "battery", "!last", "long"]
+
+
+def test_empty_dict_gives_empty_frame():
+    triples_df = df_from_triples_dict({1 : []})
+
+    assert triples_df.empty
+    assert list(triples_df.columns) == ["id", "subject", "predicate", "object"]
+    assert triples_dict_from_df(triples_df) == {}
+
+
+def test_round_trip_drops_only_empty_identifiers():
+    round_trip = triples_dict_from_df(df_from_triples_dict(TRIPLES_DICT))
+
+    assert round_trip == {key : lst for key, lst in TRIPLES_DICT.items() if lst}
+    assert list(round_trip) == [3, 1, 2]
+    assert all(type(key) is int for key in round_trip)
+
+
+def test_string_identifiers_round_trip():
+    triples_dict = {f"p{key}" : lst for key, lst in TRIPLES_DICT.items() if lst}
+
+    assert triples_dict_from_df(df_from_triples_dict(triples_dict)) == triples_dict
+
+
+def test_missing_identifiers_keep_row_semantics():
+    triples_df = pd.DataFrame({
+        "id" : [1.0, None, 1.0],
+        "subject" : ["a", "b", "c"],
+        "predicate" : ["x", "y", "z"],
+        "object" : ["o", "p", "q"],
+    })
+
+    triples_dict = triples_dict_from_df(triples_df)
+    assert triples_dict[1.0] == [("a", "x", "o"), ("c", "z", "q")]
+    assert len(triples_dict) == 2
+
+
+def test_chunked_conversions_match_whole():
+    pairs = list(TRIPLES_DICT.items())
+    chunks = list(iter_df_from_triples(pairs, chunk_rows=2))
+
+    assert len(chunks) > 1
+    assert pd.concat(chunks, ignore_index=True).equals(df_from_triples_dict(TRIPLES_DICT))
+    assert triples_dict_from_df_chunks(chunks) == triples_dict_from_df(df_from_triples_dict(TRIPLES_DICT))
+
+
+def test_stem_triples_keeps_negation():
+    stemmed = stem_triples(df_from_triples_dict({1 : [("batteries", "!charging", "phones")]}))
+
+    assert stemmed.iloc[0].tolist() == [1, "batteri", "!charg", "phone"]
+
+
+def test_stemming_matches_porter():
+    stemmer = PorterStemmer()
+    tokens_list = [["batteries", "charging", "phones"], ["charging", "screens"], []]
+    triples_df = df_from_triples_dict({key : [tuple(tokens)] for key, tokens in enumerate(tokens_list[:1] * 3)})
+
+    assert stem_words(tokens_list) == [[stemmer.stem(word) for word in tokens] for tokens in tokens_list]
+    assert stem_triples(triples_df)["subject"].tolist() == [stemmer.stem("batteries")] * 3
+    #one shared cache: stemming a known word is a hit
+    hits = stem.cache_info().hits
+    stem("batteries")
+    assert stem.cache_info().hits == hits + 1
+
+
+def test_fused_preprocessing_matches_chain():
+    try:
+        stopword_set()
+    except LookupError:
+        pytest.skip("nltk stopwords corpus not downloaded")
+    texts = ["The 2 batteries are charging, I think!", "a Phone with 3 cameras"]
+
+    chained = stem_words(remove_stopwords(remove_single_character(remove_numbers(simple_preprocess(texts)))))
+    assert list(iter_preprocess(texts, stemming=True)) == chained
+
+
+def test_fused_preprocessing_without_stopwords():
+    texts = ["The 2 batteries are charging, I think!", "a Phone with 3 cameras"]
+
+    chained = stem_words(remove_single_character(remove_numbers(simple_preprocess(texts))))
+    assert list(iter_preprocess(texts, drop_stopwords=False, stemming=True)) == chained
+
+
+def test_tokens_intersect():
+    assert tokens_intersect(
+        ["a", "b"],
+        [["x", "y", "z", "w", "v"], ["x", "y"]],
+        [["x", "y", "z", "w"], ["x", "y", "z", "w"]],
+    ) == ["a"]
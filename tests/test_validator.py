@@ -0,0 +1,122 @@
+import random
+import subprocess
+import sys
+import pandas as pd
+import pytest
+from modules.Validator import VALIDATION_COLUMNS, TriplesValidator
+from modules.util import df_from_triples_dict
+
+TRIPLES = {
+    1 : [("i", "love", "screen"), ("i", "love", "big screen")],
+    2 : [("battery", "!last", "long")],
+    3 : [],
+    4 : [("phone", "charges", "fast")],
+    5 : [("unmatched", "key", "dropped")],
+}
+SOURCE = {
+    1 : ["i", "love", "the", "big", "screen"],
+    2 : ["the", "battery", "does", "not", "last", "long"],
+    3 : ["great", "phone"],
+    4 : [],
+}
+
+
+def random_corpus(n:int, seed:int=0) -> tuple:
+    """Random triples and source dictionaries over a small vocabulary"""
+    rng = random.Random(seed)
+    vocab = [f"w{i}" for i in range(30)]
+    triples = {
+        key : [tuple(rng.choice(vocab) for _ in range(3)) for _ in range(rng.randint(0, 4))]
+        for key in range(n)
+    }
+    source = {key : rng.choices(vocab, k=rng.randint(0, 12)) for key in range(n)}
+    return triples, source
+
+
+def test_bulk_matches_naive():
+    validator = TriplesValidator()
+    triples, source = random_corpus(300)
+
+    results_df = validator.bulk_validation(triples, source)
+    naive = validator.naive_validation(triples, source)
+    assert list(results_df.columns) == VALIDATION_COLUMNS
+    assert results_df["id"].tolist() == [meta.identifier for meta in naive]
+    assert results_df["matches"].tolist() == [meta.matching_counts for meta in naive]
+    assert results_df["match_pct"].tolist() == pytest.approx([meta.match_pct for meta in naive])
+
+
+def test_missing_values_match_each_other():
+    validator = TriplesValidator()
+    triples = {1 : [("a", None, "b")], 2 : [("c", "d", "e")]}
+    source = {1 : ["a", None, "x"], 2 : ["c", None]}
+
+    results_df = validator.bulk_validation(triples, source)
+    assert results_df["matches"].tolist() == [meta.matching_counts for meta in validator.naive_validation(triples, source)]
+    assert results_df["covered"].tolist() == [2, 1]
+
+
+def test_bulk_validation_columns():
+    results_df = TriplesValidator().bulk_validation(TRIPLES, SOURCE).set_index("id")
+
+    assert list(results_df.index) == [1, 2, 3, 4]
+    assert results_df.loc[1, ["n_triples", "n_elements", "matches", "covered"]].tolist() == [2, 6, 5, 3]
+    assert results_df.loc[1, "match_pct"] == 1.0
+    assert results_df.loc[2, "precision"] == pytest.approx(2 / 3)
+    assert results_df.loc[2, "recall"] == pytest.approx(2 / 6)
+    assert results_df.loc[3, ["matches", "precision", "recall", "f1"]].tolist() == [0, 0.0, 0.0, 0.0]
+    assert results_df.loc[4, ["n_source_tokens", "match_pct"]].tolist() == [0, 0.0]
+
+
+def test_fuzzy_columns():
+    results_df = TriplesValidator().bulk_validation(TRIPLES, SOURCE, fuzzy_threshold=0.8).set_index("id")
+
+    #"big screen" only matches the two-word source phrase
+    assert results_df.loc[1, "fuzzy_matches"] == 6
+    assert results_df.loc[1, "fuzzy_match_pct"] == 1.0
+    assert results_df.loc[2, "fuzzy_matches"] == 2
+    assert results_df.loc[4, ["fuzzy_matches", "fuzzy_precision"]].tolist() == [0, 0.0]
+
+
+def test_fuzzy_matches_stay_within_the_identifier():
+    triples = {1 : [("phone", "has", "screen")], 2 : [("i", "love", "camera")]}
+    source = {1 : ["phone", "has", "camera"], 2 : ["i", "love", "screen"]}
+    results_df = TriplesValidator().bulk_validation(triples, source, fuzzy_threshold=0.8).set_index("id")
+
+    assert results_df["fuzzy_matches"].tolist() == [2, 2]
+
+
+def test_workers_match_in_process():
+    validator = TriplesValidator()
+    triples, source = random_corpus(200, seed=1)
+
+    expected = validator.bulk_validation(triples, source, fuzzy_threshold=0.5)
+    results_df = validator.bulk_validation(triples, source, n_workers=2, chunk_size=30, fuzzy_threshold=0.5)
+    pd.testing.assert_frame_equal(results_df, expected)
+
+
+def test_dataframe_inputs():
+    validator = TriplesValidator()
+    source_df = pd.DataFrame({"id" : list(SOURCE), "tokens" : list(SOURCE.values())})
+
+    #the dataframe has no rows for identifiers without triples
+    expected = validator.bulk_validation({key : lst for key, lst in TRIPLES.items() if lst}, SOURCE)
+    pd.testing.assert_frame_equal(validator.bulk_validation(df_from_triples_dict(TRIPLES), source_df), expected)
+
+
+def test_validation_summary():
+    validator = TriplesValidator()
+    results_df = validator.bulk_validation(TRIPLES, SOURCE, fuzzy_threshold=0.8)
+    summary = validator.validation_summary(results_df)
+
+    n_elements = results_df["n_elements"].sum()
+    assert summary["identifiers"] == 4
+    assert summary["micro_precision"] == pytest.approx(results_df["matches"].sum() / n_elements)
+    assert summary["micro_fuzzy_precision"] == pytest.approx(results_df["fuzzy_matches"].sum() / n_elements)
+    assert summary["macro_match_pct"] == pytest.approx(results_df["match_pct"].mean())
+    assert validator.validation_summary(validator.bulk_validation({}, {}))["identifiers"] == 0
+
+
+def test_util_is_imported_lazily():
+    code = "import sys; import modules.Validator; print('nltk' in sys.modules)"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "False"